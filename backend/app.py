@@ -15,10 +15,15 @@ from controllers.routes.userController import user_bp
 from services.db_saver import limpar_banco_processamento, atualizar_ultimo_processamento
 
 # Importação do Runner de Processamento de Dados (Extração)
-from runner import main
+from runner import (
+    main, enfileirar_processamento, atualizar_fornecedores, montar_lista_atualizacao, montar_fornecedores_config
+)
+from services.controle_execucao import cancelar_execucao, reservar_controle, remover_controle
+from services.registro_runs import reservar_run, liberar_run, atualizar_run, finalizar_run, obter_run, runs_ativos
+from services.fila_jobs import resumo_jobs, ultima_execucao_enfileirada, execucao_em_fila
 
 # 🟢 Runner do Carrinho de Compras
-from runner_carrinho import executar_automacao_carrinho
+from runner_carrinho import executar_automacao_carrinho, FORNECEDORES_CARRINHO, ALIASES
 
 # Controllers
 from controllers.dadosController import carregar_lote_mais_recente
@@ -270,13 +275,25 @@ def upload_file():
 # 🤖 ROTA DE PROCESSAMENTO DE DADOS (EXTRAÇÃO)
 # Processamento em background para evitar timeout do Cloudflare (524)
 # ====================================================================
-def processar_em_background():
-    """Executa o processamento em uma thread separada"""
+def processar_em_background(modo="completo", processos=None, session_id=None, chaves=None, lista_produtos=None,
+                            controle=None):
+    """
+    Executa o processamento em uma thread separada.
+    modo="retomar" continua o último run interrompido (checkpoints) sem limpar o banco.
+    modo="incremental" também não limpa: só reconsulta códigos novos/vencidos/com erro.
+    modo="atualizacao" roda só `chaves` x `lista_produtos` (POST /processar/atualizar),
+    mesclando no banco atual.
+    processos > 1 divide os fornecedores entre processos (ver runner.main).
+    session_id = run reservado no registro (services/registro_runs.py) pela rota.
+    controle = ControleExecucao reservado junto (services/controle_execucao.py): guarda o
+    cancelamento pedido antes de o run começar.
+    """
     global PROCESSING_START_TIME, PROCESSING_METADATA, PROCESSING_SESSION_ID
     
     try:
-        # Gera novo ID de sessão para este processamento
-        PROCESSING_SESSION_ID = str(uuid.uuid4())
+        # Mesmo ID que a rota devolveu ao frontend
+        PROCESSING_SESSION_ID = session_id or str(uuid.uuid4())
+        atualizar_run(PROCESSING_SESSION_ID, status="processando")
         
         # Inicia captura de logs (limpa logs anteriores)
         log_capture.clear()
@@ -294,20 +311,36 @@ def processar_em_background():
             "logs": []
         }
         
-        print("🔄 [BACKGROUND] Iniciando processamento em background...")
-        
-        # ✅ Limpa o banco antes de iniciar um novo processamento
-        limpeza = limpar_banco_processamento()
-        if not limpeza.get("success"):
-            print(f"❌ [BACKGROUND] Erro ao limpar banco: {limpeza.get('error')}")
-            # Salva logs mesmo em caso de erro
+        print(f"🔄 [BACKGROUND] Iniciando processamento em background (modo: {modo})...")
+
+        # cancelado entre a reserva e aqui: nem limpa o banco
+        if controle is not None and controle.cancelado_tudo:
+            print("🛑 [BACKGROUND] Processamento cancelado antes de começar. Banco e XLSX mantidos.")
+            finalizar_run(PROCESSING_SESSION_ID, "cancelado")
             log_capture.save_to_permanent()
             log_capture.stop()
             return
+        
+        # ✅ Limpa o banco antes de iniciar um novo processamento
+        # (na retomada/incremental o banco tem resultados que ainda valem)
+        if modo == "completo":
+            limpeza = limpar_banco_processamento()
+            if not limpeza.get("success"):
+                print(f"❌ [BACKGROUND] Erro ao limpar banco: {limpeza.get('error')}")
+                finalizar_run(PROCESSING_SESSION_ID, "erro", erro=f"Erro ao limpar banco: {limpeza.get('error')}")
+                # Salva logs mesmo em caso de erro
+                log_capture.save_to_permanent()
+                log_capture.stop()
+                return
+
+        def rotina():
+            if modo == "atualizacao":
+                return atualizar_fornecedores(chaves, lista_produtos, controle=controle)
+            return main(modo=modo, processos=processos, controle=controle)
 
         print("🔄 [BACKGROUND] Executando main()...")
         try:
-            result = asyncio.run(main())
+            result = asyncio.run(rotina())
             
             # Atualiza metadata com informações do resultado
             if result and isinstance(result, dict):
@@ -318,7 +351,7 @@ def processar_em_background():
         except RuntimeError:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(main())
+            result = loop.run_until_complete(rotina())
             loop.close()
             
             if result and isinstance(result, dict):
@@ -327,20 +360,41 @@ def processar_em_background():
                     PROCESSING_METADATA["fornecedores_concluidos"] = result["relatorio"].get("logins_ok", 0)
 
         print(f"✅ [BACKGROUND] Processamento concluído. Total: {result.get('total_processado', 0) if result else 0}")
-
-        # ✅ Atualiza o controle de último processamento ao finalizar (OBRIGATÓRIO)
-        ok_ctrl = atualizar_ultimo_processamento(datetime.now(ZoneInfo("America/Fortaleza")))
-        if not ok_ctrl:
-            print("⚠️ [BACKGROUND] Processou, mas falhou ao atualizar controle_ultimo_processamento.")
-        else:
-            print("✅ [BACKGROUND] Controle de último processamento atualizado.")
-
-        # ✅ Limpa arquivos temporários (data/temp)
-        limpeza_temp = limpar_pasta_temp("data/temp")
-        if not limpeza_temp.get("success"):
-            print(f"⚠️ [BACKGROUND] Falha ao limpar data/temp: {limpeza_temp}")
-        else:
-            print("✅ [BACKGROUND] Arquivos temporários limpos.")
+        if result and result.get("status") == "cancelado":
+            print("🛑 [BACKGROUND] Processamento cancelado. O que faltou pode ser continuado com o modo 'retomar'.")
+
+        result = result if isinstance(result, dict) else {}
+
+        # a atualização pontual não é um processamento do XLSX: não mexe no controle nem no data/temp.
+        # Run que nem começou (nada a retomar, XLSX inválido...) também não: o XLSX enviado fica.
+        if modo != "atualizacao" and not result.get("erro"):
+            # ✅ Atualiza o controle de último processamento ao finalizar (OBRIGATÓRIO)
+            # (cancelado não conta como processamento concluído)
+            if result.get("status") == "cancelado":
+                print("ℹ️ [BACKGROUND] Run cancelado: controle de último processamento mantido.")
+            else:
+                ok_ctrl = atualizar_ultimo_processamento(datetime.now(ZoneInfo("America/Fortaleza")))
+                if not ok_ctrl:
+                    print("⚠️ [BACKGROUND] Processou, mas falhou ao atualizar controle_ultimo_processamento.")
+                else:
+                    print("✅ [BACKGROUND] Controle de último processamento atualizado.")
+
+            # ✅ Limpa arquivos temporários (data/temp)
+            limpeza_temp = limpar_pasta_temp("data/temp")
+            if not limpeza_temp.get("success"):
+                print(f"⚠️ [BACKGROUND] Falha ao limpar data/temp: {limpeza_temp}")
+            else:
+                print("✅ [BACKGROUND] Arquivos temporários limpos.")
+
+        # registro do run: /processar/status passa a responder com o desfecho
+        status_run = "erro" if result.get("erro") else ("cancelado" if result.get("status") == "cancelado" else "concluido")
+        finalizar_run(
+            PROCESSING_SESSION_ID, status_run,
+            execucao_id=result.get("execucao_id"),
+            total_processado=result.get("total_processado", 0),
+            erro=result.get("erro"),
+            detalhes=result.get("detalhes")
+        )
 
         print("🎉 [BACKGROUND] Processamento finalizado com sucesso!")
         
@@ -352,6 +406,7 @@ def processar_em_background():
 
     except Exception as e:
         print(f"❌ [BACKGROUND] Erro crítico no processamento: {str(e)}")
+        finalizar_run(PROCESSING_SESSION_ID, "erro", erro=str(e))
         import traceback
         traceback.print_exc()
         
@@ -360,6 +415,10 @@ def processar_em_background():
         
         log_capture.stop()
 
+    finally:
+        if controle is not None:
+            remover_controle(session_id)
+
 
 @app.route("/processar/logs", methods=["GET"])
 @jwt_required()
@@ -367,8 +426,6 @@ def logs_processamento():
     """
     Retorna os logs do processamento em tempo real e informações de progresso
     """
-    global PROCESSING_SESSION_ID
-    
     try:
         # Obtém TODOS os logs do buffer (sem limite para manter histórico completo)
         logs = log_capture.get_all_logs()
@@ -455,43 +512,69 @@ def logs_processamento():
 @jwt_required()
 def status_processamento():
     """
-    Verifica o status do processamento em background.
-    Retorna 'processing' se ainda está processando (data = 1970-01-01)
-    Retorna 'completed' se terminou (data > 1970-01-01)
+    Verifica o status do processamento em background pelo registro de runs
+    (services/registro_runs.py), não mais pela data sentinela 1970-01-01.
+    ?session_id=... consulta um run específico; sem ele, o run ativo ou o último que terminou.
+    Retorna 'processing' enquanto roda e 'completed' / 'cancelled' / 'error' no fim.
     """
     try:
+        run = obter_run(request.args.get("session_id"))
+
+        if not run:
+            return jsonify({
+                "status": "unknown",
+                "message": "Nenhum processamento registrado desde que o servidor subiu"
+            }), 200
+
+        resposta = {
+            "session_id": run["session_id"],
+            "execucao_id": run["execucao_id"],
+            "modo": run["modo"],
+            "inicio": run["inicio"],
+            "fim": run["fim"],
+            "runs_ativos": len(runs_ativos()),
+        }
+
+        if run["status"] in ("iniciando", "processando"):
+            return jsonify({
+                "status": "processing",
+                "message": "Processamento em andamento...",
+                **resposta
+            }), 200
+
+        if run["status"] == "cancelado":
+            return jsonify({
+                "status": "cancelled",
+                "message": "Processamento cancelado. Use o modo 'retomar' para continuar.",
+                "total_processado": run["total_processado"],
+                **resposta
+            }), 200
+
+        if run["status"] == "erro":
+            return jsonify({
+                "status": "error",
+                "message": "Processamento terminou com erro.",
+                "error": run["erro"],
+                **resposta
+            }), 200
+
         conn = get_connection()
         cursor = conn.cursor()
-        
         cursor.execute("""
             SELECT ultima_data_processamento 
             FROM controle_ultimo_processamento 
             WHERE id = 1
         """)
-        
         row = cursor.fetchone()
         conn.close()
-        
-        if not row or not row[0]:
-            return jsonify({
-                "status": "unknown",
-                "message": "Status do processamento não disponível"
-            }), 200
-        
-        data_str = row[0]
-        
-        # Se a data é 1970-01-01, ainda está processando
-        if "1970-01-01" in data_str or data_str.startswith("1970"):
-            return jsonify({
-                "status": "processing",
-                "message": "Processamento em andamento..."
-            }), 200
-        
-        # Se a data é mais recente, processamento concluído
+
         return jsonify({
             "status": "completed",
             "message": "Processamento concluído!",
-            "ultima_data_processamento": data_str
+            "ultima_data_processamento": row[0] if row else None,
+            "total_processado": run["total_processado"],
+            "detalhes": run.get("detalhes"),
+            **resposta
         }), 200
         
     except Exception as e:
@@ -502,25 +585,199 @@ def status_processamento():
         }), 500
 
 
+def enfileirar_para_workers(modo, session_id):
+    """
+    Modo distribuído: prepara o run e grava os jobs; quem raspa são os workers.
+    session_id = run reservado pela rota: segura o single-flight até os jobs estarem na
+    fila (daí em diante quem segura são os próprios jobs, ver _reservar_run_unico).
+    """
+    if modo == "completo":
+        limpeza = limpar_banco_processamento()
+        if not limpeza.get("success"):
+            finalizar_run(session_id, "erro", erro=f"Erro ao limpar banco: {limpeza.get('error')}")
+            return jsonify({"success": False, "error": f"Erro ao limpar banco: {limpeza.get('error')}"}), 500
+
+    try:
+        resultado = enfileirar_processamento(modo=modo)
+    except Exception as e:
+        finalizar_run(session_id, "erro", erro=str(e))
+        raise
+    if resultado.get("erro"):
+        finalizar_run(session_id, "erro", erro=resultado["erro"])
+        return jsonify({"success": False, "error": resultado["erro"]}), 400
+
+    finalizar_run(session_id, "concluido", execucao_id=resultado.get("execucao_id"))
+
+    return jsonify({
+        "success": True,
+        "message": "Jobs enfileirados para os workers.",
+        "status": resultado.get("status", "enfileirado"),
+        "modo": modo,
+        "execucao_id": resultado.get("execucao_id"),
+        "jobs": resultado.get("jobs", 0),
+        "frescor": resultado.get("frescor"),
+        "retomada": resultado.get("retomada")
+    }), 202
+
+
+@app.route("/processar/jobs", methods=["GET"])
+@jwt_required()
+def status_jobs():
+    """Situação da fila de jobs de uma execução (?execucao_id=..., padrão: a última enfileirada)."""
+    try:
+        execucao_id = request.args.get("execucao_id") or ultima_execucao_enfileirada()
+        if not execucao_id:
+            return jsonify({"success": True, "execucao_id": None, "contagem": {}, "jobs": []}), 200
+
+        resumo = resumo_jobs(execucao_id)
+        if resumo is None:
+            return jsonify({"success": False, "error": "Fila de jobs indisponível"}), 500
+
+        return jsonify({"success": True, **resumo}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/processar/cancel", methods=["POST"])
+@jwt_required()
+def cancelar_processamento():
+    """
+    Cancela o processamento em andamento (ou só um fornecedor, com {"fornecedor": "<chave>"}).
+    As tasks param, os contextos fecham e o que já foi raspado fica gravado; o resto
+    continua retomável (modo "retomar"). Opcional: {"execucao_id": "..."} (ou o session_id
+    devolvido por POST /processar, que já vale enquanto o run ainda está se preparando).
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        fornecedor = payload.get("fornecedor") or None
+        if fornecedor is not None:
+            fornecedor = str(fornecedor).strip().lower()
+            if fornecedor not in {c["chave"] for c in montar_fornecedores_config()}:
+                return jsonify({"success": False, "error": f"Fornecedor '{payload.get('fornecedor')}' desconhecido."}), 400
+
+        execucao_id, afetados = cancelar_execucao(payload.get("execucao_id"), fornecedor)
+        if not execucao_id:
+            return jsonify({"success": False, "error": "Nenhum processamento em andamento"}), 404
+
+        return jsonify({
+            "success": True,
+            "message": f"Cancelamento de {fornecedor} solicitado." if fornecedor else "Cancelamento do processamento solicitado.",
+            "execucao_id": execucao_id,
+            "fornecedores": afetados
+        }), 202
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _reservar_run_unico(modo, processos=None):
+    """
+    reservar_run + fila dos workers: execução distribuída com jobs pendentes/em execução
+    também é run ativo. Local, distribuído e atualização pontual passam todos por aqui,
+    então um não limpa nem mescla o banco por cima do outro.
+    Retorna (run, None) ou (None, ativo) como reservar_run.
+    """
+    run, ativo = reservar_run(modo, processos)
+    if not run:
+        return None, ativo
+
+    em_fila = execucao_em_fila()
+    if em_fila:
+        liberar_run(run["session_id"])
+        return None, {
+            "modo": "distribuido",
+            "session_id": None,
+            "execucao_id": em_fila["execucao_id"],
+            "inicio": em_fila["inicio"],
+        }
+    return run, None
+
+
+def _resposta_run_em_andamento(ativo, anexar=False):
+    """Pedido excedente: 409, ou acompanha o run que já está rodando (anexar)."""
+    if anexar:
+        return jsonify({
+            "success": True,
+            "message": "Já existe um processamento em andamento; acompanhando o mesmo.",
+            "status": "processing",
+            "anexado": True,
+            "modo": ativo["modo"],
+            "session_id": ativo["session_id"],
+            "execucao_id": ativo.get("execucao_id"),
+            "inicio": ativo["inicio"]
+        }), 202
+
+    return jsonify({
+        "success": False,
+        "error": "Já existe um processamento em andamento.",
+        "status": "processing",
+        "modo": ativo["modo"],
+        "session_id": ativo["session_id"],
+        "execucao_id": ativo.get("execucao_id"),
+        "inicio": ativo["inicio"]
+    }), 409
+
+
 @app.route("/processar", methods=["POST"])
 @jwt_required()
 def processar():
     """
     Inicia o processamento em background e retorna imediatamente.
     Isso evita o timeout do Cloudflare (524) que ocorre após 100 segundos.
+
+    Body opcional:
+      {"modo": "retomar"} continua o último processamento interrompido
+        (só fornecedores/SKUs pendentes, sem limpar o banco).
+      {"modo": "incremental"} não limpa o banco e pula (fornecedor, código) consultados
+        dentro do TTL (TTL_FRESCOR_HORAS).
+      {"processos": 4} divide os fornecedores em 4 processos (padrão: PROCESSOS_FORNECEDORES).
+      {"distribuido": true} só enfileira 1 job por fornecedor para os workers (worker.py);
+        acompanhe em GET /processar/jobs.
+      {"anexar": true} se já houver processamento rodando, devolve o session_id dele
+        em vez de 409.
+
+    Só MAX_RUNS_SIMULTANEOS processamentos rodam ao mesmo tempo (padrão 1); o pedido
+    excedente recebe 409 com o run em andamento. Jobs distribuídos ainda na fila também
+    contam como run em andamento (nesse caso a resposta traz o execucao_id deles).
     """
     global PROCESSING_SESSION_ID
     
     try:
-        # Gera um novo ID de sessão ANTES de iniciar o processamento
-        # Isso permite que o frontend identifique quando é um novo processamento
-        new_session_id = str(uuid.uuid4())
+        body = request.get_json(silent=True) or {}
+        modo = body.get("modo", "completo")
+        if modo not in ("completo", "incremental", "retomar"):
+            return jsonify({"success": False, "error": f"Modo inválido: {modo}"}), 400
+
+        processos = body.get("processos")
+        if processos is not None:
+            try:
+                processos = max(1, min(int(processos), os.cpu_count() or 1))
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "error": f"processos inválido: {processos}"}), 400
+
+        # Reserva o run ANTES de iniciar a thread (single-flight: dois cliques não viram dois runs).
+        # O session_id permite que o frontend identifique quando é um novo processamento
+        run, ativo = _reservar_run_unico(modo, processos)
+        if not run:
+            return _resposta_run_em_andamento(ativo, body.get("anexar"))
+
+        if body.get("distribuido"):
+            # o modo "completo" limpa o banco: só com o run reservado (nem local nem jobs na fila)
+            return enfileirar_para_workers(modo, run["session_id"])
+
+        new_session_id = run["session_id"]
+        # cancelamento que chegar durante a preparação já encontra o run
+        controle = reservar_controle(new_session_id)
         
         # Inicia o processamento em uma thread separada
-        thread = threading.Thread(target=processar_em_background, daemon=True)
+        thread = threading.Thread(
+            target=processar_em_background, args=(modo, processos, new_session_id),
+            kwargs={"controle": controle}, daemon=True
+        )
         thread.start()
         
-        # Atualiza o session_id global (será atualizado novamente na thread, mas isso garante que está disponível imediatamente)
+        # Atualiza o session_id global (a thread usa o mesmo, mas isso garante que está disponível imediatamente)
         PROCESSING_SESSION_ID = new_session_id
         
         print("✅ Processamento iniciado em background. Retornando resposta imediata...")
@@ -529,6 +786,7 @@ def processar():
             "success": True,
             "message": "Processamento iniciado em background.",
             "status": "processing",
+            "modo": modo,
             "session_id": new_session_id,  # ID único para este processamento
             "note": "O processamento está sendo executado em background. O overlay permanecerá aberto até a conclusão."
         }), 202  # 202 Accepted - requisição aceita mas ainda processando
@@ -541,6 +799,70 @@ def processar():
         }), 500
 
 
+@app.route("/processar/atualizar", methods=["POST"])
+@jwt_required()
+def atualizar_precos():
+    """
+    Atualização pontual em background: só alguns fornecedores x alguns códigos.
+    Body: {"fornecedores": ["roles", "dpk"], "codigos": ["31968", {"codigo": "123", "quantidade": 2}]}
+    (chaves de FORNECEDORES_CARRINHO; aliases aceitos). Os resultados são mesclados
+    no banco atual, sem limpar nada. Conta como um run no registro (single-flight):
+    devolve o session_id na hora e o desfecho sai em GET /processar/status?session_id=...
+    """
+    global PROCESSING_SESSION_ID
+
+    try:
+        body = request.get_json(silent=True) or {}
+        fornecedores = body.get("fornecedores") or []
+        codigos = body.get("codigos") or []
+
+        if not isinstance(fornecedores, list) or not fornecedores:
+            return jsonify({"success": False, "error": "Campo 'fornecedores' (lista) é obrigatório."}), 400
+        if not isinstance(codigos, list) or not codigos:
+            return jsonify({"success": False, "error": "Campo 'codigos' (lista) é obrigatório."}), 400
+
+        chaves_runner = {c["chave"] for c in montar_fornecedores_config()}
+        chaves = []
+        for f in fornecedores:
+            fk = str(f or "").strip().lower()
+            fk = ALIASES.get(fk, fk)
+            if fk not in FORNECEDORES_CARRINHO or fk not in chaves_runner:
+                return jsonify({"success": False, "error": f"Fornecedor '{f}' não mapeado."}), 400
+            chaves.append(fk)
+
+        lista_produtos = montar_lista_atualizacao(codigos)
+        if not lista_produtos:
+            return jsonify({"success": False, "error": "Nenhum código válido."}), 400
+
+        run, ativo = _reservar_run_unico("atualizacao")
+        if not run:
+            return _resposta_run_em_andamento(ativo)
+        new_session_id = run["session_id"]
+        controle = reservar_controle(new_session_id)
+
+        thread = threading.Thread(
+            target=processar_em_background,
+            args=("atualizacao", None, new_session_id, chaves, lista_produtos),
+            kwargs={"controle": controle}, daemon=True
+        )
+        thread.start()
+        PROCESSING_SESSION_ID = new_session_id
+
+        return jsonify({
+            "success": True,
+            "message": "Atualização iniciada em background.",
+            "status": "processing",
+            "modo": "atualizacao",
+            "session_id": new_session_id,
+            "fornecedores": chaves,
+            "codigos": [p["codigo"] for p in lista_produtos]
+        }), 202
+
+    except Exception as e:
+        print(f"❌ Erro na atualização pontual: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 # ====================================================================
 # 📊 ROTA DE CONSULTA
 # ====================================================================
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import time
+from playwright.async_api import async_playwright
+
+from services.browser_pool import BrowserPool
+from services.bloqueio_rede import PERFIS_BLOQUEIO, PERFIL_PADRAO, aplicar_bloqueio, remover_bloqueio
+from utils.xlsx_loader import get_latest_xlsx, load_produtos_from_xlsx
+from runner import montar_fornecedores_config, logar_fornecedor, fechar_sessao
+
+# ============================================================
+# 📊 BENCHMARK: scraping com  x  sem bloqueio de rede (context.route)
+# ------------------------------------------------------------
+# Loga UMA vez no fornecedor e roda o process_func dele sobre os mesmos
+# códigos alternando os cenários (sem bloqueio / com bloqueio), no mesmo contexto.
+# Bytes = encodedDataLength do CDP (Network.loadingFinished) com cache desligado,
+# em todas as abas do contexto (inclusive as que o controller abre).
+#
+#   python benchmark_bloqueio_rede.py --fornecedor gb --n 10
+#   python benchmark_bloqueio_rede.py --fornecedor portalcomdip --codigos 31968 12345 --rodadas 2
+#
+# OBS: o controller grava no banco como num run normal (use um SQLITE_PATH de teste se preferir).
+# ============================================================
+
+
+class MedidorRede:
+    """Soma bytes/requisições de todas as abas de um contexto via CDP."""
+
+    def __init__(self, context):
+        self.context = context
+        self.bytes = 0
+        self.requisicoes = 0
+        self.falhas = 0
+        self._sessoes = []
+
+    async def anexar(self, page):
+        try:
+            cdp = await self.context.new_cdp_session(page)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setCacheDisabled", {"cacheDisabled": True})
+            cdp.on("Network.requestWillBeSent", self._requisicao)
+            cdp.on("Network.loadingFinished", self._finalizada)
+            cdp.on("Network.loadingFailed", self._falhou)
+            self._sessoes.append(cdp)
+        except Exception as e:
+            print(f"⚠️ CDP indisponível numa aba: {e}")
+
+    def _requisicao(self, evento):
+        self.requisicoes += 1
+
+    def _finalizada(self, evento):
+        self.bytes += int(evento.get("encodedDataLength") or 0)
+
+    def _falhou(self, evento):
+        self.falhas += 1
+
+    def zerar(self):
+        self.bytes = 0
+        self.requisicoes = 0
+        self.falhas = 0
+
+
+async def rodar_cenario(nome, config, context, page, lista, medidor, perfil):
+    bloqueio = await aplicar_bloqueio(context, perfil, config["nome"]) if perfil else None
+    medidor.zerar()
+    inicio = time.perf_counter()
+    try:
+        if config["tipo"] == "parallel":
+            dados = await config["process_func"](context, lista, batch_size=5)
+        else:
+            dados = await config["process_func"](page, lista)
+    finally:
+        await remover_bloqueio(context, bloqueio)
+    total = time.perf_counter() - inicio
+
+    resultado = {
+        "total_s": total,
+        "por_sku_s": total / max(1, len(lista)),
+        "mb": medidor.bytes / (1024 * 1024),
+        "requisicoes": medidor.requisicoes,
+        "abortadas": medidor.falhas,
+        "itens": len(dados or []),
+        "bloqueio": bloqueio.resumo() if bloqueio else None,
+    }
+    print(f"\n📊 {nome}")
+    print(f"   Tempo: {total:.2f}s ({resultado['por_sku_s']:.2f}s por SKU, {resultado['itens']} itens)")
+    print(f"   Transferido: {resultado['mb']:.2f} MB em {resultado['requisicoes']} requisições "
+          f"({resultado['abortadas']} abortadas/falhas)")
+    if bloqueio:
+        print(f"   Bloqueadas: {bloqueio.resumo()['bloqueadas_por_tipo']}")
+    return resultado
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedor", required=True, help="chave do fornecedor (ex.: gb, portalcomdip)")
+    parser.add_argument("--codigos", nargs="*", default=None, help="códigos a consultar (padrão: XLSX mais recente)")
+    parser.add_argument("--n", type=int, default=10, help="quantos códigos do XLSX usar")
+    parser.add_argument("--rodadas", type=int, default=1, help="pares sem/com bloqueio")
+    parser.add_argument("--perfil", default=PERFIL_PADRAO, choices=[p for p, r in PERFIS_BLOQUEIO.items() if r])
+    args = parser.parse_args()
+
+    configs = {c["chave"]: c for c in montar_fornecedores_config()}
+    config = configs.get(args.fornecedor)
+    if not config:
+        print(f"❌ Fornecedor desconhecido: {args.fornecedor}. Opções: {', '.join(configs)}")
+        return
+
+    if args.codigos:
+        lista = [{"codigo": c, "quantidade": 1} for c in args.codigos]
+    else:
+        arquivo = get_latest_xlsx("data/temp")
+        if not arquivo:
+            print("❌ Nenhum XLSX em data/temp. Use --codigos.")
+            return
+        lista = load_produtos_from_xlsx(arquivo)[:args.n]
+
+    async with async_playwright() as p:
+        pool = BrowserPool(p)
+        sessao = await logar_fornecedor(config, pool.proxy())
+        try:
+            if not sessao["ok"]:
+                print(f"❌ Login falhou: {sessao['erro']}")
+                return
+
+            context, page = sessao["context"], sessao["page"]
+            # o logar_fornecedor já instala o bloqueio padrão: o benchmark controla por cenário
+            await remover_bloqueio(context, sessao["bloqueio"])
+
+            medidor = MedidorRede(context)
+            for aba in context.pages:
+                await medidor.anexar(aba)
+            context.on("page", lambda aba: asyncio.ensure_future(medidor.anexar(aba)))
+
+            sem, com = [], []
+            for rodada in range(1, args.rodadas + 1):
+                sem.append(await rodar_cenario(f"Rodada {rodada}: SEM bloqueio", config, context, page, lista, medidor, None))
+                com.append(await rodar_cenario(f"Rodada {rodada}: COM bloqueio ({args.perfil})", config, context, page, lista, medidor, args.perfil))
+        finally:
+            await fechar_sessao(sessao)
+            await pool.fechar()
+
+    media = lambda rs, campo: sum(r[campo] for r in rs) / len(rs)
+    print(f"\n=== COMPARATIVO ({config['nome']}, {len(lista)} SKUs x {args.rodadas} rodada(s)) ===")
+    print(f"Por SKU: {media(sem, 'por_sku_s'):.2f}s -> {media(com, 'por_sku_s'):.2f}s")
+    print(f"Transferido: {media(sem, 'mb'):.2f} MB -> {media(com, 'mb'):.2f} MB")
+    print(f"Requisições: {media(sem, 'requisicoes'):.0f} -> {media(com, 'requisicoes'):.0f}")
+    print(f"Itens: {media(sem, 'itens'):.0f} -> {media(com, 'itens'):.0f} (devem bater)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
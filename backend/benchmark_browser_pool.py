@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import os
+import time
+from playwright.async_api import async_playwright
+
+from services.browser_pool import BrowserPool, ARGS_STEALTH
+
+# ============================================================
+# 📊 BENCHMARK: 1 Chromium por fornecedor  x  pool compartilhado
+# ------------------------------------------------------------
+# Simula N fornecedores (login = launch + new_context + init script + goto)
+# e mede tempo total de lançamento e pico de RSS da árvore de processos
+# (este Python + driver do Playwright + Chromium). Só Linux (/proc).
+#
+#   python benchmark_browser_pool.py --fornecedores 16 --url https://example.com
+# ============================================================
+
+SCRIPT_STEALTH = "Object.defineProperty(navigator, 'webdriver', { get: () => undefined });"
+
+# Assinaturas de launch reais dos controllers (headless, slow_mo, args)
+PERFIS_LAUNCH = [
+    {"slow_mo": 350},
+    {"slow_mo": 200},
+    {"slow_mo": 300},
+    {"args": ARGS_STEALTH, "ignore_default_args": ["--enable-automation"]},
+]
+
+
+def _filhos(pid):
+    filhos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            if int(campos[1]) == pid:
+                filhos.append(int(entrada))
+        except Exception:
+            continue
+    return filhos
+
+
+def rss_arvore_mb(pid_raiz):
+    total_kb = 0
+    pendentes = [pid_raiz]
+    while pendentes:
+        pid = pendentes.pop()
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmRSS:"):
+                        total_kb += int(linha.split()[1])
+                        break
+        except Exception:
+            continue
+        pendentes.extend(_filhos(pid))
+    return total_kb / 1024
+
+
+async def monitorar_pico(estado, intervalo=0.2):
+    while True:
+        estado["pico_mb"] = max(estado["pico_mb"], rss_arvore_mb(os.getpid()))
+        await asyncio.sleep(intervalo)
+
+
+async def simular_login(p, indice, url, headless):
+    perfil = dict(PERFIS_LAUNCH[indice % len(PERFIS_LAUNCH)])
+    inicio = time.perf_counter()
+
+    browser = await p.chromium.launch(headless=headless, **perfil)
+    context = await browser.new_context(locale="pt-BR", timezone_id="America/Sao_Paulo")
+    await context.add_init_script(SCRIPT_STEALTH)
+    page = await context.new_page()
+    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+
+    return browser, time.perf_counter() - inicio
+
+
+async def rodar_cenario(nome, usar_pool, n_fornecedores, concorrencia, url, headless, permanencia):
+    estado = {"pico_mb": 0.0}
+    monitor = asyncio.create_task(monitorar_pico(estado))
+    inicio_total = time.perf_counter()
+
+    async with async_playwright() as p:
+        pool = BrowserPool(p) if usar_pool else None
+        p_uso = pool.proxy() if pool else p
+        sem = asyncio.Semaphore(concorrencia)
+        tempos = []
+
+        async def um(indice):
+            async with sem:
+                browser, duracao = await simular_login(p_uso, indice, url, headless)
+                tempos.append(duracao)
+                # "scraping" simulado: o fornecedor segura o slot/navegador por um tempo
+                await asyncio.sleep(permanencia)
+                estado["pico_mb"] = max(estado["pico_mb"], rss_arvore_mb(os.getpid()))
+                await browser.close()
+
+        await asyncio.gather(*(um(i) for i in range(n_fornecedores)))
+
+        if pool:
+            await pool.fechar()
+
+    monitor.cancel()
+    total = time.perf_counter() - inicio_total
+
+    print(f"\n📊 {nome}")
+    print(f"   Tempo total: {total:.2f}s")
+    print(f"   'Login' médio (launch+context+goto): {sum(tempos) / len(tempos):.2f}s")
+    print(f"   Pico de RSS: {estado['pico_mb']:.0f} MB")
+    if pool:
+        print(f"   Processos Chromium lançados: {pool.total_lancamentos}")
+    return {"total_s": total, "pico_mb": estado["pico_mb"]}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedores", type=int, default=16)
+    parser.add_argument("--concorrencia", type=int, default=5)
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--permanencia", type=float, default=3.0, help="segundos que cada fornecedor fica aberto")
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+
+    headless = not args.headed
+
+    atual = await rodar_cenario("Modelo atual (1 Chromium por fornecedor)", False,
+                                args.fornecedores, args.concorrencia, args.url, headless, args.permanencia)
+    pool = await rodar_cenario("Modelo com pool (contextos por fornecedor)", True,
+                               args.fornecedores, args.concorrencia, args.url, headless, args.permanencia)
+
+    print("\n=== COMPARATIVO ===")
+    print(f"Tempo: {atual['total_s']:.2f}s -> {pool['total_s']:.2f}s")
+    print(f"Pico RSS: {atual['pico_mb']:.0f} MB -> {pool['pico_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import time
+from playwright.async_api import async_playwright
+
+from services import esperas
+from services.browser_pool import BrowserPool
+from services.historico import garantir_tabela_historico, comparar_modos_espera
+from utils.xlsx_loader import get_latest_xlsx, load_produtos_from_xlsx
+from runner import montar_fornecedores_config, logar_fornecedor, fechar_sessao
+
+# ============================================================
+# 📊 BENCHMARK: esperas por evento  x  sleeps fixos (services/esperas.py)
+# ------------------------------------------------------------
+# Sem --fornecedor: relatório A/B pelo historico_fornecedores (runs normais
+# com e sem ESPERAS_FIXAS / ESPERAS_EVENTO=0), s/SKU médio por fornecedor.
+#
+# Com --fornecedor: loga UMA vez e roda o process_func sobre os mesmos códigos
+# alternando os dois modos no mesmo contexto.
+#
+#   python benchmark_esperas.py
+#   python benchmark_esperas.py --fornecedor jahu --n 10 --rodadas 2
+#
+# OBS: no modo ao vivo o controller grava no banco como num run normal.
+# ============================================================
+
+
+def relatorio_historico(janela):
+    garantir_tabela_historico()
+    comparativo = comparar_modos_espera(janela=janela)
+    if not comparativo:
+        print("ℹ️ Nenhum run com modo_espera no histórico ainda.")
+        return
+
+    print(f"\n=== ESPERAS: EVENTO x FIXO (últimos {janela} runs de cada modo) ===")
+    print(f"{'Fornecedor':<32} {'fixo s/SKU':>11} {'evento s/SKU':>13} {'economia':>16}")
+    for chave, linha in sorted(comparativo.items()):
+        fixo = f"{linha['fixo']['por_item_s']:.2f} ({linha['fixo']['amostras']})" if linha["fixo"] else "-"
+        evento = f"{linha['eventos']['por_item_s']:.2f} ({linha['eventos']['amostras']})" if linha["eventos"] else "-"
+        economia = (
+            f"{linha['economia_por_item_s']:.2f}s ({linha['economia_pct']:.0f}%)"
+            if linha["economia_por_item_s"] is not None and linha["economia_pct"] is not None else "-"
+        )
+        print(f"{(linha['fornecedor'] or chave):<32} {fixo:>11} {evento:>13} {economia:>16}")
+    print("(entre parênteses: quantos runs entraram na média; rode com ESPERAS_FIXAS=<chave> para o lado fixo)")
+
+
+async def rodar_cenario(nome, config, context, page, lista, fixo):
+    chave = config["chave"]
+    if fixo:
+        esperas.FORNECEDORES_ESPERA_FIXA.add(chave)
+    else:
+        esperas.FORNECEDORES_ESPERA_FIXA.discard(chave)
+    esperas.zerar_esperas(chave)
+
+    inicio = time.perf_counter()
+    if config["tipo"] == "parallel":
+        dados = await config["process_func"](context, lista, batch_size=5)
+    else:
+        dados = await config["process_func"](page, lista)
+    total = time.perf_counter() - inicio
+
+    resumo = esperas.resumo_esperas(chave) or {}
+    resultado = {
+        "total_s": total,
+        "por_sku_s": total / max(1, len(lista)),
+        "itens": len(dados or []),
+        "espera_s": resumo.get("tempo_s", 0.0),
+        "tetos": resumo.get("tetos", 0),
+        "fallbacks": resumo.get("fallbacks", 0),
+    }
+    print(f"\n📊 {nome}")
+    print(f"   Tempo: {total:.2f}s ({resultado['por_sku_s']:.2f}s por SKU, {resultado['itens']} itens)")
+    print(f"   Em esperas: {resultado['espera_s']:.2f}s de {resumo.get('teto_s', 0.0):.2f}s de teto "
+          f"({resultado['tetos']} no teto, {resultado['fallbacks']} fallbacks)")
+    if resumo.get("vencedores"):
+        print(f"   Desfechos: {resumo['vencedores']}")
+    return resultado
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedor", default=None, help="chave do fornecedor (sem ela: relatório do histórico)")
+    parser.add_argument("--codigos", nargs="*", default=None, help="códigos a consultar (padrão: XLSX mais recente)")
+    parser.add_argument("--n", type=int, default=10, help="quantos códigos do XLSX usar")
+    parser.add_argument("--rodadas", type=int, default=1, help="pares fixo/evento")
+    parser.add_argument("--janela", type=int, default=5, help="runs por modo no relatório do histórico")
+    args = parser.parse_args()
+
+    if not args.fornecedor:
+        relatorio_historico(args.janela)
+        return
+
+    configs = {c["chave"]: c for c in montar_fornecedores_config()}
+    config = configs.get(args.fornecedor)
+    if not config:
+        print(f"❌ Fornecedor desconhecido: {args.fornecedor}. Opções: {', '.join(configs)}")
+        return
+
+    if args.codigos:
+        lista = [{"codigo": c, "quantidade": 1} for c in args.codigos]
+    else:
+        arquivo = get_latest_xlsx("data/temp")
+        if not arquivo:
+            print("❌ Nenhum XLSX em data/temp. Use --codigos.")
+            return
+        lista = load_produtos_from_xlsx(arquivo)[:args.n]
+
+    async with async_playwright() as p:
+        pool = BrowserPool(p)
+        sessao = await logar_fornecedor(config, pool.proxy())
+        try:
+            if not sessao["ok"]:
+                print(f"❌ Login falhou: {sessao['erro']}")
+                return
+
+            context, page = sessao["context"], sessao["page"]
+            fixo, evento = [], []
+            for rodada in range(1, args.rodadas + 1):
+                fixo.append(await rodar_cenario(f"Rodada {rodada}: sleeps FIXOS", config, context, page, lista, True))
+                evento.append(await rodar_cenario(f"Rodada {rodada}: esperas por EVENTO", config, context, page, lista, False))
+        finally:
+            await fechar_sessao(sessao)
+            await pool.fechar()
+
+    media = lambda rs, campo: sum(r[campo] for r in rs) / len(rs)
+    print(f"\n=== COMPARATIVO ({config['nome']}, {len(lista)} SKUs x {args.rodadas} rodada(s)) ===")
+    print(f"Por SKU: {media(fixo, 'por_sku_s'):.2f}s -> {media(evento, 'por_sku_s'):.2f}s")
+    print(f"Em esperas: {media(fixo, 'espera_s'):.2f}s -> {media(evento, 'espera_s'):.2f}s")
+    print(f"Itens: {media(fixo, 'itens'):.0f} -> {media(evento, 'itens'):.0f} (devem bater)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import time
+from playwright.async_api import async_playwright
+
+from services.browser_pool import BrowserPool
+from services.extracao_dom import extrair_primeira
+from services.captura_respostas import OPCOES_ITEM, montar_item
+from controllers.produtos import produtoController1, produtoController2, produtoController17
+from runner import montar_fornecedores_config, logar_fornecedor, fechar_sessao
+
+# ============================================================
+# 📊 MICRO-BENCHMARK: extração do DOM em 1 page.evaluate  x  locator por campo
+# ------------------------------------------------------------
+# Lê a MESMA declaração de campos dos controllers de dois jeitos:
+#   - "locators": um count/inner_text/get_attribute por campo (como era antes)
+#   - "evaluate": services/extracao_dom.py (uma ida só ao navegador)
+# e confere que os dois devolvem o mesmo JSON.
+#
+# Sem --fornecedor: páginas de exemplo locais (card do PortalComDip com UFs,
+# linha da tabela da Roles, jqGrid da PLS), sem login.
+# Com --fornecedor: loga, busca --codigo e mede na página de resultado real.
+# Com --json-x-dom: no mesmo exemplo do PortalComDip (card com estoque por UF),
+# confere a MONTAGEM do item da captura JSON (montar_item, com o produto já lido)
+# contra o do DOM (extrair_dados_produto) para algumas quantidades. Tem que dar o
+# mesmo banco. O mapeamento dos campos da resposta real não entra aqui: esse é o
+# teste_captura_respostas.py, com respostas gravadas do portal.
+#
+#   python benchmark_extracao_dom.py --repeticoes 50
+#   python benchmark_extracao_dom.py --fornecedor roles --codigo 12345
+#   python benchmark_extracao_dom.py --json-x-dom
+# ============================================================
+
+ALVOS = {
+    "portalcomdip": ("isthmus-produto-b2b-card", produtoController1.CAMPOS_CARD),
+    "roles": (produtoController2.SELETOR_LINHA, produtoController2.CAMPOS_LINHA),
+    "odapel": ("tr.jqgrow", produtoController17.CAMPOS_LINHA),
+}
+
+_HTML_EXEMPLO = {
+    "portalcomdip": """
+        <isthmus-produto-b2b-card>
+          <div class="card-imagem"><a title="Filtro de óleo (Cód.: PX123)"><img src="/img/px123.jpg"></a></div>
+          <div class="card-nome">Filtro de óleo</div><span class="nome-marca">Tecfil</span>
+          <div class="card-preco"><ul class="precos">
+            <li><span class="text-muted small">rj</span><strong>R$ 25,90</strong></li>
+            <li><span class="text-muted small">sp</span><strong>R$ 24,10</strong></li>
+            <li><span class="text-muted small">mg</span></li>
+          </ul></div>
+        </isthmus-produto-b2b-card>""",
+    "roles": """
+        <table><tbody><tr class="odd">
+          <td class="dtr-control"><span class="text-truncate">Bosch</span><span class="font-weight-bold">Vela de ignição</span></td>
+          <td class="max-w-175px"><span>F000KE0P07</span></td>
+          <td><img class="h-100" src="/fotos/vela.png"></td>
+          <td class="dt-right"><span class="font-size-h5">R$ 40,00</span><span class="font-size-h5">R$ 35,50</span></td>
+          <td><input class="vit-qtde-table" value="1"></td>
+        </tr></tbody></table>""",
+    "odapel": """
+        <table><tbody><tr class="jqgrow">
+          <td>7788</td><td>x</td><td>Correia dentada</td><td>Gates</td><td></td><td></td><td></td>
+          <td>12 un</td><td></td><td>R$ 89,90</td>
+        </tr></tbody></table>""",
+}
+
+
+# Mesmo produto do exemplo acima como sai de localizar_produto e como o card se comporta:
+# RJ com 5 em estoque, SP com 40, MG sem preço. O + avisa no alerta quando passa do
+# estoque da UF selecionada.
+_PRODUTO_PORTALCOMDIP = {
+    "codigo": "PX123", "nome": "Filtro de óleo", "marca": "Tecfil", "imagem": "/img/px123.jpg",
+    "regioes": [
+        {"uf": "RJ", "preco_num": 25.90, "estoque": 5, "disponivel": None},
+        {"uf": "SP", "preco_num": 24.10, "estoque": 40, "disponivel": None},
+        {"uf": "MG", "preco_num": None, "estoque": 0, "disponivel": None},
+    ],
+}
+_ESTOQUE_CARD = {"RJ": 5, "SP": 40, "MG": 0}
+
+_HTML_CARD_INTERATIVO = _HTML_EXEMPLO["portalcomdip"].replace(
+    "</isthmus-produto-b2b-card>",
+    """  <input aria-label="Quantidade do produto" value="1">
+          <button aria-label="Reduzir quantidade do produto">-</button>
+          <button aria-label="Aumentar quantidade do produto">+</button>
+        </isthmus-produto-b2b-card>
+        <script>
+          const estoque = %s;
+          let uf = 'RJ';
+          const qtd = document.querySelector("input[aria-label='Quantidade do produto']");
+          document.querySelectorAll('.card-preco ul.precos li').forEach(li => li.addEventListener('click', () => {
+              uf = li.querySelector('span').innerText.trim().toUpperCase();
+              qtd.value = '1';
+          }));
+          document.querySelector("button[aria-label='Aumentar quantidade do produto']").addEventListener('click', () => {
+              const valor = parseInt(qtd.value || '1');
+              if (valor + 1 > estoque[uf]) {
+                  const alerta = document.createElement('div');
+                  alerta.className = 'alert alert-success';
+                  alerta.innerText = `Quantidade máxima disponível: ${estoque[uf]}`;
+                  document.body.appendChild(alerta);
+              } else {
+                  qtd.value = String(valor + 1);
+              }
+          });
+        </script>""" % json.dumps(_ESTOQUE_CARD),
+)
+
+# O que vai para o banco; "mensagem" fica de fora (o DOM traz o texto do alerta do portal)
+_CAMPOS_ITEM = ("preco_num", "valor_total", "qtdDisponivel", "podeComprar", "disponivel", "uf")
+
+
+async def ler_por_locators(raiz, campos):
+    """Mesma declaração de campos, mas um locator (uma ida ao navegador) por leitura."""
+    saida = {}
+    for nome, campo in campos.items():
+        if campo.get("coluna") is not None:
+            loc = raiz.locator("td").nth(campo["coluna"])
+        elif not campo.get("sel"):
+            loc = raiz
+        else:
+            loc = raiz.locator(campo["sel"])
+
+        if campo.get("existe"):
+            saida[nome] = await loc.count() > 0
+            continue
+        if campo.get("campos"):
+            saida[nome] = [await ler_por_locators(loc.nth(i), campo["campos"]) for i in range(await loc.count())]
+            continue
+
+        async def valor(alvo):
+            if campo.get("attr"):
+                return await alvo.get_attribute(campo["attr"])
+            return (await alvo.inner_text()).strip()
+
+        if campo.get("todos"):
+            saida[nome] = [await valor(loc.nth(i)) for i in range(await loc.count())]
+            continue
+        alvo = loc.last if campo.get("ultimo") else loc.first
+        saida[nome] = await valor(alvo) if await alvo.count() else None
+    return saida
+
+
+async def medir(nome, page, seletor, campos, repeticoes):
+    raiz = page.locator(seletor).first
+    antigo = await ler_por_locators(raiz, campos)
+    novo = await extrair_primeira(page, seletor, campos)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        await ler_por_locators(raiz, campos)
+    t_locators = (time.perf_counter() - inicio) / repeticoes
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        await extrair_primeira(page, seletor, campos)
+    t_evaluate = (time.perf_counter() - inicio) / repeticoes
+
+    print(f"{nome:<14} {t_locators * 1000:>10.1f} {t_evaluate * 1000:>10.1f} "
+          f"{(t_locators - t_evaluate) * 1000:>11.1f} {t_locators / t_evaluate if t_evaluate else 0:>7.1f}x "
+          f"{'sim' if antigo == novo else 'NÃO':>7}")
+    if antigo != novo:
+        print(f"   locators: {antigo}\n   evaluate: {novo}")
+
+
+def _cabecalho(repeticoes):
+    print(f"\n=== EXTRAÇÃO DO DOM (ms por SKU, média de {repeticoes}) ===")
+    print(f"{'Layout':<14} {'locators':>10} {'evaluate':>10} {'economia':>11} {'':>8} {'iguais':>7}")
+
+
+async def modo_exemplos(repeticoes):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            _cabecalho(repeticoes)
+            for chave, (seletor, campos) in ALVOS.items():
+                await page.set_content(f"<html><body>{_HTML_EXEMPLO[chave]}</body></html>")
+                await medir(chave, page, seletor, campos, repeticoes)
+        finally:
+            await browser.close()
+
+
+def _resumo_item(item):
+    resumo = {campo: item.get(campo) for campo in _CAMPOS_ITEM}
+    resumo["regioes"] = [{campo: r.get(campo) for campo in _CAMPOS_ITEM} for r in item.get("regioes") or []]
+    return resumo
+
+
+async def modo_json_x_dom(quantidades=(1, 3, 5, 10)):
+    produto = _PRODUTO_PORTALCOMDIP
+    codigo = produto["codigo"]
+
+    divergentes = 0
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            print(f"\n=== PORTALCOMDIP: captura JSON x DOM ({codigo}) ===")
+            for quantidade in quantidades:
+                await page.set_content(f"<html><body>{_HTML_CARD_INTERATIVO}</body></html>")
+                dom = _resumo_item(await produtoController1.extrair_dados_produto(page, quantidade))
+                captura = _resumo_item(montar_item(produto, quantidade, **OPCOES_ITEM["portalcomdip"]))
+                iguais = dom == captura
+                divergentes += not iguais
+                print(f"qtd {quantidade:>3}: {'iguais' if iguais else 'DIFERENTES'} "
+                      f"(qtdDisponivel {dom['qtdDisponivel']}, valor_total {dom['valor_total']})")
+                if not iguais:
+                    print(f"   DOM:  {dom}\n   JSON: {captura}")
+        finally:
+            await browser.close()
+    print(f"Divergências: {divergentes}/{len(quantidades)}")
+
+
+async def modo_ao_vivo(config, codigo, repeticoes):
+    seletor, campos = ALVOS[config["chave"]]
+    controller = {
+        "portalcomdip": produtoController1, "roles": produtoController2, "odapel": produtoController17,
+    }[config["chave"]]
+
+    async with async_playwright() as p:
+        pool = BrowserPool(p)
+        sessao = await logar_fornecedor(config, pool.proxy())
+        try:
+            if not sessao["ok"]:
+                print(f"❌ Login falhou: {sessao['erro']}")
+                return
+            page = sessao["page"]
+            if config["chave"] == "portalcomdip":
+                page = await controller.abrir_aba_pesquisa(sessao["context"])
+            await controller.buscar_produto(page, codigo)
+            if await page.locator(seletor).count() == 0:
+                print(f"❌ {codigo}: nenhum resultado em {config['nome']} para medir.")
+                return
+            _cabecalho(repeticoes)
+            await medir(config["chave"], page, seletor, campos, repeticoes)
+        finally:
+            await fechar_sessao(sessao)
+            await pool.fechar()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedor", default=None, choices=list(ALVOS), help="sem ele: páginas de exemplo locais")
+    parser.add_argument("--codigo", default=None, help="código a buscar no modo ao vivo")
+    parser.add_argument("--repeticoes", type=int, default=30)
+    parser.add_argument("--json-x-dom", action="store_true", help="confere a montagem do item JSON x DOM no exemplo do PortalComDip")
+    args = parser.parse_args()
+
+    if args.json_x_dom:
+        await modo_json_x_dom()
+        return
+
+    if not args.fornecedor:
+        await modo_exemplos(args.repeticoes)
+        return
+
+    if not args.codigo:
+        print("❌ Use --codigo com --fornecedor.")
+        return
+    config = {c["chave"]: c for c in montar_fornecedores_config()}[args.fornecedor]
+    await modo_ao_vivo(config, args.codigo, args.repeticoes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import time
+from playwright.async_api import async_playwright
+
+from services import http_direto
+from services.browser_pool import BrowserPool
+from services.captura_respostas import esquecer_requisicao, normalizar_codigo
+from services.replay_respostas import PASTA_GRAVACOES_PADRAO, ServidorReplay, carregar_gravacoes, respostas_do_produto
+from utils.xlsx_loader import get_latest_xlsx, load_produtos_from_xlsx
+from runner import montar_fornecedores_config, logar_fornecedor, fechar_sessao, extrair_pelo_navegador
+
+# ============================================================
+# 📊 BENCHMARK: HTTP direto  x  navegador (services/http_direto.py)
+# ------------------------------------------------------------
+# Ao vivo: loga UMA vez, roda os mesmos códigos pelo fluxo do navegador (que
+# também aprende a requisição da busca) e depois em requisições diretas com os
+# cookies do contexto. Compara s/SKU e se preço/estoque batem.
+#
+# --replay: sem portal. Sobe o servidor local com as respostas gravadas
+# (GRAVAR_RESPOSTAS=data/respostas_gravadas num run normal) e roda o modo HTTP
+# contra ele: confere o mapeamento código a código e mede o overhead do cliente.
+# Só serve para fornecedor com mapeamento (services/captura_respostas.py MAPEAMENTOS).
+#
+#   python benchmark_http_direto.py --fornecedor dpk --n 20
+#   python benchmark_http_direto.py --fornecedor dpk --replay
+#   python benchmark_http_direto.py --fornecedor takao --replay data/respostas_gravadas --concorrencia 16
+#
+# OBS: ao vivo o fluxo do navegador grava no banco como num run normal
+# (o lado HTTP do benchmark não grava).
+# ============================================================
+
+
+def _chave_item(item):
+    return (round(item.get("preco_num") or 0.0, 2), item.get("qtdDisponivel"))
+
+
+async def rodar_http(config, requisitante, modelo, lista, concorrencia):
+    chave = config["chave"]
+    http_direto.zerar_http(chave)
+    inicio = time.perf_counter()
+    itens, para_navegador = await http_direto.extrair_via_http(
+        chave, config["nome"], requisitante, modelo, list(enumerate(lista)), concorrencia=concorrencia
+    )
+    total = time.perf_counter() - inicio
+    resumo = http_direto.resumo_http(chave) or {}
+    print(f"\n📊 HTTP direto ({concorrencia or http_direto.CONCORRENCIA_HTTP} workers, "
+          f"{http_direto.LIMITE_RPS.get(chave, http_direto.LIMITE_RPS_PADRAO):.1f} req/s)")
+    print(f"   Tempo: {total:.2f}s ({total / max(1, len(lista)):.3f}s por SKU, {len(itens)} itens)")
+    print(f"   Requisições: {resumo.get('requisicoes', 0)} | para o navegador: {len(para_navegador)}"
+          f"{' | desligado: ' + resumo['desligado'] if resumo.get('desligado') else ''}")
+    return itens, para_navegador, total
+
+
+async def modo_replay(config, pasta, concorrencia):
+    chave = config["chave"]
+    gravacoes = carregar_gravacoes(pasta, chave)
+    if not gravacoes:
+        print(f"❌ Nenhuma gravação em {pasta}/{chave}. Rode com GRAVAR_RESPOSTAS={pasta} antes.")
+        return
+    gravacoes = respostas_do_produto(chave, gravacoes)
+    if not gravacoes:
+        print(f"❌ O mapeamento de {chave} não acha o produto em nenhuma gravação (ou {chave} não tem mapeamento).")
+        return
+
+    primeira = next(iter(gravacoes.values()))
+    modelo = http_direto.ModeloBusca.de_requisicao(primeira["requisicao"])
+    if modelo is None:
+        print(f"❌ A requisição gravada de {chave} não tem o código na URL/corpo: não dá para reaproveitar.")
+        return
+
+    lista = [{"codigo": g["requisicao"]["codigo"], "quantidade": 1} for g in gravacoes.values()]
+    with ServidorReplay(gravacoes) as servidor:
+        print(f"📼 Replay de {len(lista)} respostas de {config['nome']} em {servidor.origem} ({modelo.resumo()})")
+        async with async_playwright() as p:
+            requisitante = await p.request.new_context()
+            try:
+                itens, para_navegador, _ = await rodar_http(
+                    config, requisitante, modelo.com_origem(servidor.origem), lista, concorrencia
+                )
+            finally:
+                await requisitante.dispose()
+
+    # toda resposta em que o mapeamento acha o produto tem que virar item pelo HTTP
+    extraidos = {normalizar_codigo(i["codigo"]) for i in itens}
+    divergentes = 0
+    for gravacao in gravacoes.values():
+        codigo = gravacao["requisicao"]["codigo"]
+        if normalizar_codigo(codigo) not in extraidos:
+            divergentes += 1
+            print(f"   ❌ {codigo}: produto na resposta gravada, mas o item não saiu")
+    print(f"\n=== REPLAY ({config['nome']}) ===")
+    print(f"Itens: {len(itens)}/{len(lista)} | sem item: {len(para_navegador)} | divergentes: {divergentes}")
+
+
+async def modo_ao_vivo(config, lista, concorrencia):
+    chave = config["chave"]
+    async with async_playwright() as p:
+        pool = BrowserPool(p)
+        sessao = await logar_fornecedor(config, pool.proxy())
+        try:
+            if not sessao["ok"]:
+                print(f"❌ Login falhou: {sessao['erro']}")
+                return
+
+            context, page = sessao["context"], sessao["page"]
+            esquecer_requisicao(chave)
+            inicio = time.perf_counter()
+            navegador = await extrair_pelo_navegador(config, context, page, lista) or []
+            t_navegador = time.perf_counter() - inicio
+            print(f"\n📊 Navegador")
+            print(f"   Tempo: {t_navegador:.2f}s ({t_navegador / max(1, len(lista)):.2f}s por SKU, {len(navegador)} itens)")
+
+            modelo = http_direto.modelo_da_busca(chave)
+            if modelo is None:
+                print(f"❌ {config['nome']}: nenhuma requisição de busca reaproveitável foi capturada "
+                      f"(a captura JSON precisa estar ligada: CAPTURA_RESPOSTAS_LIGADA + MAPEAMENTOS).")
+                return
+            http, _, t_http = await rodar_http(config, context.request, modelo, lista, concorrencia)
+        finally:
+            await fechar_sessao(sessao)
+            await pool.fechar()
+
+    por_codigo = {normalizar_codigo(i["codigo"]): i for i in navegador if i}
+    batem = sum(
+        1 for i in http
+        if normalizar_codigo(i["codigo"]) in por_codigo
+        and _chave_item(i) == _chave_item(por_codigo[normalizar_codigo(i["codigo"])])
+    )
+    print(f"\n=== COMPARATIVO ({config['nome']}, {len(lista)} SKUs) ===")
+    print(f"Por SKU: {t_navegador / max(1, len(lista)):.2f}s -> {t_http / max(1, len(lista)):.3f}s "
+          f"({t_navegador / t_http if t_http else 0:.1f}x)")
+    print(f"Itens: {len(navegador)} -> {len(http)} | preço/estoque iguais: {batem}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedor", required=True, help="chave do fornecedor (portalcomdip, dpk, takao, furacao)")
+    parser.add_argument("--codigos", nargs="*", default=None, help="códigos a consultar (padrão: XLSX mais recente)")
+    parser.add_argument("--n", type=int, default=20, help="quantos códigos do XLSX usar")
+    parser.add_argument("--concorrencia", type=int, default=None, help="workers HTTP (padrão HTTP_DIRETO_CONCORRENCIA)")
+    parser.add_argument("--replay", nargs="?", const=PASTA_GRAVACOES_PADRAO, default=None,
+                        help="pasta das respostas gravadas (sem portal)")
+    args = parser.parse_args()
+
+    configs = {c["chave"]: c for c in montar_fornecedores_config()}
+    config = configs.get(args.fornecedor)
+    if not config:
+        print(f"❌ Fornecedor desconhecido: {args.fornecedor}. Opções: {', '.join(configs)}")
+        return
+    if not config.get("http_direto"):
+        print(f"ℹ️ {config['nome']} não está marcado com \"http_direto\" no runner (rodando assim mesmo).")
+
+    if args.replay:
+        await modo_replay(config, args.replay, args.concorrencia)
+        return
+
+    if args.codigos:
+        lista = [{"codigo": c, "quantidade": 1} for c in args.codigos]
+    else:
+        arquivo = get_latest_xlsx("data/temp")
+        if not arquivo:
+            print("❌ Nenhum XLSX em data/temp. Use --codigos.")
+            return
+        lista = load_produtos_from_xlsx(arquivo)[:args.n]
+
+    await modo_ao_vivo(config, lista, args.concorrencia)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -50,4 +50,83 @@ CREATE TABLE IF NOT EXISTS itens_detalhes_regionais (
     qtd_disponivel_regional INTEGER,
     pode_comprar_regional BOOLEAN,
     FOREIGN KEY(item_id) REFERENCES itens_processados(id)
-);
\ No newline at end of file
+);
+
+-- Histórico de duração por fornecedor/execução (agenda LPT do runner)
+CREATE TABLE IF NOT EXISTS historico_fornecedores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execucao_id TEXT,
+    chave TEXT,
+    fornecedor TEXT,
+    iniciado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    login_ok BOOLEAN,
+    itens_solicitados INTEGER,
+    itens_retornados INTEGER,
+    tempo_login_s REAL,
+    tempo_fila_s REAL,
+    tempo_scraping_s REAL,
+    tempo_por_item_s REAL,
+    previsto_fim_s REAL,
+    concluido_fim_s REAL,
+    modo_espera TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_historico_fornecedores_chave ON historico_fornecedores (chave, id);
+
+-- Checkpoints de execução (retomada após crash/restart)
+CREATE TABLE IF NOT EXISTS checkpoint_execucoes (
+    execucao_id TEXT PRIMARY KEY,
+    iniciado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status TEXT,
+    lista_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS checkpoint_fornecedores (
+    execucao_id TEXT,
+    chave TEXT,
+    fornecedor TEXT,
+    total INTEGER,
+    status TEXT,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (execucao_id, chave)
+);
+
+CREATE TABLE IF NOT EXISTS checkpoint_itens (
+    execucao_id TEXT,
+    chave TEXT,
+    indice INTEGER,
+    status TEXT,
+    item_json TEXT,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (execucao_id, chave, indice)
+);
+
+-- Última consulta de cada (fornecedor, código): TTL do modo incremental
+CREATE TABLE IF NOT EXISTS consultas_fornecedores (
+    chave TEXT,
+    codigo TEXT,
+    quantidade INTEGER,
+    status TEXT,
+    consultado_em_ts REAL,
+    PRIMARY KEY (chave, codigo)
+);
+
+-- Fila de jobs (1 por execução + fornecedor) consumida por worker.py com lease
+CREATE TABLE IF NOT EXISTS jobs_fornecedores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execucao_id TEXT,
+    chave TEXT,
+    prioridade REAL DEFAULT 0,
+    status TEXT DEFAULT 'pendente',
+    tentativas INTEGER DEFAULT 0,
+    max_tentativas INTEGER,
+    worker_id TEXT,
+    token TEXT,
+    lease_ate_ts REAL,
+    payload_json TEXT,
+    resultado_json TEXT,
+    erro TEXT,
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (execucao_id, chave)
+);
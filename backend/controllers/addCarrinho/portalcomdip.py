@@ -3,16 +3,14 @@ import asyncio
 import re
 from typing import List, Dict, Any, Optional
 
-# Reaproveita sua busca já validada
-from controllers.produtos.produtoController1 import buscar_produto
+# Reaproveita sua busca já validada (e o ajuste de quantidade do card)
+from controllers.produtos.produtoController1 import (
+    buscar_produto, SELETOR_QTD, definir_quantidade, ajustar_por_botoes,
+)
 
 PESQUISA_URL = "https://www.portalcomdip.com.br/comdip/compras/pesquisa"
 
 
-def _only_digits(s: str) -> str:
-    return "".join(ch for ch in (s or "") if ch.isdigit())
-
-
 async def _selecionar_uf_no_card(card, uf: str) -> bool:
     """
     Seleciona a UF dentro do card (se existir lista de UFs).
@@ -52,52 +50,14 @@ async def _set_quantidade_no_card(card, quantidade: int) -> Dict[str, Any]:
     if quantidade < 1:
         quantidade = 1
 
-    qtd_input = card.locator("input[aria-label='Quantidade do produto']")
-    plus_btn = card.locator("button[aria-label='Aumentar quantidade do produto']")
-    minus_btn = card.locator("button[aria-label='Reduzir quantidade do produto']")
-
     # Garante que o input existe
-    await qtd_input.wait_for(state="visible", timeout=15000)
+    await card.locator(SELETOR_QTD).wait_for(state="visible", timeout=15000)
 
-    # 1) Tenta setar direto no input
-    try:
-        await qtd_input.click()
-        await qtd_input.fill(str(quantidade))
-        # força eventos de blur/commit (Angular costuma precisar)
-        await qtd_input.press("Tab")
-        await asyncio.sleep(0.2)
-    except Exception:
-        pass
-
-    # 2) Confere valor
-    atual_str = ""
-    try:
-        atual_str = await qtd_input.input_value()
-    except Exception:
-        atual_str = ""
-
-    atual = int(_only_digits(atual_str) or "1")
+    # 1) + 2) Seta direto no input (fill + Tab) e confere o valor
+    atual = await definir_quantidade(card, quantidade) or 1
 
     # 3) Fallback: ajusta via botões
-    tentativas_max = 60
-    tent = 0
-
-    while atual != quantidade and tent < tentativas_max:
-        tent += 1
-
-        if atual < quantidade:
-            await plus_btn.click()
-        else:
-            await minus_btn.click()
-
-        await asyncio.sleep(0.12)
-
-        try:
-            atual_str = await qtd_input.input_value()
-            atual = int(_only_digits(atual_str) or str(atual))
-        except Exception:
-            # se não conseguir ler, assume que avançou 1 (melhor esforço)
-            atual = atual + 1 if atual < quantidade else max(1, atual - 1)
+    atual, tent = await ajustar_por_botoes(card, quantidade, atual, max_cliques=60)
 
     return {
         "quantidade_solicitada": quantidade,
@@ -1,4 +1,6 @@
 import asyncio
+import os
+import time
 from datetime import datetime
 
 # ===================== IMPORTAÇÃO DO SERVIÇO DE BANCO ===================== #
@@ -9,6 +11,15 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import registrar_item
+
+# ===================== CAPTURA DA RESPOSTA JSON DA BUSCA ===================== #
+from services.captura_respostas import CapturaBusca
+
+# ===================== EXTRAÇÃO EM UM page.evaluate ===================== #
+from services.extracao_dom import extrair_primeira
+
 # ============================================================
 # 🔧 PREPARAÇÃO DE DADOS (SEM SALVAR JSON)
 # ============================================================
@@ -68,9 +79,312 @@ async def buscar_produto(page, codigo, quantidade=1):
     await page.wait_for_load_state("networkidle")
     print("✔ Página carregada:", page.url)
 
+# ============================================================
+# 🔢 QUANTIDADE / SONDAGEM DE ESTOQUE NO CARD
+# ============================================================
+# Usado aqui e no carrinho (controllers/addCarrinho/portalcomdip.py).
+SELETOR_QTD = "input[aria-label='Quantidade do produto']"
+SELETOR_MAIS = "button[aria-label='Aumentar quantidade do produto']"
+SELETOR_MENOS = "button[aria-label='Reduzir quantidade do produto']"
+SELETOR_ALERTA = "div.alert.alert-success"
+ESPERA_ALERTA_MS = 300   # o alerta de estoque aparece logo depois do clique no +
+
+def _digitos(texto):
+    return "".join(c for c in (texto or "") if c.isdigit())
+
+async def ler_quantidade(card):
+    """Valor atual do input de quantidade (None se não deu para ler)."""
+    try:
+        return int(_digitos(await card.locator(SELETOR_QTD).input_value()) or 0) or None
+    except:
+        return None
+
+async def definir_quantidade(card, valor):
+    """Digita `valor` direto no input e confirma com Tab (o Angular só aplica no blur). Retorna o que ficou no input."""
+    qtd_input = card.locator(SELETOR_QTD)
+    try:
+        await qtd_input.click()
+        await qtd_input.fill(str(valor))
+        await qtd_input.press("Tab")
+        await asyncio.sleep(0.2)
+    except:
+        pass
+    return await ler_quantidade(card)
+
+async def ajustar_por_botoes(card, alvo, atual, max_cliques=60, pausa=0.12, max_parado=3):
+    """
+    Fallback: chega em `alvo` clicando +/-. Para se o valor não anda por `max_parado`
+    cliques seguidos (o portal travou no estoque). Retorna (valor no input, cliques).
+    """
+    cliques = parado = 0
+    while atual != alvo and cliques < max_cliques and parado < max_parado:
+        cliques += 1
+        if atual < alvo:
+            await card.locator(SELETOR_MAIS).click()
+        else:
+            await card.locator(SELETOR_MENOS).click()
+        await asyncio.sleep(pausa)
+
+        lido = await ler_quantidade(card)
+        if lido is None:
+            # se não conseguir ler, assume que andou 1 (melhor esforço)
+            lido = atual + 1 if atual < alvo else max(1, atual - 1)
+        parado = parado + 1 if lido == atual else 0
+        atual = lido
+    return atual, cliques
+
+async def _limpar_alertas(page):
+    try:
+        await page.evaluate("document.querySelectorAll('div.alert.alert-success').forEach(el => el.remove());")
+    except:
+        pass
+
+async def _texto_alerta(page, espera_ms=ESPERA_ALERTA_MS):
+    alerta = page.locator(SELETOR_ALERTA).first
+    try:
+        await alerta.wait_for(state="visible", timeout=espera_ms)
+        return (await alerta.inner_text()).strip()
+    except:
+        return None
+
+async def _testar_quantidade(page, card, quantidade):
+    """
+    Põe quantidade-1 no input e clica + uma vez: a validação de estoque do portal roda
+    no clique, como quando se clicava unidade a unidade.
+    {"aceitou", "alerta", "valor", "limite"}; aceitou=None => o input não aceita digitação.
+    """
+    nao_digita = {"aceitou": None, "alerta": None, "valor": None, "limite": None}
+    await _limpar_alertas(page)
+    antes = await ler_quantidade(card)
+    base = await definir_quantidade(card, quantidade - 1)
+    if base is not None and base == antes and base != quantidade - 1:
+        # nada mudou: ou o input ignora digitação ou é o mesmo limite da UF anterior
+        conferencia = 2 if base == 1 else 1
+        if await definir_quantidade(card, conferencia) != conferencia:
+            return nao_digita
+        base = await definir_quantidade(card, quantidade - 1)
+    if base is None:
+        return nao_digita
+    if base < quantidade - 1:
+        # o próprio input cortou o valor (max = estoque)
+        return {"aceitou": False, "alerta": None, "valor": base, "limite": base}
+
+    await card.locator(SELETOR_MAIS).click()
+    alerta = await _texto_alerta(page)
+    valor = await ler_quantidade(card)
+    if alerta is None and valor is None:
+        return nao_digita
+    aceitou = alerta is None and valor == quantidade
+    limite = None if aceitou or alerta else valor
+    return {"aceitou": aceitou, "alerta": alerta, "valor": valor, "limite": limite}
+
+async def _sondar_por_cliques(page, card, quantidade):
+    """Jeito antigo: do 1 até `quantidade` clicando + (só quando o input não aceita digitação)."""
+    try:
+        await card.locator(SELETOR_QTD).fill("1")
+        await asyncio.sleep(0.2)
+    except:
+        pass
+    await _limpar_alertas(page)
+
+    qtd_disponivel, mensagem, pode_comprar, cliques = 1, None, True, 0
+    for i in range(quantidade - 1):
+        await card.locator(SELETOR_MAIS).click()
+        cliques += 1
+        await asyncio.sleep(0.25)
+
+        texto = await _texto_alerta(page, espera_ms=1)
+        if texto:
+            num = _digitos(texto)
+            qtd_disponivel = int(num) if num else qtd_disponivel
+            mensagem = texto
+            pode_comprar = False
+            break
+
+        lido = await ler_quantidade(card)
+        if lido is not None and lido < i + 2:
+            # sem alerta, mas o + não andou: o portal travou no estoque
+            qtd_disponivel = lido
+            mensagem = f"Quantidade limitada a {lido} pelo portal"
+            pode_comprar = False
+            break
+        qtd_disponivel = i + 2
+    return qtd_disponivel, mensagem, pode_comprar, cliques
+
+async def sondar_estoque(page, card, quantidade):
+    """
+    Quanto dá para comprar (até `quantidade`) na UF selecionada no card, sem clicar + uma vez
+    por unidade: testa a quantidade pedida direto; se o alerta traz o máximo, é ele; se o alerta
+    não traz número, busca binária no maior valor aceito. Só cai nos cliques unitários se o
+    input não aceitar digitação.
+    {"qtdDisponivel", "podeComprar", "mensagem", "estrategia", "sondagens"}
+    """
+    def resultado(qtd, pode, mensagem, estrategia, sondagens):
+        return {"qtdDisponivel": qtd, "podeComprar": pode, "mensagem": mensagem,
+                "estrategia": estrategia, "sondagens": sondagens}
+
+    if quantidade <= 1:
+        return resultado(1, True, None, "unitaria", 0)
+
+    teste = await _testar_quantidade(page, card, quantidade)
+    if teste["aceitou"] is None:
+        qtd, mensagem, pode, cliques = await _sondar_por_cliques(page, card, quantidade)
+        return resultado(qtd, pode, mensagem, "cliques", cliques)
+    if teste["aceitou"]:
+        return resultado(quantidade, True, None, "direta", 1)
+    if teste["limite"]:
+        return resultado(teste["limite"], False, f"Quantidade limitada a {teste['limite']} pelo portal", "direta", 1)
+
+    num = _digitos(teste["alerta"])
+    if num:
+        return resultado(int(num), False, teste["alerta"], "direta", 1)
+
+    # alerta sem o máximo: maior quantidade aceita entre 1 (sempre aceita) e quantidade-1
+    menor, maior, sondagens = 1, quantidade - 1, 1
+    while menor < maior:
+        meio = (menor + maior + 1) // 2
+        sondagens += 1
+        if (await _testar_quantidade(page, card, meio))["aceitou"]:
+            menor = meio
+        else:
+            maior = meio - 1
+    return resultado(menor, False, teste["alerta"], "binaria", sondagens)
+
+# ============================================================
+# 🗺️ ESTOQUE POR UF EM ABAS PARALELAS
+# ============================================================
+# A 1ª UF com preço é sondada no próprio card. Se ela custou mais que abrir uma aba
+# e refazer a busca (UF_CUSTO_ABA_S; ex.: input que não aceita digitação e volta para
+# os cliques unitários), as outras UFs são sondadas ao mesmo tempo em abas novas do
+# mesmo contexto, até UF_ABAS_PARALELAS por card (0 = sempre uma UF depois da outra).
+UF_ABAS_PARALELAS = int(os.getenv("UF_ABAS_PARALELAS", "3"))
+UF_CUSTO_ABA_S = float(os.getenv("UF_CUSTO_ABA_S", "4"))
+
+async def _selecionar_uf(card, idx, uf):
+    """Clica no li da UF (pela posição; se a ordem mudou, pelo texto). False se não achou."""
+    lista_li = card.locator(".card-preco ul.precos li")
+    ufs = [
+        (t or "").strip().upper()
+        for t in await lista_li.evaluate_all(
+            "els => els.map(li => { const s = li.querySelector('span.text-muted.small'); return s ? s.innerText : ''; })"
+        )
+    ]
+    if idx < len(ufs) and (not uf or ufs[idx] == uf):
+        alvo = idx
+    elif uf in ufs:
+        alvo = ufs.index(uf)
+    else:
+        return False
+    await lista_li.nth(alvo).click()
+    await asyncio.sleep(0.3)
+    return True
+
+async def _sondar_uf_em_aba(context, codigo, titulo, idx, uf, quantidade):
+    """Sonda uma UF numa aba própria: nova busca do mesmo código, seleciona a UF, sonda, fecha a aba."""
+    aba = await abrir_aba_pesquisa(context)
+    try:
+        await buscar_produto(aba, codigo, quantidade)
+        card = aba.locator("isthmus-produto-b2b-card").first
+        await card.wait_for(timeout=15000)
+        if titulo and await card.locator(".card-imagem a").get_attribute("title") != titulo:
+            raise ValueError("a busca na aba nova trouxe outro card")
+        try:
+            await card.locator("mat-spinner").wait_for(state="detached", timeout=10000)
+        except:
+            pass
+        if not await _selecionar_uf(card, idx, uf):
+            raise ValueError(f"UF {uf} não encontrada no card")
+        return await sondar_estoque(aba, card, quantidade)
+    finally:
+        try:
+            await aba.close()
+        except:
+            pass
+
+async def sondar_ufs(page, card, ufs, quantidade, codigo=None, titulo=None):
+    """
+    Estoque de cada UF com preço. `ufs` = [(idx do li, uf)]. Retorna {idx: sondar_estoque(...)}.
+    UF que falhar na aba paralela é refeita no card da própria aba.
+    """
+    sondagens = {}
+    pendentes = list(ufs)
+    lista_li = card.locator(".card-preco ul.precos li")
+
+    async def no_card(idx):
+        await lista_li.nth(idx).click()
+        await asyncio.sleep(0.3)
+        return await sondar_estoque(page, card, quantidade)
+
+    if not pendentes:
+        return sondagens
+
+    idx, _ = pendentes.pop(0)
+    inicio = time.perf_counter()
+    sondagens[idx] = await no_card(idx)
+    custo = time.perf_counter() - inicio
+
+    if pendentes and codigo and UF_ABAS_PARALELAS > 0 and custo > UF_CUSTO_ABA_S:
+        print(f"🗂️ Estoque da 1ª UF levou {custo:.1f}s: sondando {len(pendentes)} UFs em abas paralelas...")
+        limite = asyncio.Semaphore(UF_ABAS_PARALELAS)
+
+        async def em_aba(idx, uf):
+            async with limite:
+                try:
+                    return idx, await _sondar_uf_em_aba(page.context, codigo, titulo, idx, uf, quantidade)
+                except Exception as e:
+                    print(f"⚠️ UF {uf} na aba paralela falhou ({e}). Refazendo no card.")
+                    return idx, None
+
+        for idx, sondagem in await asyncio.gather(*(em_aba(idx, uf) for idx, uf in pendentes)):
+            if sondagem:
+                sondagens[idx] = sondagem
+        pendentes = [(idx, uf) for idx, uf in pendentes if idx not in sondagens]
+
+    for idx, _ in pendentes:
+        sondagens[idx] = await no_card(idx)
+    return sondagens
+
 # ============================================================
 # 📦 EXTRAIR DADOS DO PRODUTO
 # ============================================================
+# Campos do card lidos todos de uma vez, depois do spinner (ver services/extracao_dom.py)
+CAMPOS_CARD = {
+    "nome": {"sel": ".card-nome", "obrigatorio": True},
+    "marca": {"sel": ".nome-marca"},
+    "imagem": {"sel": ".card-imagem img", "attr": "src"},
+    "titulo": {"sel": ".card-imagem a", "attr": "title"},
+    # uma entrada por UF (li) da lista de preços
+    "ufs": {"sel": ".card-preco ul.precos li", "campos": {
+        "uf": {"sel": "span.text-muted.small"},
+        "preco": {"sel": "strong"},
+    }},
+    # sem multi-UF
+    "preco": {"sel": ".card-preco strong"},
+    "avisos": {"sel": "span.text-muted.small", "todos": True},
+}
+
+def _resultado_vazio(status, mensagem, quantidade):
+    """Resultado de busca sem card lido ("Não encontrado" / "Erro"), com as mesmas chaves do item."""
+    return {
+        "codigo": None,
+        "nome": None,
+        "marca": None,
+        "imagem": None,
+        "preco": None,
+        "preco_num": None,
+        "preco_formatado": None,
+        "valor_total": None,
+        "valor_total_formatado": None,
+        "uf": None,
+        "disponivel": False,
+        "status": status,
+        "qtdSolicitada": quantidade,
+        "qtdDisponivel": 0,
+        "podeComprar": False,
+        "mensagem": mensagem,
+        "regioes": None
+    }
+
 async def extrair_dados_produto(page, quantidade=1):
     print("\n📦 Extraindo dados do produto...")
 
@@ -80,27 +394,7 @@ async def extrair_dados_produto(page, quantidade=1):
     no_result = page.locator("h3:has-text('Não encontramos nenhum resultado')")
     if await no_result.count() > 0:
         print("❌ Produto não encontrado!")
-
-        dados = {
-            "codigo": None,
-            "nome": None,
-            "marca": None,
-            "imagem": None,
-            "preco": None,
-            "preco_num": None,
-            "preco_formatado": None,
-            "valor_total": None,
-            "valor_total_formatado": None,
-            "uf": None,
-            "disponivel": False,
-            "status": "Não encontrado",
-            "qtdSolicitada": quantidade,
-            "qtdDisponivel": 0,
-            "podeComprar": False,
-            "mensagem": "Nenhum resultado encontrado",
-            "regioes": None
-        }
-        return dados
+        return _resultado_vazio("Não encontrado", "Nenhum resultado encontrado", quantidade)
 
     # =======================================================
     # 2) Encontrar o card
@@ -111,26 +405,7 @@ async def extrair_dados_produto(page, quantidade=1):
         await card_locator.first.wait_for(timeout=15000)
     except:
         print("❌ Nenhum card carregou.")
-        dados = {
-            "codigo": None,
-            "nome": None,
-            "marca": None,
-            "imagem": None,
-            "preco": None,
-            "preco_num": None,
-            "preco_formatado": None,
-            "valor_total": None,
-            "valor_total_formatado": None,
-            "uf": None,
-            "disponivel": False,
-            "status": "Erro",
-            "qtdSolicitada": quantidade,
-            "qtdDisponivel": 0,
-            "podeComprar": False,
-            "mensagem": "Nenhum card encontrado",
-            "regioes": None
-        }
-        return dados
+        return _resultado_vazio("Erro", "Nenhum card encontrado", quantidade)
 
     card = card_locator.first
 
@@ -146,53 +421,45 @@ async def extrair_dados_produto(page, quantidade=1):
             print("⚠ Spinner não sumiu — possivelmente indisponível.")
 
     # =======================================================
-    # 4) Campos básicos
+    # 4) Campos básicos (e os de preço/UF) num único page.evaluate
     # =======================================================
-    nome = (await card.locator(".card-nome").inner_text()).strip()
-
-    marca_el = card.locator(".nome-marca")
-    marca = (await marca_el.inner_text()).strip() if await marca_el.count() else ""
+    campos = await extrair_primeira(page, "isthmus-produto-b2b-card", CAMPOS_CARD)
+    if campos is None:
+        # o card sumiu entre a espera e a leitura (busca sem resultado)
+        print("❌ Produto não encontrado!")
+        return _resultado_vazio("Não encontrado", "Nenhum resultado encontrado", quantidade)
 
-    imagem = await card.locator(".card-imagem img").get_attribute("src")
+    nome = campos["nome"]
+    marca = campos["marca"] or ""
+    imagem = campos["imagem"]
 
-    titulo = await card.locator(".card-imagem a").get_attribute("title")
-    codigo = titulo.split("(Cód.:")[-1].replace(")", "").strip() if "(Cód.:" in titulo else None
+    titulo = campos["titulo"]
+    codigo = titulo.split("(Cód.:")[-1].replace(")", "").strip() if titulo and "(Cód.:" in titulo else None
 
     # =======================================================
     # 5) MULTI-UF
     # =======================================================
     regioes_info = []
-    lista_precos_li = card.locator(".card-preco ul.precos li")
-    total_li = await lista_precos_li.count()
-
-    qtd_input = card.locator("input[aria-label='Quantidade do produto']")
-    botao_plus = card.locator("button[aria-label='Aumentar quantidade do produto']")
-    alerta = page.locator("div.alert.alert-success")
+    total_li = len(campos["ufs"])
 
     # -------------------------------------------------------
     # SE EXISTEM MÚLTIPLAS UFs
     # -------------------------------------------------------
     if total_li > 0:
-        for idx in range(total_li):
-            li = lista_precos_li.nth(idx)
-
-            # Seleciona UF
-            await li.click()
-            await asyncio.sleep(0.3)
-
-            # Identifica UF
-            uf_txt = None
-            uf_span = li.locator("span.text-muted.small")
-            if await uf_span.count() > 0:
-                uf_txt = (await uf_span.inner_text()).strip().upper()
-
-            # Identifica preço desta UF
-            strong_el = li.locator("strong")
-            tem_preco_uf = await strong_el.count() > 0
-            preco_uf = (await strong_el.inner_text()).strip() if tem_preco_uf else None
-
-            # Se não houver preço → indisponível
-            if not tem_preco_uf or not preco_uf:
+        # UF e preço de cada li (já lidos); as com preço têm o estoque sondado
+        ufs = []
+        for item_uf in campos["ufs"]:
+            uf_txt = item_uf["uf"].upper() if item_uf["uf"] is not None else None
+            ufs.append((uf_txt, item_uf["preco"]))
+
+        sondagens = await sondar_ufs(
+            page, card, [(idx, uf_txt) for idx, (uf_txt, preco_uf) in enumerate(ufs) if preco_uf],
+            quantidade, codigo=codigo, titulo=titulo
+        )
+
+        for idx, (uf_txt, preco_uf) in enumerate(ufs):
+            # Se não houver preço → indisponível (nem seleciona a UF)
+            if not preco_uf:
                 regioes_info.append({
                     "uf": uf_txt,
                     "preco": None,
@@ -208,37 +475,11 @@ async def extrair_dados_produto(page, quantidade=1):
                 })
                 continue
 
-            # RESET QUANTIDADE
-            try:
-                await qtd_input.fill("1")
-                await asyncio.sleep(0.2)
-            except:
-                pass
-
-            # limpar alertas antigos
-            try:
-                await page.evaluate("document.querySelectorAll('div.alert.alert-success').forEach(el => el.remove());")
-            except:
-                pass
-
-            qtd_disponivel_reg = 1
-            mensagem_reg = None
-            pode_comprar_reg = True
-
-            # Clicar até atingir quantidade solicitada OU alerta
-            for i in range(quantidade - 1):
-                await botao_plus.click()
-                await asyncio.sleep(0.25)
-
-                if await alerta.count() > 0:
-                    texto_alerta = (await alerta.inner_text()).strip()
-                    num = "".join(c for c in texto_alerta if c.isdigit())
-                    qtd_disponivel_reg = int(num) if num else qtd_disponivel_reg
-                    mensagem_reg = texto_alerta
-                    pode_comprar_reg = False
-                    break
-                
-                qtd_disponivel_reg = i + 2
+            # Estoque desta UF até a quantidade solicitada (direto/binária em vez de + por unidade)
+            sondagem = sondagens[idx]
+            qtd_disponivel_reg = sondagem["qtdDisponivel"]
+            mensagem_reg = sondagem["mensagem"]
+            pode_comprar_reg = sondagem["podeComprar"]
 
             valor_unitario_reg = clean_price(preco_uf)
             valor_total_reg = (valor_unitario_reg * qtd_disponivel_reg if valor_unitario_reg else None)
@@ -284,35 +525,19 @@ async def extrair_dados_produto(page, quantidade=1):
     # =======================================================
     # 6) Fallback sem multi-UF (CORREÇÃO APLICADA AQUI)
     # =======================================================
-    preco_el = card.locator(".card-preco strong")
-    tem_preco = await preco_el.count() > 0
-    preco = (await preco_el.inner_text()).strip() if tem_preco else None
-
-    spans = card.locator("span.text-muted.small")
+    preco = campos["preco"]
+    tem_preco = preco is not None
     indisponivel = not tem_preco
 
-    for i in range(await spans.count()):
-        txt = (await spans.nth(i).inner_text()).strip().lower()
-        if "indisponível" in txt:
+    for txt in campos["avisos"]:
+        if "indisponível" in txt.lower():
             indisponivel = True
 
-    qtd_disponivel = 1
-    mensagem = None
-    pode_comprar = True
-
     if not indisponivel:
-        for i in range(quantidade - 1):
-            await botao_plus.click()
-            await asyncio.sleep(0.2)
-
-            if await alerta.count() > 0:
-                texto = (await alerta.inner_text()).strip()
-                num = "".join(c for c in texto if c.isdigit())
-                qtd_disponivel = int(num) if num else 1
-                mensagem = texto
-                pode_comprar = False
-                break
-            qtd_disponivel = i + 2
+        sondagem = await sondar_estoque(page, card, quantidade)
+        qtd_disponivel = sondagem["qtdDisponivel"]
+        mensagem = sondagem["mensagem"]
+        pode_comprar = sondagem["podeComprar"]
     else:
         qtd_disponivel = 0
         pode_comprar = False
@@ -322,7 +547,7 @@ async def extrair_dados_produto(page, quantidade=1):
     valor_total = valor_unitario * qtd_disponivel if valor_unitario else None
 
     dados = {
-        "codigo": codigo,
+        "codigo": None,
         "nome": nome,
         "marca": marca,
         "imagem": imagem,
@@ -347,49 +572,135 @@ async def extrair_dados_produto(page, quantidade=1):
 
 
 # ============================================================
-# 🔥 MULTI-ABAS / BATCH PARALELO
+# 🔥 MULTI-ABAS: POOL DE WORKERS (JANELA DESLIZANTE)
 # ============================================================
-async def processar_batch(context, batch):
-    tarefas = []
-    for item in batch:
-        codigo = item["codigo"]
-        qtd = item["quantidade"]
-
-        async def processar_item(codigo=codigo, qtd=qtd):
-            page = await context.new_page()
+URL_PESQUISA = "https://www.portalcomdip.com.br/comdip/compras/pesquisa"
+
+async def abrir_aba_pesquisa(context):
+    page = await context.new_page()
+    await page.goto(URL_PESQUISA, wait_until="networkidle", timeout=30000)
+    return page
+
+
+async def titulo_primeiro_card(page):
+    try:
+        card = page.locator("isthmus-produto-b2b-card .card-imagem a").first
+        if await card.count() > 0:
+            return await card.get_attribute("title")
+    except:
+        pass
+    return None
+
+
+async def aguardar_resultado_novo(page, titulo_anterior, timeout=10000):
+    """Na aba reaproveitada, garante que o card lido não é o da busca anterior."""
+    if not titulo_anterior:
+        return
+    try:
+        await page.wait_for_function(
+            """(anterior) => {
+                if ([...document.querySelectorAll('h3')].some(h => h.innerText.includes('Não encontramos nenhum resultado'))) return true;
+                const a = document.querySelector('isthmus-produto-b2b-card .card-imagem a');
+                return a && a.getAttribute('title') !== anterior;
+            }""",
+            arg=titulo_anterior,
+            timeout=timeout
+        )
+    except:
+        pass
+
+
+async def worker_pesquisa(worker_id, context, fila, resultados, total, execucao=None):
+    """
+    Aba de vida longa: puxa o próximo código assim que termina o anterior.
+    Só é recriada depois de um erro.
+    """
+    page = None
+
+    try:
+        while True:
+            try:
+                idx, item = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+
+            codigo = item["codigo"]
+            qtd = item["quantidade"]
+            print(f"\n📦 [{idx+1}/{total}] PortalComDip (aba {worker_id}) -> Buscando: {codigo}")
+
+            erro = None
             try:
-                await page.goto(
-                    "https://www.portalcomdip.com.br/comdip/compras/pesquisa",
-                    wait_until="networkidle",
-                    timeout=30000
-                )
-                await buscar_produto(page, codigo, qtd)
-                dados = await extrair_dados_produto(page, qtd)
+                if page is None or page.is_closed():
+                    page = await abrir_aba_pesquisa(context)
+
+                titulo_anterior = await titulo_primeiro_card(page)
+                async with CapturaBusca(page, "portalcomdip", codigo) as captura:
+                    await captura.aguardar(buscar_produto(page, codigo, qtd))
+
+                # preço/estoque por UF no JSON da busca: sem cliques no card (sem estoque no JSON, vai pelo DOM)
+                dados = captura.item(qtd)
+                if dados is None:
+                    await aguardar_resultado_novo(page, titulo_anterior)
+                    dados = await extrair_dados_produto(page, qtd)
+                    captura.gravar(dados)
+
             except Exception as e:
+                print(f"⚠️ Aba {worker_id} com erro em {codigo}: {e}. Reciclando aba...")
                 dados = {"codigo": codigo, "erro": str(e)}
-            finally:
+                erro = e
+                if page is not None:
+                    try:
+                        await page.close()
+                    except:
+                        pass
+                page = None
+
+            # com sink o item já foi para o banco; sem, fica para o save do fim
+            if not await registrar_item(execucao, idx, item, [] if erro else [dados], erro):
+                resultados[idx] = dados
+            fila.task_done()
+    finally:
+        # também quando o worker é cancelado (outro worker caiu ou o run foi cancelado)
+        if page is not None:
+            try:
                 await page.close()
-            return dados
-
-        tarefas.append(processar_item())
-    return await asyncio.gather(*tarefas)
+            except:
+                pass
 
 
 # ============================================================
-# 🔁 PROCESSAR BATCHES (COM DB, SEM JSON)
+# 🔁 PROCESSAR LISTA (COM DB, SEM JSON)
 # ============================================================
-async def processar_lista_produtos_parallel(context, lista_produtos, batch_size=5):
-    resultados_finais = []
+async def processar_lista_produtos_parallel(context, lista_produtos, batch_size=5, execucao=None):
+    """
+    batch_size = número de abas-worker simultâneas (nome mantido por compatibilidade com o runner).
+    Resultados voltam na mesma ordem da lista.
+    """
+    total = len(lista_produtos)
+    fila = asyncio.Queue()
+    for idx, item in enumerate(lista_produtos):
+        fila.put_nowait((idx, item))
 
-    for i in range(0, len(lista_produtos), batch_size):
-        batch = lista_produtos[i:i + batch_size]
+    resultados = [None] * total
+    n_workers = max(1, min(batch_size, total))
 
-        print("\n======================================")
-        print(f"▶ PROCESSANDO LOTE {i//batch_size + 1} ({len(batch)} itens)")
-        print("======================================\n")
+    print(f"\n▶ PortalComDip: {total} itens em {n_workers} abas-worker")
 
-        resultados = await processar_batch(context, batch)
-        resultados_finais.extend(resultados)
+    workers = [
+        asyncio.create_task(worker_pesquisa(w + 1, context, fila, resultados, total, execucao))
+        for w in range(n_workers)
+    ]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # um worker caiu (FornecedorAbortado, cancelamento): os outros param antes do contexto
+        # ser fechado, em vez de seguir digitando em abas mortas; as exceções deles são lidas aqui
+        for w in workers:
+            if not w.done():
+                w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    resultados_finais = [r for r in resultados if r is not None]
 
     # ==========================================================
     # 👇👇 SALVAR NO BANCO DE DADOS (SEM JSON) 👇👇
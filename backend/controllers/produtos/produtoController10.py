@@ -11,6 +11,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -216,7 +219,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial10(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial10(login_data_ou_page, lista_produtos, execucao=None):
     itens_extraidos = []
 
     if isinstance(login_data_ou_page, (tuple, list)) and len(login_data_ou_page) >= 3:
@@ -234,6 +237,7 @@ async def processar_lista_produtos_sequencial10(login_data_ou_page, lista_produt
         lista_produtos = [{"codigo": lista_produtos, "quantidade": 1}]
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -257,6 +261,7 @@ async def processar_lista_produtos_sequencial10(login_data_ou_page, lista_produt
                 break
 
             except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"⚠️ Problema temporário ao processar {codigo}. Pulando.")
                 try:
                     await page.reload(wait_until="domcontentloaded")
@@ -264,6 +269,8 @@ async def processar_lista_produtos_sequencial10(login_data_ou_page, lista_produt
                     pass
                 break
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
         if validos:
@@ -9,6 +9,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== CAPTURA DA RESPOSTA JSON DA BUSCA ===================== #
+from services.captura_respostas import CapturaBusca
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str: return 0.0
@@ -45,10 +51,11 @@ async def verificar_e_recuperar_loading(page) -> bool:
     return False
 
 # ===================== NAVEGAÇÃO E BUSCA ===================== #
-async def buscar_produto(page, codigo):
+async def buscar_produto(page, codigo, captura=None):
     """
     Retorna True se achou resultado (ou carregou a página de resultados).
     Retorna False se deu TIMEOUT de 8 segundos.
+    Com `captura` (CapturaBusca), o JSON do produto chegando antes do card também encerra a espera.
     """
     try:
         selector_busca = "input[formcontrolname='searchTerm']"
@@ -73,11 +80,17 @@ async def buscar_produto(page, codigo):
         print("⏳ Aguardando resultados...")
 
         # === AQUI ESTÁ A LÓGICA DE 8 SEGUNDOS ===
-        try:
+        async def esperar_card():
             # Espera no MÁXIMO 8000ms (8s) pelo card do produto
             await page.wait_for_selector(".column-view-card", timeout=8000)
             # Se achou antes de 8s, segue o baile
             await asyncio.sleep(1.5) # Pequeno delay para renderizar imagens
+
+        try:
+            if captura:
+                await captura.aguardar(esperar_card())
+            else:
+                await esperar_card()
             return True
             
         except Exception:
@@ -198,7 +211,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produtos, execucao=None):
     itens_extraidos = []
     
     if isinstance(login_data_ou_page, (tuple, list)):
@@ -220,6 +233,7 @@ async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produt
         lista_produtos = [{"codigo": lista_produtos, "quantidade": 1}]
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
         
@@ -231,7 +245,15 @@ async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produt
 
                 # 1. Realiza a busca
                 # Agora retorna TRUE se achou, ou FALSE se deu timeout de 8s
-                encontrou = await buscar_produto(page, codigo)
+                async with CapturaBusca(page, "dpk", codigo) as captura:
+                    encontrou = await buscar_produto(page, codigo, captura)
+
+                # 1.1 Produto veio no JSON da busca: não precisa ler o card
+                resultado = captura.item(qtd)
+                if resultado:
+                    itens_extraidos.append(resultado)
+                    await asyncio.sleep(1.0)
+                    break
                 
                 # SE NÃO ENCONTROU EM 8 SEGUNDOS, SAI DO LOOP WHILE E VAI PRO PROXIMO ITEM (FOR)
                 if not encontrou:
@@ -242,6 +264,7 @@ async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produt
 
                 # 2. Se a busca deu certo, tenta extrair
                 resultado = await extrair_dados_produto(page, codigo, qtd)
+                captura.gravar(resultado)
                 if resultado:
                     itens_extraidos.append(resultado)
                 
@@ -249,12 +272,15 @@ async def processar_lista_produtos_sequencial11(login_data_ou_page, lista_produt
                 break # Sai do while e vai pro próximo item do for
 
             except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"❌ Erro crítico no loop F11: {e}")
                 if await verificar_e_recuperar_loading(page): continue
                 try: await page.reload(wait_until="networkidle")
                 except: pass
                 break
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
         if validos:
@@ -11,6 +11,15 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_mudanca, marcar_estado, pausa
+
+# ===================== CAPTURA DA RESPOSTA JSON DA BUSCA ===================== #
+from services.captura_respostas import CapturaBusca
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -56,7 +65,8 @@ async def safe_reload(page, motivo=""):
         return False
 
 # ===================== BUSCA ===================== #
-async def buscar_produto(page, codigo):
+async def buscar_produto(page, codigo, captura=None):
+    """Com `captura` (CapturaBusca), o JSON do produto chegando antes dos cards encerra a espera."""
     try:
         selector_busca = "input#inputSearch"
 
@@ -73,14 +83,22 @@ async def buscar_produto(page, codigo):
         await asyncio.sleep(1.2)
 
         print(f"⌛ Pesquisando {codigo}...")
+        marca = await marcar_estado(page, ["app-card-produto-home span.preco"])
         await page.keyboard.press("Enter")
 
-        print("⏳ Aguardando cards (Takao é lento)...")
-        try:
-            await page.wait_for_selector("app-card-produto-home", timeout=90000)
-            await asyncio.sleep(8)  # renderização final de preço/estoque
-        except:
-            print("ℹ️ Nenhum card encontrado para este código.")
+        async def esperar_cards():
+            print("⏳ Aguardando cards (Takao é lento)...")
+            try:
+                await page.wait_for_selector("app-card-produto-home", timeout=90000)
+                # renderização final de preço/estoque: preço do card novo preenchido (teto = os 8s antigos)
+                await esperar_mudanca(page, "app-card-produto-home span.preco", 8, "takao", marca=marca)
+            except Exception:
+                print("ℹ️ Nenhum card encontrado para este código.")
+
+        if captura:
+            await captura.aguardar(esperar_cards())
+        else:
+            await esperar_cards()
 
     except:
         print(f"⚠️ Falha na busca Takao ({codigo}).")
@@ -207,7 +225,7 @@ def preparar_dados_finais(itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial12(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial12(login_data_ou_page, lista_produtos, execucao=None):
     itens = []
 
     page = login_data_ou_page[2] if isinstance(login_data_ou_page, (tuple, list)) else login_data_ou_page
@@ -226,25 +244,34 @@ async def processar_lista_produtos_sequencial12(login_data_ou_page, lista_produt
         ]
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
         print(f"\n📦 [{idx+1}/{len(lista_produtos)}] Takao -> {codigo}")
 
         try:
-            await buscar_produto(page, codigo)
-            await asyncio.sleep(2)
-
-            resultado = await extrair_dados_produto(page, codigo, qtd)
+            async with CapturaBusca(page, "takao", codigo) as captura:
+                await buscar_produto(page, codigo, captura)
+
+            # produto no JSON da busca: sem esperar/ler o card
+            resultado = captura.item(qtd)
+            if resultado is None:
+                await pausa("takao", 2)
+                resultado = await extrair_dados_produto(page, codigo, qtd)
+                captura.gravar(resultado)
             if resultado:
                 itens.append(resultado)
 
-            await asyncio.sleep(3)
+            await pausa("takao", 3)
 
-        except:
+        except Exception as e:
+            marcar_falha(execucao, e)
             print(f"⚠️ Produto {codigo} ignorado por instabilidade Takao.")
             await safe_reload(page, motivo="erro Takao")
 
+    await finalizar_itens(execucao, itens)
+
     if itens and salvar_lote_sqlite:
         validos = [r for r in itens if r and r.get("status") != "Não encontrado"]
         if validos:
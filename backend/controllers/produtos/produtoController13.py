@@ -9,6 +9,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import repetir_ate_limpo
+
 
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
@@ -171,7 +177,7 @@ async def extrair_dados_produto(page, codigo_solicitado, quantidade_solicitada=1
 
 
 # ===================== EXECUTOR PRINCIPAL ===================== #
-async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_produtos, execucao=None):
     itens_extraidos = []
     
     if isinstance(login_data_ou_page, (tuple, list)) and len(login_data_ou_page) >= 3:
@@ -195,6 +201,7 @@ async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_prod
     selector_input = "#inpCodigo"
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = str(item.get("codigo", "")).strip()
         qtd = int(item.get("quantidade", 1) or 1)
 
@@ -204,14 +211,17 @@ async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_prod
         try:
             # ==============================================================================
             # 🛡️ ROTINA DE LIMPEZA DE MODAL (SOLICITADA: 3x com intervalo de 1.2s)
+            # No modo por evento para na primeira checagem sem modal (ESPERAS_FIXAS=skypecas volta aos 3x)
             # ==============================================================================
             print("🛡️ Verificando modais antes de digitar...")
-            for tentativa in range(3):
+
+            async def checar_modal(tentativa):
                 fechou = await verificar_e_fechar_modal(page)
                 if fechou:
                     print(f"   ↳ Modal fechado na tentativa {tentativa+1}.")
-                # Intervalo solicitado
-                await asyncio.sleep(1.2)
+                return fechou
+
+            await repetir_ate_limpo("skypecas", checar_modal, 3, 1.2)
             # ==============================================================================
 
             # Aguarda input e clica com FORCE=TRUE para ignorar "pointer events" se sobrar resquício
@@ -254,6 +264,7 @@ async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_prod
             
             else:
                 print("⚠️ Timeout na busca.")
+                marcar_falha(execucao, "timeout na busca")
                 await verificar_e_fechar_modal(page)
                 continue
 
@@ -265,11 +276,14 @@ async def processar_lista_produtos_sequencial_sky(login_data_ou_page, lista_prod
                 print(f"✅ SUCESSO SKY: {resultado['codigo']} | {resultado['preco_formatado']}")
 
         except Exception as e:
+            marcar_falha(execucao, e)
             print(f"❌ Falha crítica no loop Sky ({codigo}): {e}")
             await verificar_e_fechar_modal(page)
             try: await page.reload()
             except: pass
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # Salvamento
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("codigo")]
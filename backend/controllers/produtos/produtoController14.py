@@ -14,6 +14,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
 # ===================== UTILITÁRIOS ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -190,7 +193,7 @@ def preparar_dados_finais(itens):
     }
 
 # ===================== LOOP PRINCIPAL ===================== #
-async def processar_lista_produtos_sequencial14(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial14(login_data_ou_page, lista_produtos, execucao=None):
     global bloqueios_removidos
     bloqueios_removidos = False
 
@@ -202,6 +205,7 @@ async def processar_lista_produtos_sequencial14(login_data_ou_page, lista_produt
     itens = []
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -218,10 +222,13 @@ async def processar_lista_produtos_sequencial14(login_data_ou_page, lista_produt
 
             await asyncio.sleep(0.8)
 
-        except:
+        except Exception as e:
+            marcar_falha(execucao, e)
             print(f"⚠️ Produto {codigo} ignorado por instabilidade.")
             await safe_reload(page, "recuperação")
 
+    await finalizar_itens(execucao, itens)
+
     if itens and salvar_lote_sqlite:
         print(f"⏳ Salvando {len(itens)} itens Pellegrino...")
         salvar_lote_sqlite(preparar_dados_finais(itens))
@@ -11,6 +11,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== CAPTURA DA RESPOSTA JSON DA BUSCA ===================== #
+from services.captura_respostas import CapturaBusca
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -110,13 +116,14 @@ async def fechar_tutorial_se_houver(page):
         pass
 
 # ===================== NAVEGAÇÃO E BUSCA ===================== #
-async def buscar_produto(page, codigo):
+async def buscar_produto(page, codigo, captura=None):
     """
     Busca um produto no Furacão:
     - limpa o campo
     - digita o código
     - Enter
     - aguarda loader (se houver) e/ou resultado
+    Com `captura` (CapturaBusca), o JSON do produto chegando antes do grid encerra a espera.
     """
     try:
         selector_busca = "input#gsearch"
@@ -142,7 +149,18 @@ async def buscar_produto(page, codigo):
         await page.keyboard.press("Enter")
 
         print("⏳ Aguardando resultados...")
+        if captura:
+            await captura.aguardar(aguardar_grid(page))
+        else:
+            await aguardar_grid(page)
+
+    except Exception as e:
+        print(f"❌ Erro na busca Furação: {e}")
+        # Não lança erro aqui para permitir que o loop principal trate com reload
 
+async def aguardar_grid(page):
+    """Espera o grid (RowCtrl) ou o loader da busca, o loader sumir e a folga de renderização."""
+    try:
         # --------- CORREÇÃO CRÍTICA (sem "Task exception was never retrieved") ---------
         # Faz a corrida: ou aparece resultado, ou aparece loading.
         # E sempre "coleta" exceptions das tasks (gather return_exceptions=True).
@@ -166,6 +184,11 @@ async def buscar_produto(page, codigo):
             # IMPORTANTÍSSIMO: aguarda todas para consumir exceptions/cancelamentos
             await asyncio.gather(*done, *pending, return_exceptions=True)
 
+        except asyncio.CancelledError:
+            # JSON da busca chegou antes (CapturaBusca): para de esperar o grid
+            task_result.cancel()
+            task_loading.cancel()
+            raise
         except:
             # Mesmo se der erro aqui, consome tasks para não vazar exception
             try:
@@ -182,9 +205,10 @@ async def buscar_produto(page, codigo):
         # Pequena folga
         await asyncio.sleep(1.5)
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"❌ Erro na busca Furação: {e}")
-        # Não lança erro aqui para permitir que o loop principal trate com reload
 
 # ===================== EXTRAÇÃO DOS DADOS ===================== #
 async def extrair_dados_produto(page, codigo_solicitado, quantidade_solicitada=1):
@@ -321,7 +345,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produtos, execucao=None):
     itens_extraidos = []
 
     # Extração correta do objeto 'page' da tupla de login
@@ -345,6 +369,7 @@ async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produt
         lista_produtos = [{"codigo": lista_produtos, "quantidade": 1}]
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -357,13 +382,22 @@ async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produt
                 if await verificar_e_recuperar_loading(page):
                     continue
 
-                await buscar_produto(page, codigo)
+                async with CapturaBusca(page, "furacao", codigo) as captura:
+                    await buscar_produto(page, codigo, captura)
+
+                # 1.1) Produto veio no JSON da busca: não precisa ler o grid
+                resultado = captura.item(qtd)
+                if resultado:
+                    itens_extraidos.append(resultado)
+                    await asyncio.sleep(1.5)
+                    break
 
                 # 2) Verifica se travou durante a busca
                 if await verificar_e_recuperar_loading(page):
                     continue
 
                 resultado = await extrair_dados_produto(page, codigo, qtd)
+                captura.gravar(resultado)
                 if resultado:
                     itens_extraidos.append(resultado)
 
@@ -373,6 +407,7 @@ async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produt
                 break
 
             except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"❌ Erro crítico no loop F16: {e}")
 
                 # tenta recuperar se for loading
@@ -386,6 +421,8 @@ async def processar_lista_produtos_sequencial16(login_data_ou_page, lista_produt
                     pass
                 break
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # Salvamento
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
@@ -11,6 +11,15 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_resultado, pausa
+
+# ===================== EXTRAÇÃO EM UM page.evaluate ===================== #
+from services.extracao_dom import extrair_primeira
+
 # ===================== UTILITÁRIOS ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -177,8 +186,12 @@ async def buscar_produto(page, codigo):
         if await verificar_e_recuperar_loading(page):
             await navegar_para_pedido(page)
 
-        print("⏳ Aguardando carregamento inicial (10s)...")
-        await asyncio.sleep(10)
+        print("⏳ Aguardando carregamento inicial...")
+        # campo/aba de produtos na tela, sem #loading e sem XHR pendente (teto = os 10s antigos)
+        await esperar_resultado(
+            page, {"campo": "#codPeca", "aba": "a[href='#tabs-2']"}, 10, "odapel",
+            carregando="#loading", aguardar_xhr=True
+        )
 
         await ativar_aba_produtos(page)
 
@@ -200,27 +213,33 @@ async def buscar_produto(page, codigo):
         print(f"⚠️ Falha na busca do produto {codigo}.")
 
 # ===================== EXTRAÇÃO ===================== #
+# Colunas da jqGrid (tr.jqgrow), lidas todas de uma vez (ver services/extracao_dom.py)
+CAMPOS_LINHA = {
+    "codigo": {"coluna": 0, "obrigatorio": True},
+    "nome": {"coluna": 2, "obrigatorio": True},
+    "marca": {"coluna": 3, "obrigatorio": True},
+    "estoque": {"coluna": 7, "obrigatorio": True},
+    "preco": {"coluna": 9, "obrigatorio": True},
+}
+
 async def extrair_dados_produto(page, codigo_solicitado, quantidade=1):
     await ensure_ready(page, timeout=60000, tentar_recuperar=True)
     await fechar_modais_bootstrap(page, "antes da extração")
 
-    linhas = page.locator("tr.jqgrow")
-    if await linhas.count() == 0:
-        print(f"ℹ️ Produto {codigo_solicitado} não encontrado.")
-        return None
-
-    tr = linhas.first
-
     try:
-        cols = tr.locator("td")
-        codigo = (await cols.nth(0).inner_text()).strip()
-        nome = (await cols.nth(2).inner_text()).strip()
-        marca = (await cols.nth(3).inner_text()).strip()
+        linha = await extrair_primeira(page, "tr.jqgrow", CAMPOS_LINHA)
+        if linha is None:
+            print(f"ℹ️ Produto {codigo_solicitado} não encontrado.")
+            return None
 
-        estoque_raw = (await cols.nth(7).inner_text()).strip()
+        codigo = linha["codigo"]
+        nome = linha["nome"]
+        marca = linha["marca"]
+
+        estoque_raw = linha["estoque"]
         qtd_disp = clean_stock(estoque_raw)
 
-        preco_raw = (await cols.nth(9).inner_text()).strip()
+        preco_raw = linha["preco"]
         preco_num = clean_price(preco_raw)
 
         pode_comprar = qtd_disp >= quantidade and preco_num > 0
@@ -258,7 +277,7 @@ def preparar_dados_finais(itens):
     }
 
 # ===================== LOOP PRINCIPAL ===================== #
-async def processar_lista_produtos_sequencial17(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial17(login_data_ou_page, lista_produtos, execucao=None):
     page = login_data_ou_page[2] if isinstance(login_data_ou_page, (tuple, list)) else login_data_ou_page
     if not page:
         print("❌ Page inválida.")
@@ -267,6 +286,7 @@ async def processar_lista_produtos_sequencial17(login_data_ou_page, lista_produt
     itens = []
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -287,10 +307,11 @@ async def processar_lista_produtos_sequencial17(login_data_ou_page, lista_produt
                 if resultado:
                     itens.append(resultado)
 
-                await asyncio.sleep(1)
+                await pausa("odapel", 1)
                 break
 
-            except:
+            except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"⚠️ Produto {codigo} ignorado por instabilidade.")
                 if await verificar_e_recuperar_loading(page):
                     continue
@@ -300,6 +321,8 @@ async def processar_lista_produtos_sequencial17(login_data_ou_page, lista_produt
                     pass
                 break
 
+    await finalizar_itens(execucao, itens)
+
     if itens and salvar_lote_sqlite:
         print(f"⏳ Salvando {len(itens)} itens Odapel...")
         salvar_lote_sqlite(preparar_dados_finais(itens))
@@ -1,4 +1,3 @@
-import asyncio
 import re
 import os
 from datetime import datetime
@@ -11,6 +10,15 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_resultado, pausa
+
+# ===================== EXTRAÇÃO EM UM page.evaluate ===================== #
+from services.extracao_dom import extrair_primeira
+
 # ===================== AUXILIARES DE FORMATAÇÃO ===================== #
 def clean_price(preco_str):
     if not preco_str: return 0.0
@@ -55,10 +63,17 @@ async def buscar_produto(page, codigo):
     await page.keyboard.press("Control+A")
     await page.keyboard.press("Backspace")
     await campo_busca.fill(str(codigo))
-    await page.keyboard.press("Enter")
-    
-    print(f"⌛ Pesquisando {codigo}... aguardando 3s.")
-    await asyncio.sleep(3) 
+
+    print(f"⌛ Pesquisando {codigo}...")
+    # DataTables redesenha as linhas (ou o .dataTables_empty) a cada busca: teto = os 3s antigos
+    await esperar_resultado(
+        page,
+        {"produto": "table tbody tr.odd, table tbody tr.even", "vazio": ".dataTables_empty"},
+        3, "roles",
+        acao=lambda: page.keyboard.press("Enter"),
+        carregando=".dataTables_processing",
+        aguardar_xhr=True,
+    )
     
     try:
         # Espera a tabela atualizar
@@ -66,6 +81,21 @@ async def buscar_produto(page, codigo):
     except: pass
 
 # ===================== EXTRAÇÃO DIRETA DA TABELA (TR) ===================== #
+SELETOR_LINHA = "table tbody tr.odd, table tbody tr.even"
+
+# Campos da linha, lidos todos de uma vez (ver services/extracao_dom.py)
+CAMPOS_LINHA = {
+    "marca": {"sel": "td.dtr-control span.text-truncate", "obrigatorio": True},
+    "nome": {"sel": "td.dtr-control span.font-weight-bold", "obrigatorio": True},
+    "codigo": {"sel": "td.max-w-175px span", "obrigatorio": True},
+    "imagem": {"sel": "img.h-100", "attr": "src"},
+    # Preço (Pegamos o preço da coluna dt-right)
+    "preco": {"sel": "td.dt-right span.font-size-h5", "ultimo": True, "obrigatorio": True},
+    # Disponibilidade: Se houver botão de "Avise-me" (flaticon-bell), está indisponível
+    # Se houver input de quantidade (vit-qtde-table), está disponível
+    "tem_estoque": {"sel": "input.vit-qtde-table", "existe": True},
+}
+
 async def extrair_dados_produto(page, codigo_solicitado, quantidade_solicitada=1):
     await fechar_bloqueios_obrigatorio(page)
 
@@ -85,28 +115,24 @@ async def extrair_dados_produto(page, codigo_solicitado, quantidade_solicitada=1
         }
         return res_vazio
 
-    # 2. Localiza a primeira linha real da tabela
-    tr = page.locator("table tbody tr.odd, table tbody tr.even").first
-    if await tr.count() == 0: return None
-
+    # 2. Primeira linha real da tabela: todos os campos numa ida só ao navegador
     try:
-        # Extração de dados via seletores da linha (TR)
-        marca_text = (await tr.locator("td.dtr-control span.text-truncate").inner_text()).strip()
-        nome_text = (await tr.locator("td.dtr-control span.font-weight-bold").inner_text()).strip()
-        codigo_fab = (await tr.locator("td.max-w-175px span").inner_text()).strip()
+        linha = await extrair_primeira(page, SELETOR_LINHA, CAMPOS_LINHA)
+        if linha is None: return None
+
+        marca_text = linha["marca"]
+        nome_text = linha["nome"]
+        codigo_fab = linha["codigo"]
         
         # Imagem
-        link_img = await tr.locator("img.h-100").first.get_attribute("src")
+        link_img = linha["imagem"]
         if link_img and not link_img.startswith("http"):
             link_img = "https://compreonline.roles.com.br" + link_img
         
-        # Preço (Pegamos o preço da coluna dt-right)
-        preco_raw = await tr.locator("td.dt-right span.font-size-h5").last.inner_text()
+        preco_raw = linha["preco"]
         preco_num = clean_price(preco_raw)
         
-        # Disponibilidade: Se houver botão de "Avise-me" (flaticon-bell), está indisponível
-        # Se houver input de quantidade (vit-qtde-table), está disponível
-        tem_estoque = await tr.locator("input.vit-qtde-table").count() > 0
+        tem_estoque = linha["tem_estoque"]
         
         qtd_disponivel = 0
         if tem_estoque:
@@ -172,7 +198,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== EXECUTOR SEQUENCIAL ===================== #
-async def processar_lista_produtos_sequencial2(page, lista_produtos):
+async def processar_lista_produtos_sequencial2(page, lista_produtos, execucao=None):
     itens_extraidos = []
     
     # Início: garante que está na página de busca
@@ -180,6 +206,7 @@ async def processar_lista_produtos_sequencial2(page, lista_produtos):
         await page.goto("https://compreonline.roles.com.br/", wait_until="networkidle")
     
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         print(f"\n📦 [{idx+1}/{len(lista_produtos)}] Roles -> Buscando: {item['codigo']}")
         try:
             await buscar_produto(page, item["codigo"])
@@ -188,12 +215,15 @@ async def processar_lista_produtos_sequencial2(page, lista_produtos):
             if resultado:
                 itens_extraidos.append(resultado)
             
-            await asyncio.sleep(2) 
+            await pausa("roles", 2)
 
         except Exception as e:
+            marcar_falha(execucao, e)
             print(f"❌ Erro crítico no loop: {e}")
             await page.reload(wait_until="networkidle")
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # ==========================================================
     # 👇👇 SALVAMENTO APENAS NO BANCO DE DADOS 👇👇
     # ==========================================================
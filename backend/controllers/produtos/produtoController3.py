@@ -9,6 +9,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_resultado, pausa
+
 # ===================== AUXILIARES DE FORMATAÇÃO ===================== #
 def clean_price(preco_str):
     if not preco_str: return 0.0
@@ -48,11 +54,17 @@ async def buscar_produto(page, codigo):
         
         await campo.fill(str(codigo))
         await asyncio.sleep(0.5)
-        await page.keyboard.press("Enter")
-        
-        print(f"⌛ Pesquisando {codigo}... aguardando 4s.")
-        await page.wait_for_load_state("networkidle")
-        await asyncio.sleep(4) 
+
+        async def enviar_busca():
+            await page.keyboard.press("Enter")
+            await page.wait_for_load_state("networkidle")
+
+        print(f"⌛ Pesquisando {codigo}...")
+        # A busca recarrega a página: card na página nova ou, sem card, ela parada por 0.8s ("não encontrado")
+        await esperar_resultado(
+            page, {"produto": ".products-list__item .product-card"}, 4, "acaraujo",
+            acao=enviar_busca, estavel_ms=800, nova_pagina=True
+        )
         
     except Exception as e:
         print(f"❌ Erro ao buscar produto: {e}")
@@ -172,7 +184,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== EXECUTOR SEQUENCIAL (AC ARAÚJO) ===================== #
-async def processar_lista_produtos_sequencial3(page, lista_produtos):
+async def processar_lista_produtos_sequencial3(page, lista_produtos, execucao=None):
     itens_extraidos = []
     
     # Validação da página correta
@@ -182,6 +194,7 @@ async def processar_lista_produtos_sequencial3(page, lista_produtos):
 
     # Loop pelos produtos
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         # Pega a quantidade do Excel, ou usa 1 se não tiver
         qtd = item.get("quantidade", 1)
@@ -200,12 +213,15 @@ async def processar_lista_produtos_sequencial3(page, lista_produtos):
                 # Print de validação visual
                 print(f"   ↳ {resultado['nome']} | {resultado['preco_formatado']} | Total: {resultado['valor_total_formatado']}")
             
-            await asyncio.sleep(2) 
+            await pausa("acaraujo", 2)
 
         except Exception as e:
+            marcar_falha(execucao, e)
             print(f"❌ Erro crítico no loop: {e}")
             await page.reload(wait_until="networkidle")
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # ==========================================================
     # 👇👇 SALVAMENTO NO BANCO DE DADOS 👇👇
     # ==========================================================
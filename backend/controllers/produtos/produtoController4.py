@@ -9,6 +9,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
 # ===================== HELPERS GERAIS ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -221,7 +224,7 @@ def preparar_dados_finais(itens):
     }
 
 # ===================== LOOP PRINCIPAL ===================== #
-async def processar_lista_produtos_sequencial4(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial4(login_data_ou_page, lista_produtos, execucao=None):
     page = login_data_ou_page[2] if isinstance(login_data_ou_page, (tuple, list)) else login_data_ou_page
     itens = []
 
@@ -229,6 +232,7 @@ async def processar_lista_produtos_sequencial4(login_data_ou_page, lista_produto
         return []
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -244,13 +248,16 @@ async def processar_lista_produtos_sequencial4(login_data_ou_page, lista_produto
             if resultado:
                 itens.append(resultado)
 
-        except:
+        except Exception as e:
+            marcar_falha(execucao, e)
             print(f"⚠️ Produto {codigo} ignorado por instabilidade.")
 
         finally:
             await voltar_para_lista(page)
             await asyncio.sleep(0.5)
 
+    await finalizar_itens(execucao, itens)
+
     if itens and salvar_lote_sqlite:
         salvar_lote_sqlite(preparar_dados_finais(itens))
 
@@ -9,6 +9,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_resultado, pausa
+
 
 # ===================== AUXILIARES DE FORMATAÇÃO ===================== #
 def clean_price(preco_str):
@@ -340,7 +346,7 @@ def preparar_dados_finais(lista_itens):
 
 
 # ===================== FUNÇÃO PRINCIPAL (NOME FINAL) ===================== #
-async def processar_lista_produtos_jahu(page, lista_produtos, context=None, **kwargs):
+async def processar_lista_produtos_jahu(page, lista_produtos, context=None, execucao=None, **kwargs):
     """
     Fluxo final:
     - Fecha popup IMPORTANTE
@@ -355,6 +361,7 @@ async def processar_lista_produtos_jahu(page, lista_produtos, context=None, **kw
     await resolver_selecao_pos_login(page)
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         await fechar_popup_jahu(page)
 
         codigo = str(item.get("codigo", "")).strip()
@@ -362,8 +369,7 @@ async def processar_lista_produtos_jahu(page, lista_produtos, context=None, **kw
         if not codigo:
             continue
 
-        print(f"\n⏳ Aguardando 3s antes de iniciar a busca do próximo SKU...")
-        await asyncio.sleep(3)
+        await pausa("jahu", 3)
 
         print(f"📦 [{idx+1}/{len(lista_produtos)}] Buscando: {codigo}")
 
@@ -375,9 +381,20 @@ async def processar_lista_produtos_jahu(page, lista_produtos, context=None, **kw
 
             await campo_busca.fill("")
             await campo_busca.type(codigo, delay=80)
-            await page.keyboard.press("Enter")
 
-            await asyncio.sleep(2)
+            # cards novos, "não encontramos", ou a tela de cliente/empresa voltando (teto = os 2s antigos)
+            await esperar_resultado(
+                page,
+                {
+                    "produto": ".up-produto",
+                    "vazio": ".products-empty",
+                    "cliente": "#listClient-main",
+                    "empresa": "#listEmpresa-main",
+                },
+                2, "jahu",
+                acao=lambda: page.keyboard.press("Enter"),
+                aguardar_xhr=True, exigir_texto=True
+            )
             await fechar_popup_jahu(page)
 
             # Se reaparecer tela de seleção (cliente/empresa), resolve e segue
@@ -394,8 +411,11 @@ async def processar_lista_produtos_jahu(page, lista_produtos, context=None, **kw
                 print(f"⚠ Não bateu SKU nos cards para: {codigo}")
 
         except Exception as e:
+            marcar_falha(execucao, e)
             print(f"❌ Erro no loop para o código {codigo}: {e}")
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # ===================== SALVAR NO BANCO (se configurado) ===================== #
     if itens_extraidos:
         validos = [r for r in itens_extraidos if r and r.get("codigo")]
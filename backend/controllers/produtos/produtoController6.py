@@ -15,6 +15,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -430,7 +433,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial6(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial6(login_data_ou_page, lista_produtos, execucao=None):
     global bloqueios_removidos
     bloqueios_removidos = False
 
@@ -462,6 +465,7 @@ async def processar_lista_produtos_sequencial6(login_data_ou_page, lista_produto
         pass
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -491,6 +495,7 @@ async def processar_lista_produtos_sequencial6(login_data_ou_page, lista_produto
                 break
 
             except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"❌ Erro crítico no loop F6: {e}")
                 if await verificar_e_recuperar_loading(page):
                     continue
@@ -501,6 +506,8 @@ async def processar_lista_produtos_sequencial6(login_data_ou_page, lista_produto
                 bloqueios_removidos = False
                 break
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
 
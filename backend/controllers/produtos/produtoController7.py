@@ -1,4 +1,3 @@
-import asyncio
 import re
 from datetime import datetime
 
@@ -10,6 +9,12 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
+# ===================== ESPERAS POR EVENTO ===================== #
+from services.esperas import esperar_resultado
+
 # ===================== AUXILIARES DE FORMATAÇÃO ===================== #
 def clean_price(preco_str):
     if not preco_str: return 0.0
@@ -123,11 +128,12 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== EXECUTOR SEQUENCIAL ===================== #
-async def processar_lista_produtos_sequencial1(page, lista_produtos):
+async def processar_lista_produtos_sequencial1(page, lista_produtos, execucao=None):
     itens_extraidos = []
     selector_input = "#search-cod-fab-input"
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = str(item['codigo']).strip()
         print(f"\n📦 [{idx+1}/{len(lista_produtos)}] RMP -> Buscando: {codigo}")
         
@@ -139,11 +145,17 @@ async def processar_lista_produtos_sequencial1(page, lista_produtos):
             await page.keyboard.press("Control+A")
             await page.keyboard.press("Backspace")
             await campo.type(codigo, delay=100)
-            await page.keyboard.press("Enter")
-            
-            # 2. Aguarda o carregamento
-            await page.wait_for_load_state("networkidle")
-            await asyncio.sleep(2) 
+
+            async def enviar_busca():
+                await page.keyboard.press("Enter")
+                await page.wait_for_load_state("networkidle")
+
+            # 2. Aguarda o carregamento (lista de produtos ou aviso, já na página nova; teto = os 2s antigos)
+            await esperar_resultado(
+                page,
+                {"produto": "ol.product-items > li.product-item", "vazio": ".message.notice"},
+                2, "rmp", acao=enviar_busca, nova_pagina=True
+            )
 
             # 3. Extração
             resultado = await extrair_dados_produto(page, codigo, item["quantidade"])
@@ -153,9 +165,12 @@ async def processar_lista_produtos_sequencial1(page, lista_produtos):
                 print(f"✅ Extraído: {resultado['nome']} | Preço: {resultado['preco_formatado']}")
 
         except Exception as e:
+            marcar_falha(execucao, e)
             print(f"❌ Falha no loop RMP: {e}")
             await page.reload()
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # ==========================================================
     # 👇👇 SALVAMENTO APENAS NO BANCO DE DADOS 👇👇
     # ==========================================================
@@ -12,6 +12,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, marcar_falha, finalizar_itens
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str:
@@ -153,6 +156,7 @@ async def buscar_produto(page, codigo):
     - prepara a tela (fecha overlay, garante loading ok)
     - evita depender de state=visible
     - faz retries curtos controlados
+    Retorna False se desistiu (a tela não ficou pronta): o SKU conta como falha, não como "não encontrado".
     """
     try:
         for tentativa in range(1, 4):
@@ -236,13 +240,15 @@ async def buscar_produto(page, codigo):
                 print("🔄 Loading travou após Enter. Recuperado, repetindo busca...")
                 continue
 
-            return
+            return True
 
         print("❌ Erro na busca SAMA: não foi possível preparar a tela/campo após 3 tentativas.")
 
     except Exception as e:
         print(f"❌ Erro na busca SAMA: {e}")
 
+    return False
+
 # ===================== EXTRAÇÃO DOS DADOS ===================== #
 async def extrair_dados_produto(page, codigo_solicitado, quantidade_solicitada=1):
 
@@ -353,7 +359,7 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produtos):
+async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produtos, execucao=None):
     global bloqueios_removidos
     bloqueios_removidos = False
 
@@ -384,6 +390,7 @@ async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produto
     #     pass
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
 
@@ -394,7 +401,10 @@ async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produto
                 if await verificar_e_recuperar_loading(page):
                     continue
 
-                await buscar_produto(page, codigo)
+                if not await buscar_produto(page, codigo):
+                    # vai para a fila de retentativa do fim do fornecedor
+                    marcar_falha(execucao, "busca SAMA não ficou pronta")
+                    break
 
                 if await verificar_e_recuperar_loading(page):
                     continue
@@ -408,6 +418,7 @@ async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produto
                 break
 
             except Exception as e:
+                marcar_falha(execucao, e)
                 print(f"❌ Erro crítico no loop F8: {e}")
 
                 if await verificar_e_recuperar_loading(page):
@@ -420,6 +431,8 @@ async def processar_lista_produtos_sequencial8(login_data_ou_page, lista_produto
                 bloqueios_removidos = False
                 break
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     if itens_extraidos and salvar_lote_sqlite:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
 
@@ -9,6 +9,9 @@ except ImportError:
     print("⚠️ Aviso: 'services.db_saver' não encontrado. O salvamento no banco será pulado.")
     salvar_lote_sqlite = None
 
+# ===================== ACOMPANHAMENTO DA EXECUÇÃO (checkpoints) ===================== #
+from services.execucao_fornecedor import acompanhar_item, finalizar_itens
+
 # ===================== AUXILIARES ===================== #
 def clean_price(preco_str):
     if not preco_str: return 0.0
@@ -173,8 +176,13 @@ def preparar_dados_finais(lista_itens):
     }
 
 # ===================== MAIN LOOP ===================== #
-async def processar_lista_produtos_sequencial9(login_data, lista_produtos):
-    browser, context, page_inicial = login_data
+async def processar_lista_produtos_sequencial9(login_data_ou_page, lista_produtos, execucao=None):
+    # Aceita (browser, context, page) ou só a page (runner / sharding passam a page)
+    if isinstance(login_data_ou_page, (tuple, list)):
+        browser, context, page_inicial = login_data_ou_page
+    else:
+        page_inicial = login_data_ou_page
+        context = page_inicial.context
     
     itens_extraidos = []
     
@@ -185,6 +193,7 @@ async def processar_lista_produtos_sequencial9(login_data, lista_produtos):
         lista_produtos = [{"codigo": lista_produtos, "quantidade": 1}]
 
     for idx, item in enumerate(lista_produtos):
+        await acompanhar_item(execucao, idx, item, itens_extraidos)
         codigo = item["codigo"]
         qtd = item.get("quantidade", 1)
         
@@ -209,6 +218,8 @@ async def processar_lista_produtos_sequencial9(login_data, lista_produtos):
         else:
             print("⚠️ Produto não encontrado ou erro na abertura.")
 
+    await finalizar_itens(execucao, itens_extraidos)
+
     # SALVAMENTO
     if itens_extraidos:
         validos = [r for r in itens_extraidos if r and r.get("status") != "Não encontrado"]
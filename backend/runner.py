@@ -1,7 +1,34 @@
 import asyncio
+import os
+import time
+import uuid
 from playwright.async_api import async_playwright
 
 from utils.xlsx_loader import get_latest_xlsx, load_produtos_from_xlsx
+from services.browser_pool import BrowserPool
+from services.sessoes import restaurar_sessao, salvar_sessao, validar_sessao
+from services.bloqueio_rede import aplicar_bloqueio
+from services.perfis_lancamento import (
+    NAVEGADOR_HEADLESS, perfil_lancamento, fallback_headed_ativo, registrar_fallback_headed, headed_disponivel
+)
+from services.circuit_breaker import FornecedorAbortado
+from services.sharding import processar_em_abas
+from services.historico import garantir_tabela_historico, estimar_duracoes, simular_agenda, registrar_historico
+from services.checkpoints import (
+    garantir_tabelas_checkpoint, iniciar_execucao, finalizar_execucao,
+    carregar_execucao_retomavel, descartar_parciais, marcar_itens_frescos, descartar_execucao
+)
+from services.multiprocesso import executar_em_processos
+from services.fila_jobs import garantir_tabela_jobs, enfileirar_execucao
+from services.frescor import TTL_FRESCOR_HORAS, garantir_tabela_consultas, indices_frescos, codigos_da_lista
+from services.execucao_fornecedor import ExecucaoFornecedor, RETENTATIVA_MAX_RODADAS, RETENTATIVA_BACKOFF_S
+from services.controle_execucao import TIMEOUT_FECHAR_S, registrar_controle, remover_controle
+from services.esperas import modo_espera, resumo_esperas, zerar_esperas
+from services.captura_respostas import resumo_captura, zerar_captura, esquecer_requisicao
+from services.http_direto import http_direto_ativo, modelo_da_busca, extrair_via_http, resumo_http, zerar_http
+from services.reciclagem_paginas import embrulhar_pagina, pagina_monitorada, resumo_reciclagem, zerar_reciclagem
+from services.sink_itens import SinkLote, filtrar_itens
+from services.db_saver import salvar_lote_sqlite, remover_itens_fora_da_lista
 
 # -------------------------
 # LOGINS (FORNECEDORES)
@@ -30,7 +57,7 @@ from controllers.produtos.produtoController1 import processar_lista_produtos_par
 from controllers.produtos.produtoController2 import processar_lista_produtos_sequencial2
 from controllers.produtos.produtoController3 import processar_lista_produtos_sequencial3
 from controllers.produtos.produtoController4 import processar_lista_produtos_sequencial4
-from controllers.produtos.produtoController5 import processar_lista_produtos_acaraujo
+from controllers.produtos.produtoController5 import processar_lista_produtos_jahu
 from controllers.produtos.produtoController6 import processar_lista_produtos_sequencial6
 from controllers.produtos.produtoController7 import processar_lista_produtos_sequencial1
 from controllers.produtos.produtoController8 import processar_lista_produtos_sequencial8
@@ -43,96 +70,859 @@ from controllers.produtos.produtoController14 import processar_lista_produtos_se
 from controllers.produtos.produtoController16 import processar_lista_produtos_sequencial16
 from controllers.produtos.produtoController17 import processar_lista_produtos_sequencial17
 
+# -------------------------
+# MONTAGEM DO LOTE (usada para salvar resultados parciais na retomada)
+# -------------------------
+from controllers.produtos.produtoController1 import preparar_dados_finais as preparar_portalcomdip
+from controllers.produtos.produtoController2 import preparar_dados_finais as preparar_roles
+from controllers.produtos.produtoController3 import preparar_dados_finais as preparar_acaraujo
+from controllers.produtos.produtoController4 import preparar_dados_finais as preparar_gb
+from controllers.produtos.produtoController5 import preparar_dados_finais as preparar_jahu
+from controllers.produtos.produtoController6 import preparar_dados_finais as preparar_laguna
+from controllers.produtos.produtoController7 import preparar_dados_finais as preparar_rmp
+from controllers.produtos.produtoController8 import preparar_dados_finais as preparar_sama
+from controllers.produtos.produtoController9 import preparar_dados_finais as preparar_solroom
+from controllers.produtos.produtoController10 import preparar_dados_finais as preparar_suportematriz
+from controllers.produtos.produtoController11 import preparar_dados_finais as preparar_dpk
+from controllers.produtos.produtoController12 import preparar_dados_finais as preparar_takao
+from controllers.produtos.produtoController13 import preparar_dados_finais as preparar_skypecas
+from controllers.produtos.produtoController14 import preparar_dados_finais as preparar_pellegrino
+from controllers.produtos.produtoController16 import preparar_dados_finais as preparar_furacao
+from controllers.produtos.produtoController17 import preparar_dados_finais as preparar_odapel
+
+
+# Processos que dividem os fornecedores (1 = tudo no event loop atual)
+PROCESSOS_FORNECEDORES = int(os.getenv("PROCESSOS_FORNECEDORES", "1"))
+
 
 # ============================================================
 # ✅ TESTE DE LOGIN
 # ============================================================
-async def testar_login(login_func, playwright_instance, timeout_segundos=60):
+async def testar_login(login_func, playwright_instance, timeout_segundos=60, chave_sessao=None):
+    """
+    Retorna (ok, browser, context, page, erro, info).
+    info = {"sessao_reutilizada": bool, "tempo_login_s": float}
+
+    Com chave_sessao, tenta primeiro a sessão salva (storage_state) e só cai no
+    login_* completo se ela não existir/tiver expirado. Login completo OK => salva a sessão.
+    """
+    inicio = time.perf_counter()
+    info = {"sessao_reutilizada": False, "tempo_login_s": 0.0}
+
+    def _fim(ok, browser, context, page, erro):
+        info["tempo_login_s"] = round(time.perf_counter() - inicio, 2)
+        return (ok, browser, context, page, erro, info)
+
     try:
+        if chave_sessao:
+            restaurada = await restaurar_sessao(playwright_instance, chave_sessao)
+            if restaurada:
+                info["sessao_reutilizada"] = True
+                browser, context, page = restaurada
+                return _fim(True, browser, context, page, "")
+
         browser, context, page = await asyncio.wait_for(
             login_func(playwright_instance),
             timeout=timeout_segundos
         )
 
         if not browser or not context or not page:
-            return (False, browser, context, page, "Login não retornou browser/context/page válidos")
+            return _fim(False, browser, context, page, "Login não retornou browser/context/page válidos")
 
         if page.is_closed():
-            return (False, browser, context, page, "Page veio fechada após login")
+            return _fim(False, browser, context, page, "Page veio fechada após login")
+
+        if chave_sessao:
+            await salvar_sessao(chave_sessao, browser, context, page)
 
-        return (True, browser, context, page, "")
+        return _fim(True, browser, context, page, "")
 
     except asyncio.TimeoutError:
-        return (False, None, None, None, f"Timeout no login ({timeout_segundos}s)")
+        return _fim(False, None, None, None, f"Timeout no login ({timeout_segundos}s)")
     except Exception as e:
-        return (False, None, None, None, str(e))
+        return _fim(False, None, None, None, str(e))
 
 
 # ============================================================
-# ✅ EXECUTA 1 FORNECEDOR (com limite de concorrência)
+# ⚙️ CONFIG DOS FORNECEDORES
 # ============================================================
-async def executar_fornecedor(config, playwright_instance, lista_produtos, sem):
+def montar_fornecedores_config():
+    # "abas": quantas abas (mesmo contexto logado) dividem a lista no modo sequencial.
+    # "ttl_horas" (opcional): frescor próprio no modo incremental (padrão TTL_FRESCOR_HORAS).
+    # "filtro_lote": quais itens o controller gravava no banco (ver services/sink_itens.py; padrão "encontrados").
+    # Fica em 1 onde o portal não aguenta/guarda estado global por aba (Laguna, Sama, Pellegrino, GB, Jahu, PLS).
+    # "bloqueio_rede" (opcional): perfil de context.route no scraping (ver services/bloqueio_rede.py;
+    # padrão BLOQUEIO_REDE_PERFIL="completo": aborta imagens, mídia, fontes e rastreadores).
+    # "http_direto": busca é um endpoint JSON; depois do 1º SKU o resto vai em requisições diretas
+    # com os cookies do contexto (ver services/http_direto.py), com o navegador de fallback.
+    return [
+        {"chave": "portalcomdip", "nome": "Fornecedor 1 (PortalComDip)", "login_func": login_portalcomdip, "process_func": processar_lista_produtos_parallel, "preparar_func": preparar_portalcomdip, "filtro_lote": "sem_erro", "tipo": "parallel", "http_direto": True},
+        {"chave": "roles", "nome": "Fornecedor 2 (Roles)", "login_func": login_roles, "process_func": processar_lista_produtos_sequencial2, "preparar_func": preparar_roles, "filtro_lote": "com_codigo", "tipo": "sequencial", "abas": 3},
+        {"chave": "acaraujo", "nome": "Fornecedor 3 (Acaraujo)", "login_func": login_acaraujo, "process_func": processar_lista_produtos_sequencial3, "preparar_func": preparar_acaraujo, "filtro_lote": "com_codigo", "tipo": "sequencial", "abas": 2},
+        {"chave": "gb", "nome": "Fornecedor 4 (GB)", "login_func": login_fornecedor4, "process_func": processar_lista_produtos_sequencial4, "preparar_func": preparar_gb, "filtro_lote": "todos", "tipo": "sequencial"},
+        {"chave": "jahu", "nome": "Fornecedor 5 (Jahu)", "login_func": login_jahu, "process_func": processar_lista_produtos_jahu, "preparar_func": preparar_jahu, "filtro_lote": "com_codigo", "tipo": "sequencial"},
+        {"chave": "laguna", "nome": "Fornecedor 6 (Laguna)", "login_func": login_laguna_bypass, "process_func": processar_lista_produtos_sequencial6, "preparar_func": preparar_laguna, "tipo": "sequencial"},
+        {"chave": "rmp", "nome": "Fornecedor 7 (RMP)", "login_func": login_rmp, "process_func": processar_lista_produtos_sequencial1, "preparar_func": preparar_rmp, "filtro_lote": "com_codigo", "tipo": "sequencial", "abas": 3},
+        {"chave": "sama", "nome": "Fornecedor 8 (Sama)", "login_func": login_sama_bypass, "process_func": processar_lista_produtos_sequencial8, "preparar_func": preparar_sama, "tipo": "sequencial"},
+        {"chave": "solroom", "nome": "Fornecedor 9 (Solroom)", "login_func": login_solroom, "process_func": processar_lista_produtos_sequencial9, "preparar_func": preparar_solroom, "tipo": "sequencial", "abas": 2},
+        {"chave": "suportematriz", "nome": "Fornecedor 10 (Matriz)", "login_func": login_matriz_bypass, "process_func": processar_lista_produtos_sequencial10, "preparar_func": preparar_suportematriz, "tipo": "sequencial", "abas": 2},
+        {"chave": "dpk", "nome": "Fornecedor 11 (DPK)", "login_func": login_dpk_bypass, "process_func": processar_lista_produtos_sequencial11, "preparar_func": preparar_dpk, "tipo": "sequencial", "abas": 2, "http_direto": True},
+        {"chave": "takao", "nome": "Fornecedor 12 (Takao)", "login_func": login_takao_bypass, "process_func": processar_lista_produtos_sequencial12, "preparar_func": preparar_takao, "tipo": "sequencial", "abas": 2, "http_direto": True},
+        {"chave": "skypecas", "nome": "Fornecedor 13 (Skypecas)", "login_func": login_skypecas, "process_func": processar_lista_produtos_sequencial_sky, "preparar_func": preparar_skypecas, "filtro_lote": "com_codigo", "tipo": "sequencial", "abas": 2},
+        {"chave": "pellegrino", "nome": "Fornecedor 14 (Sky/Pellegrino)", "login_func": login_sky_bypass, "process_func": processar_lista_produtos_sequencial14, "preparar_func": preparar_pellegrino, "filtro_lote": "todos", "tipo": "sequencial"},
+        {"chave": "furacao", "nome": "Fornecedor 16 (Furacao)", "login_func": login_furacao_bypass, "process_func": processar_lista_produtos_sequencial16, "preparar_func": preparar_furacao, "tipo": "sequencial", "abas": 2, "http_direto": True},
+        {"chave": "odapel", "nome": "Fornecedor 17 (PLS/Odapel)", "login_func": login_pls_bypass, "process_func": processar_lista_produtos_sequencial17, "preparar_func": preparar_odapel, "filtro_lote": "todos", "tipo": "sequencial"},
+    ]
+
+
+def _resultado_fornecedor(config, login_ok, erro="", itens=0, info_login=None, tempos=None, execucao=None):
+    """
+    Só contadores/status: os itens já estão no banco (sink ou save do controller). É isto que
+    atravessa a fila de resultados dos processos e vai para o resultado_json do job.
+    """
+    resultado = {
+        "chave": config.get("chave"),
+        "fornecedor": config["nome"],
+        "login_ok": login_ok,
+        "erro": erro,
+        "itens": execucao.itens if execucao else itens,
+        "modo_espera": modo_espera(config.get("chave")),
+        **(info_login or {"sessao_reutilizada": False, "tempo_login_s": 0.0}),
+        **(tempos or {}),
+    }
+    if execucao:
+        resultado["contadores"] = execucao.resumo()
+    esperas = resumo_esperas(config.get("chave"))
+    if esperas:
+        resultado["esperas"] = esperas
+    captura = resumo_captura(config.get("chave"))
+    if captura:
+        resultado["captura"] = captura
+    http = resumo_http(config.get("chave"))
+    if http:
+        resultado["http_direto"] = http
+    reciclagem = resumo_reciclagem(config.get("chave"))
+    if reciclagem:
+        resultado["reciclagem"] = reciclagem
+    return resultado
+
+
+def _anotar_rede(resultado, sessao):
+    """Contadores do bloqueio de rede (services/bloqueio_rede.py) no resultado do fornecedor."""
+    if sessao.get("bloqueio"):
+        resultado["rede"] = sessao["bloqueio"].resumo()
+    return resultado
+
+
+def criar_execucao(config, execucao_id, total):
+    """Checkpoint por SKU + sink que grava os itens em micro-lotes com o preparar_dados_finais do controller."""
+    sink = None
+    if config.get("preparar_func"):
+        sink = SinkLote(config["nome"], config["preparar_func"], config.get("filtro_lote", "encontrados"))
+    return ExecucaoFornecedor(execucao_id, config["chave"], config["nome"], total, config.get("indices"), sink=sink)
+
+
+# ============================================================
+# 🔐 ETAPA 1: LOGIN
+# ============================================================
+async def logar_fornecedor(config, playwright_instance):
     nome = config["nome"]
+    chave = config.get("chave")
+    print(f"\n--- 🔐 Login: {nome} ---")
 
-    async with sem:
-        print(f"\n--- 🚀 Iniciando: {nome} ---")
+    # headless por padrão; headed se o fornecedor já caiu no fallback (services/perfis_lancamento.py)
+    headed = bool(chave) and fallback_headed_ativo(chave)
+    with perfil_lancamento(chave, headed=headed):
+        ok, browser, context, page, erro_login, info_login = await testar_login(
+            config["login_func"], playwright_instance, timeout_segundos=60,
+            chave_sessao=chave
+        )
 
-        browser = None
-        try:
-            ok, browser, context, page, erro_login = await testar_login(
+    if not ok and not headed and chave and NAVEGADOR_HEADLESS and headed_disponivel():
+        # login headless barrado (detecção de bot, captcha, layout diferente): tenta com janela
+        print(f"🖥️ Login headless de {nome} falhou ({erro_login}). Tentando headed...")
+        if browser:
+            try:
+                await browser.close()
+            except:
+                pass
+        with perfil_lancamento(chave, headed=True):
+            ok, browser, context, page, erro_headed, info_login = await testar_login(
                 config["login_func"], playwright_instance, timeout_segundos=60
             )
+        if ok:
+            headed = True
+            registrar_fallback_headed(chave, erro_login)
+            await salvar_sessao(chave, browser, context, page)
+        else:
+            erro_login = f"{erro_login} | headed: {erro_headed}"
+    info_login["navegador"] = "headed" if headed else "headless"
+
+    bloqueio = None
+    if ok:
+        origem = "sessão reaproveitada" if info_login["sessao_reutilizada"] else "login completo"
+        print(f"✅ Login {nome} realizado ({origem}, {info_login['tempo_login_s']}s).")
+        # o login carrega tudo; no scraping, imagens/fontes/rastreadores são abortados
+        bloqueio = await aplicar_bloqueio(context, config.get("bloqueio_rede"), nome)
+    else:
+        print(f"❌ Falha no login de {nome}: {erro_login}. Pulando...")
+        if browser:
+            try:
+                await browser.close()
+            except:
+                pass
+
+    return {
+        "config": config,
+        "ok": ok,
+        "erro": erro_login,
+        "browser": browser,
+        "context": context,
+        "page": page,
+        "url": page.url if ok else None,
+        "info_login": info_login,
+        "bloqueio": bloqueio,
+    }
+
+
+# ============================================================
+# 🧯 RECUPERAÇÃO (circuito aberto no meio do scraping)
+# ============================================================
+async def _injetar_sessao(context, estado):
+    """Passa cookies/localStorage de um login novo para o contexto em uso (as abas dos loops continuam as mesmas)."""
+    await context.add_cookies(estado.get("cookies") or [])
+    for origem in estado.get("origins") or []:
+        itens = {i["name"]: i["value"] for i in origem.get("localStorage") or []}
+        if not itens:
+            continue
+        for aba in context.pages:
+            try:
+                if (aba.url or "").startswith(origem["origin"]):
+                    await aba.evaluate(
+                        "(itens) => { for (const [k, v] of Object.entries(itens)) localStorage.setItem(k, v); }",
+                        itens
+                    )
+            except:
+                pass
+
+
+async def recuperar_fornecedor(sessao, playwright_instance):
+    """
+    Retorna "saudavel" (portal respondeu e a sessão vale), "relogado" (sessão caiu,
+    login novo injetado no contexto) ou None (portal fora / login falhou).
+    """
+    config = sessao["config"]
+    chave = config.get("chave")
+    context = sessao["context"]
+
+    aba = None
+    try:
+        aba = await context.new_page()
+        await aba.goto(sessao.get("url") or sessao["page"].url, wait_until="domcontentloaded", timeout=30000)
+        if await validar_sessao(aba, chave):
+            return "saudavel"
+        print(f"🔐 {config['nome']}: portal no ar, mas a sessão caiu. Relogando...")
+    except Exception as e:
+        print(f"⚠️ {config['nome']}: portal não respondeu ({e}).")
+        return None
+    finally:
+        if aba is not None:
+            try:
+                await aba.close()
+            except:
+                pass
+
+    with perfil_lancamento(chave):
+        ok, browser, novo_context, _, erro, _ = await testar_login(config["login_func"], playwright_instance, timeout_segundos=60)
+    try:
+        if not ok:
+            print(f"❌ {config['nome']}: relogin falhou ({erro}).")
+            return None
+        await _injetar_sessao(context, await novo_context.storage_state())
+        if chave:
+            await salvar_sessao(chave, browser, novo_context, sessao["page"])
+        return "relogado"
+    finally:
+        if browser:
+            try:
+                await browser.close()
+            except:
+                pass
+
+
+# ============================================================
+# 📦 ETAPA 2: SCRAPING
+# ============================================================
+async def extrair_fornecedor(config, context, page, lista_produtos, execucao=None):
+    """Retorna quantos itens o fornecedor gravou (a lista fica no banco, não em memória)."""
+    nome = config["nome"]
+    print(f"\n--- 🚀 Extraindo: {nome} ---")
+    zerar_esperas(config.get("chave"))
+    zerar_captura(config.get("chave"))
+    zerar_http(config.get("chave"))
+    zerar_reciclagem(config.get("chave"))
+
+    # sequenciais: a page pode ser trocada por uma nova entre SKUs (services/reciclagem_paginas.py)
+    page = embrulhar_pagina(config, context, page)
+
+    if config.get("http_direto") and http_direto_ativo(config["chave"]) and len(lista_produtos) > 1:
+        qtd = await extrair_com_http(config, context, page, lista_produtos, execucao)
+    else:
+        dados_fornecedor = await extrair_pelo_navegador(config, context, page, lista_produtos, execucao)
+        qtd = len(dados_fornecedor) if dados_fornecedor else 0
+
+    if execucao:
+        # os itens foram para o banco pelo sink: só a contagem segue adiante
+        await repetir_falhas(config, context, page, execucao)
+        await execucao.descarregar()
+        qtd = execucao.itens
+    if qtd:
+        print(f"📥 {qtd} itens processados em {nome}.")
+    else:
+        print(f"⚠️ Nenhum dado retornado de {nome}.")
+
+    return qtd
 
-            if not ok:
-                print(f"❌ Falha no login de {nome}: {erro_login}. Pulando...")
-                return {
-                    "fornecedor": nome,
-                    "login_ok": False,
-                    "erro": erro_login,
-                    "itens": 0,
-                    "dados": []
-                }
-
-            print(f"✅ Login {nome} realizado. Extraindo dados...")
-
-            if config["tipo"] == "parallel":
-                dados_fornecedor = await config["process_func"](context, lista_produtos, batch_size=5)
-            else:
-                dados_fornecedor = await config["process_func"](page, lista_produtos)
-
-            qtd = len(dados_fornecedor) if dados_fornecedor else 0
-
-            if qtd:
-                print(f"📥 {qtd} itens processados em {nome}.")
-            else:
-                print(f"⚠️ Nenhum dado retornado de {nome}.")
-
-            return {
-                "fornecedor": nome,
-                "login_ok": True,
-                "erro": "",
-                "itens": qtd,
-                "dados": dados_fornecedor or []
-            }
+
+async def extrair_pelo_navegador(config, context, page, lista_produtos, execucao=None, offset=0):
+    """Fluxo normal do controller; `offset` = posição de `lista_produtos` na lista do fornecedor."""
+    if config["tipo"] == "parallel":
+        if execucao is None:
+            return await config["process_func"](context, lista_produtos, batch_size=5)
+        return await config["process_func"](
+            context, lista_produtos, batch_size=5, execucao=execucao.fatia(offset)
+        )
+
+    # "abas" > 1 => lista dividida em várias abas do mesmo contexto logado
+    return await processar_em_abas(
+        config["process_func"], context, page, lista_produtos,
+        n_abas=config.get("abas", 1), nome=config["nome"], execucao=execucao, offset_base=offset,
+        envolver_pagina=page.irma if pagina_monitorada(page) else None
+    )
+
+
+async def extrair_com_http(config, context, page, lista_produtos, execucao=None):
+    """
+    Modo HTTP direto: o 1º SKU vai pelo navegador (a CapturaBusca aprende a requisição
+    da busca), o resto vai em requisições diretas pelo context.request e o que falhar
+    volta para o navegador. Sem requisição reaproveitável, segue tudo pelo navegador.
+    Retorna quantos itens saíram (sem execucao; com ela a conta é execucao.itens): os
+    itens já foram gravados, a lista do fornecedor não fica em memória.
+    """
+    chave, nome = config["chave"], config["nome"]
+    esquecer_requisicao(chave)
+    total = 0
+
+    def _contar(novos):
+        nonlocal total
+        total += len(novos) if novos else 0
+
+    _contar(await extrair_pelo_navegador(config, context, page, lista_produtos[:1], execucao))
+    modelo = modelo_da_busca(chave)
+    if modelo is None:
+        print(f"🌐 {nome}: busca não reaproveitável via HTTP. Seguindo pelo navegador.")
+        _contar(await extrair_pelo_navegador(config, context, page, lista_produtos[1:], execucao, offset=1))
+        return total
+
+    print(f"⚡ {nome}: HTTP direto em {modelo.resumo()} para {len(lista_produtos) - 1} SKUs...")
+    itens, para_navegador = await extrair_via_http(
+        chave, nome, context.request, modelo, list(enumerate(lista_produtos))[1:], execucao
+    )
+    if itens:
+        # sem sink ninguém grava estes (os controllers só gravam o que eles mesmos extraíram)
+        validos = filtrar_itens(itens, config.get("filtro_lote", "encontrados"))
+        if validos and config.get("preparar_func"):
+            try:
+                salvar_lote_sqlite(config["preparar_func"](validos))
+            except Exception as e:
+                print(f"⚠️ {nome}: falha ao salvar os itens do HTTP direto: {e}")
+        _contar(itens)
+
+    if para_navegador:
+        print(f"🌐 {nome}: {len(para_navegador)} SKUs voltam para o navegador.")
+        sublista = [item for _, item in para_navegador]
+        fatia = execucao.fatia(mapa=[indice for indice, _ in para_navegador], pagina=pagina_monitorada(page)) if execucao else None
+        if config["tipo"] == "parallel":
+            _contar(await config["process_func"](context, sublista, batch_size=5, execucao=fatia))
+        else:
+            if page.is_closed():
+                page = await context.new_page()
+            _contar(await config["process_func"](page, sublista, execucao=fatia))
+    return total
+
+
+async def repetir_falhas(config, context, page, execucao):
+    """
+    Fila de retentativa do fornecedor: os SKUs que deram erro na passada são refeitos
+    no mesmo contexto logado (sem novo login), até RETENTATIVA_MAX_RODADAS rodadas com
+    backoff. O que continuar falhando fica com status "erro" (retomável). Os itens vão
+    para o banco pelo sink da execução; nada é devolvido.
+    """
+    nome = config["nome"]
+
+    for rodada in range(1, RETENTATIVA_MAX_RODADAS + 1):
+        fila = execucao.fila_retentativa()
+        if not fila:
+            break
+
+        espera = RETENTATIVA_BACKOFF_S * 2 ** (rodada - 1)
+        print(f"🔁 {nome}: {len(fila)} SKUs com falha. Rodada {rodada}/{RETENTATIVA_MAX_RODADAS} em {espera:.0f}s...")
+        await asyncio.sleep(espera)
+
+        sublista = [item for _, item in fila]
+        fatia = execucao.fatia(mapa=[indice for indice, _ in fila], pagina=pagina_monitorada(page))
+        if config["tipo"] == "parallel":
+            await config["process_func"](context, sublista, batch_size=5, execucao=fatia)
+        else:
+            if page.is_closed():
+                page = await context.new_page()
+            await config["process_func"](page, sublista, execucao=fatia)
+
+    if execucao.retentados:
+        print(f"🔁 {nome}: {execucao.recuperados}/{execucao.retentados} retentativas recuperadas"
+              f"{f', {len(execucao.falhados)} SKUs seguem com erro' if execucao.falhados else ''}.")
+
+
+async def fechar_sessao(sessao):
+    browser = sessao.get("browser")
+    if browser:
+        # pode ser chamado duas vezes (cancelamento na fila de prontos + worker)
+        sessao["browser"] = None
+        try:
+            # Com o pool, fecha só os contextos deste fornecedor (o Chromium é compartilhado).
+            # Com prazo: num cancelamento a página pode estar travada numa navegação.
+            await asyncio.wait_for(browser.close(), timeout=TIMEOUT_FECHAR_S)
+            print(f"🔒 Contextos de {sessao['config']['nome']} fechados.")
+        except:
+            pass
+
+
+# ============================================================
+# ✅ EXECUTA 1 FORNECEDOR (login + scraping no mesmo slot)
+# ============================================================
+async def executar_fornecedor(config, playwright_instance, lista_produtos, sem, execucao_id=None):
+    """
+    Usado pelo worker da fila de jobs (worker.py). config["lista_produtos"]/["indices"]
+    sobrescrevem a lista, como no pipeline.
+    """
+    nome = config["nome"]
+    lista_produtos = config.get("lista_produtos", lista_produtos)
+    execucao = None
+    if execucao_id:
+        execucao = criar_execucao(config, execucao_id, len(lista_produtos))
+        execucao.marcar_status("em_andamento")
+
+    async with sem:
+        sessao = {"config": config, "browser": None}
+        try:
+            sessao = await logar_fornecedor(config, playwright_instance)
+            if not sessao["ok"]:
+                if execucao:
+                    execucao.marcar_status("falhou")
+                return _resultado_fornecedor(config, False, sessao["erro"], info_login=sessao["info_login"])
+
+            if execucao:
+                execucao.recuperar_func = lambda: recuperar_fornecedor(sessao, playwright_instance)
+            inicio = time.perf_counter()
+            qtd = await extrair_fornecedor(config, sessao["context"], sessao["page"], lista_produtos, execucao)
+            tempos = {"tempo_fila_s": 0.0, "tempo_scraping_s": round(time.perf_counter() - inicio, 2)}
+            if execucao:
+                execucao.concluir()
+            return _anotar_rede(_resultado_fornecedor(config, True, "", qtd, sessao["info_login"], tempos, execucao), sessao)
 
         except Exception as e:
             print(f"🔥 Erro crítico ao processar {nome}: {str(e)}")
-            return {
-                "fornecedor": nome,
-                "login_ok": False,
-                "erro": str(e),
-                "itens": 0,
-                "dados": []
-            }
+            if execucao:
+                await execucao.descarregar()
+                execucao.marcar_status("falhou")
+            return _anotar_rede(
+                _resultado_fornecedor(config, False, str(e), info_login=sessao.get("info_login"), execucao=execucao),
+                sessao
+            )
 
         finally:
-            if browser:
-                await browser.close()
-                print(f"🔒 Navegador de {nome} fechado.")
+            await fechar_sessao(sessao)
 
 
-async def main(concorrencia_fornecedores=5):
-    async with async_playwright() as p:
+# ============================================================
+# 🔀 PIPELINE: logins (limite próprio) -> fila de prontos -> scraping (limite próprio)
+# ============================================================
+async def executar_pipeline(fornecedores_config, playwright_instance, lista_produtos,
+                            concorrencia_login=5, concorrencia_scraping=5, prioridades=None,
+                            execucao_id=None, controle=None):
+    """
+    Um login travado (timeout de 60s, 3 tentativas) só ocupa vaga de LOGIN;
+    um fornecedor raspando 800 SKUs só ocupa vaga de SCRAPING.
+    A fila de prontos tem o tamanho do limite de scraping para a sessão não ficar
+    esfriando (e expirando) muito tempo antes de ser usada.
+
+    Logins começam na ordem de fornecedores_config; na fila de prontos sai primeiro
+    quem tem maior scraping previsto (prioridades = {chave: segundos}).
+
+    Com execucao_id, cada fornecedor grava checkpoint por SKU. config["lista_produtos"]
+    (+ config["indices"]) sobrescreve a lista do run; é assim que a retomada manda só os pendentes.
+
+    Com controle (ControleExecucao), login e scraping de cada fornecedor rodam como tasks
+    canceláveis: o fornecedor cancelado grava o que já raspou e fica retomável.
+    """
+    prioridades = prioridades or {}
+    inicio_run = time.perf_counter()
+    sem_login = asyncio.Semaphore(concorrencia_login)
+    fila_prontos = asyncio.PriorityQueue(maxsize=concorrencia_scraping)
+    resultados = {}
+    marcos = {"fim_logins": None, "inicio_scraping": None, "fim_scraping": None}
+
+    def _agora():
+        return time.perf_counter() - inicio_run
+
+    def _nova_execucao(config):
+        if not execucao_id:
+            return None
+        lista = config.get("lista_produtos", lista_produtos)
+        return criar_execucao(config, execucao_id, len(lista))
+
+    def _cancelado(config):
+        return controle is not None and controle.cancelado(config.get("chave"))
+
+    async def _rodar(config, coro):
+        if controle is None:
+            return await coro
+        return await controle.rodar(config.get("chave"), coro)
+
+    async def _registrar_cancelado(sessao, execucao, tempos=None):
+        config = sessao["config"]
+        print(f"🛑 {config['nome']} cancelado.")
+        if execucao:
+            # o que já foi raspado vai para o banco; o resto fica para a retomada
+            await execucao.descarregar()
+            execucao.marcar_status("cancelado")
+        resultado = _resultado_fornecedor(
+            config, bool(sessao.get("ok")), "cancelado", 0, sessao.get("info_login"),
+            dict(tempos or {}, concluido_fim_s=round(_agora(), 1)), execucao
+        )
+        resultado["cancelado"] = True
+        resultados[sessao["ordem"]] = resultado
+
+    async def etapa_login(ordem, config):
+        nome = config["nome"]
+        sessao = {"config": config, "browser": None, "ordem": ordem}
+        execucao = _nova_execucao(config)
+        if execucao:
+            execucao.marcar_status("em_andamento")
+        if controle is not None:
+            controle.registrar_execucao(config.get("chave"), execucao)
+        try:
+            async with sem_login:
+                if not _cancelado(config):
+                    sessao = await _rodar(config, logar_fornecedor(config, playwright_instance))
+        except asyncio.CancelledError:
+            if not _cancelado(config):
+                raise
+            # login interrompido: o que o login_* já tinha aberto não voltou em `sessao`
+            fechar_fornecedor = getattr(playwright_instance, "fechar_fornecedor", None)
+            if fechar_fornecedor and config.get("chave"):
+                try:
+                    await asyncio.wait_for(fechar_fornecedor(config["chave"]), timeout=TIMEOUT_FECHAR_S)
+                except:
+                    pass
+        except Exception as e:
+            sessao.update({"ok": False, "erro": str(e), "info_login": None})
+
+        if _cancelado(config):
+            sessao["ordem"] = ordem
+            await _registrar_cancelado(sessao, execucao)
+            await fechar_sessao(sessao)
+            return
+
+        if not sessao["ok"]:
+            if execucao:
+                execucao.marcar_status("falhou")
+            # falha reportada na hora, sem esperar o resto do run
+            resultados[ordem] = _resultado_fornecedor(
+                config, False, sessao["erro"], info_login=sessao["info_login"],
+                tempos={"concluido_fim_s": round(_agora(), 1)}
+            )
+            await fechar_sessao(sessao)
+            return
+
+        sessao["ordem"] = ordem
+        sessao["pronto_em"] = time.perf_counter()
+        sessao["execucao"] = execucao
+        if execucao:
+            execucao.recuperar_func = lambda: recuperar_fornecedor(sessao, playwright_instance)
+        if controle is not None:
+            # cancelado enquanto espera vaga/worker: fecha os contextos na hora, não quando o worker pegar
+            controle.aguardar_scraping(config.get("chave"), lambda: fechar_sessao(sessao))
+        prioridade = -prioridades.get(config.get("chave"), 0.0)
+        await fila_prontos.put((prioridade, ordem, sessao))
+        print(f"📥 {nome} na fila de scraping ({fila_prontos.qsize()} aguardando).")
+
+    async def worker_scraping(worker_id):
+        while True:
+            _, _, sessao = await fila_prontos.get()
+            if sessao is None:
+                break
+
+            config = sessao["config"]
+            nome = config["nome"]
+            inicio = time.perf_counter()
+            if marcos["inicio_scraping"] is None:
+                marcos["inicio_scraping"] = _agora()
+
+            tempos = {"tempo_fila_s": round(inicio - sessao["pronto_em"], 2)}
+            execucao = sessao.get("execucao")
+            if controle is not None:
+                controle.iniciar_scraping(config.get("chave"))
+            try:
+                if _cancelado(config):
+                    # cancelado enquanto esperava na fila de prontos
+                    await _registrar_cancelado(sessao, execucao, tempos)
+                    continue
+                qtd = await _rodar(config, extrair_fornecedor(
+                    config, sessao["context"], sessao["page"],
+                    config.get("lista_produtos", lista_produtos), execucao
+                ))
+                tempos["tempo_scraping_s"] = round(time.perf_counter() - inicio, 2)
+                tempos["concluido_fim_s"] = round(_agora(), 1)
+                resultados[sessao["ordem"]] = _resultado_fornecedor(
+                    config, True, "", qtd, sessao["info_login"], tempos, execucao
+                )
+                if execucao:
+                    execucao.concluir()
+            except asyncio.CancelledError:
+                if not _cancelado(config):
+                    raise
+                tempos["tempo_scraping_s"] = round(time.perf_counter() - inicio, 2)
+                await _registrar_cancelado(sessao, execucao, tempos)
+            except Exception as e:
+                if isinstance(e, FornecedorAbortado):
+                    print(f"🛑 {nome} interrompido pelo circuito: {e}")
+                else:
+                    print(f"🔥 Erro crítico ao processar {nome}: {str(e)}")
+                if execucao:
+                    # o que já foi raspado antes do erro não se perde
+                    await execucao.descarregar()
+                    execucao.marcar_status("falhou")
+                tempos["tempo_scraping_s"] = round(time.perf_counter() - inicio, 2)
+                tempos["concluido_fim_s"] = round(_agora(), 1)
+                resultados[sessao["ordem"]] = _resultado_fornecedor(
+                    config, True, str(e), 0, sessao["info_login"], tempos, execucao
+                )
+            finally:
+                if sessao["ordem"] in resultados:
+                    _anotar_rede(resultados[sessao["ordem"]], sessao)
+                await fechar_sessao(sessao)
+                marcos["fim_scraping"] = _agora()
+
+    workers = [asyncio.create_task(worker_scraping(w)) for w in range(concorrencia_scraping)]
+
+    try:
+        await asyncio.gather(*(etapa_login(i, cfg) for i, cfg in enumerate(fornecedores_config)))
+        marcos["fim_logins"] = _agora()
+        for w in range(len(workers)):
+            await fila_prontos.put((float("inf"), w, None))
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+
+    ordenados = [resultados[i] for i in sorted(resultados)]
+
+    etapas = {
+        "total_s": round(_agora(), 2),
+        "login_s": round(marcos["fim_logins"] or 0.0, 2),
+        "scraping_s": round((marcos["fim_scraping"] or 0.0) - (marcos["inicio_scraping"] or 0.0), 2),
+        "soma_login_s": round(sum(r.get("tempo_login_s", 0.0) for r in ordenados), 2),
+        "soma_fila_s": round(sum(r.get("tempo_fila_s", 0.0) for r in ordenados), 2),
+        "soma_scraping_s": round(sum(r.get("tempo_scraping_s", 0.0) for r in ordenados), 2),
+        "concorrencia_login": concorrencia_login,
+        "concorrencia_scraping": concorrencia_scraping,
+    }
+    return ordenados, etapas
+
+
+def agendar_fornecedores(fornecedores_config, n_itens, concorrencia_login, concorrencia_scraping):
+    """
+    Agenda LPT (longest processing time first): quem tem maior duração prevista
+    (login + tempo_por_item histórico x itens) loga e raspa primeiro, para PLS/Takao
+    não começarem por último e esticarem o run inteiro.
+    Retorna (config_ordenada, prioridades_scraping, previsto_fim).
+    """
+    garantir_tabela_historico()
+    chaves = [c["chave"] for c in fornecedores_config]
+    estimativas = estimar_duracoes(chaves)
+
+    # na retomada cada fornecedor só tem os SKUs pendentes
+    itens_por_chave = {c["chave"]: len(c.get("lista_produtos", ())) if "lista_produtos" in c else n_itens for c in fornecedores_config}
+    previsto_scraping = {ch: estimativas[ch]["por_item_s"] * itens_por_chave[ch] for ch in chaves}
+    previsto_total = {ch: estimativas[ch]["login_s"] + previsto_scraping[ch] for ch in chaves}
+
+    ordenada = sorted(fornecedores_config, key=lambda c: previsto_total[c["chave"]], reverse=True)
+    previsto_fim = simular_agenda(
+        [(c["chave"], estimativas[c["chave"]]["login_s"], previsto_scraping[c["chave"]]) for c in ordenada],
+        concorrencia_login, concorrencia_scraping
+    )
+
+    print("🗓️ Agenda LPT (previsão de término):")
+    for c in ordenada:
+        amostras = estimativas[c["chave"]]["amostras"]
+        origem = f"{amostras} runs" if amostras else "sem histórico"
+        print(f"   • {c['nome']}: ~{previsto_fim[c['chave']] / 60:.1f} min ({origem})")
+
+    return ordenada, previsto_scraping, previsto_fim
+
+
+# ============================================================
+# ⏯️ RETOMADA (checkpoints por SKU)
+# ============================================================
+def _salvar_parciais(config, parciais):
+    """Resultados que ficaram só no checkpoint (micro-lote que não chegou ao banco)."""
+    validos = filtrar_itens(parciais, config.get("filtro_lote", "encontrados"))
+    if not validos:
+        return 0
+    try:
+        salvar_lote_sqlite(config["preparar_func"](validos))
+        print(f"💾 {config['nome']}: {len(validos)} itens do run interrompido salvos.")
+    except Exception as e:
+        print(f"⚠️ {config['nome']}: falha ao salvar itens do run interrompido: {e}")
+        return 0
+    return len(validos)
+
+
+def preparar_retomada(fornecedores_config):
+    """
+    Monta o run a partir do último checkpoint não concluído.
+    Retorna (execucao_id, lista_produtos, configs_pendentes, resumo) ou None se não há o que retomar.
+    Cada config pendente recebe "lista_produtos"/"indices" só com os SKUs que faltam.
+    """
+    garantir_tabelas_checkpoint()
+    checkpoint = carregar_execucao_retomavel()
+    if not checkpoint or not checkpoint["lista_produtos"]:
+        return None
+
+    lista_produtos = checkpoint["lista_produtos"]
+    pendentes = []
+    resumo = {"concluidos": 0, "retomados": 0, "skus_pulados": 0, "itens_parciais_salvos": 0}
+
+    for config in fornecedores_config:
+        info = checkpoint["fornecedores"].get(config["chave"]) or {"status": None, "concluidos": set(), "parciais": []}
+        if info["status"] == "concluido":
+            resumo["concluidos"] += 1
+            continue
+
+        indices = [i for i in range(len(lista_produtos)) if i not in info["concluidos"]]
+        if not indices:
+            resumo["concluidos"] += 1
+            continue
+
+        if info["parciais"]:
+            resumo["itens_parciais_salvos"] += _salvar_parciais(config, info["parciais"])
+            descartar_parciais(checkpoint["execucao_id"], config["chave"])
+        resumo["skus_pulados"] += len(lista_produtos) - len(indices)
+        resumo["retomados"] += 1
+
+        config = dict(config)
+        config["indices"] = indices
+        config["lista_produtos"] = [lista_produtos[i] for i in indices]
+        pendentes.append(config)
+
+    print(f"⏯️ Retomando run {checkpoint['execucao_id']}: {resumo['retomados']} fornecedores pendentes, "
+          f"{resumo['concluidos']} já concluídos, {resumo['skus_pulados']} SKUs já feitos pulados.")
+    return checkpoint["execucao_id"], lista_produtos, pendentes, resumo
+
+
+# ============================================================
+# 🕒 MODO INCREMENTAL (TTL por fornecedor)
+# ============================================================
+def remover_obsoletos(config, lista_produtos):
+    """
+    O incremental não limpa o banco: tira os itens do fornecedor que vieram de códigos fora da
+    planilha atual (uploads anteriores). O que a busca de um código da lista devolveu com outro
+    código fica (ver codigos_da_lista).
+    """
+    if not config.get("preparar_func"):
+        return 0
+    manter = codigos_da_lista(config["chave"], lista_produtos)
+    if manter is None:
+        return 0
+    lote = config["preparar_func"]([])
+    removidos = remover_itens_fora_da_lista(lote.get("fornecedor") or lote.get("fornecedror"), manter) or 0
+    if removidos:
+        print(f"🧹 {config['nome']}: {removidos} itens de códigos fora da planilha atual removidos.")
+    return removidos
+
+
+def aplicar_frescor(fornecedores_config, lista_produtos, execucao_id):
+    """
+    Tira de cada fornecedor os códigos consultados há menos de "ttl_horas" (resultado ok/vazio
+    e mesma quantidade). Códigos novos, vencidos ou que deram erro continuam na lista.
+    Fornecedor sem nada pendente nem faz login. Itens de códigos que não estão mais na
+    planilha saem do banco (remover_obsoletos).
+    Retorna (configs_pendentes, resumo).
+    """
+    garantir_tabela_consultas()
+    pendentes = []
+    resumo = {"ttl_padrao_h": TTL_FRESCOR_HORAS, "consultas_evitadas": 0, "fornecedores_pulados": 0,
+              "itens_removidos": 0, "por_fornecedor": {}}
+
+    for config in fornecedores_config:
+        chave = config["chave"]
+        resumo["itens_removidos"] += remover_obsoletos(config, lista_produtos)
+        ttl = config.get("ttl_horas", TTL_FRESCOR_HORAS)
+        frescos = indices_frescos(chave, lista_produtos, ttl)
+
+        resumo["consultas_evitadas"] += len(frescos)
+        resumo["por_fornecedor"][chave] = len(frescos)
+
+        if frescos:
+            marcar_itens_frescos(execucao_id, chave, frescos)
+
+        indices = [i for i in range(len(lista_produtos)) if i not in frescos]
+        if not indices:
+            resumo["fornecedores_pulados"] += 1
+            ExecucaoFornecedor(execucao_id, chave, config["nome"], 0).marcar_status("concluido")
+            print(f"🕒 {config['nome']}: todos os {len(lista_produtos)} códigos ainda frescos (TTL {ttl}h). Pulado.")
+            continue
+
+        if frescos:
+            config = dict(config)
+            config["indices"] = indices
+            config["lista_produtos"] = [lista_produtos[i] for i in indices]
+            print(f"🕒 {config['nome']}: {len(frescos)} códigos frescos pulados, {len(indices)} a consultar.")
+        pendentes.append(config)
+
+    print(f"🕒 Incremental: {resumo['consultas_evitadas']} consultas evitadas pelo TTL, "
+          f"{resumo['fornecedores_pulados']} fornecedores sem nada a consultar, "
+          f"{resumo['itens_removidos']} itens fora da planilha removidos.")
+    return pendentes, resumo
+
+
+def preparar_execucao(modo="completo", execucao_id=None):
+    """
+    Monta a lista e os fornecedores do run conforme o modo (ver main).
+    Retorna {"execucao_id", "lista_produtos", "fornecedores", "retomada", "frescor"},
+    {"erro": ...} ou {"resposta": ...} quando não sobra nada a fazer.
+    """
+    retomada = None
+    frescor = None
+
+    if modo == "retomar":
+        dados_retomada = preparar_retomada(montar_fornecedores_config())
+        if not dados_retomada:
+            return {"erro": "Nenhum processamento interrompido para retomar"}
+
+        execucao_id, lista_produtos, fornecedores_pendentes, resumo_retomada = dados_retomada
+        retomada = resumo_retomada
+        if not fornecedores_pendentes:
+            finalizar_execucao(execucao_id, "concluida")
+            return {"resposta": {
+                "status": "ok",
+                "execucao_id": execucao_id,
+                "total_processado": resumo_retomada["itens_parciais_salvos"],
+                "relatorio": {"fornecedores_total": 0, "logins_ok": 0, "logins_falha": 0, "retomada": resumo_retomada}
+            }}
+    else:
+        execucao_id = execucao_id or uuid.uuid4().hex[:8]
 
         # 1) Buscar XLSX mais recente
         pasta_temp = "data/temp"
@@ -150,63 +940,368 @@ async def main(concorrencia_fornecedores=5):
 
         print(f"📦 {len(lista_produtos)} produtos carregados para processamento.")
 
-        fornecedores_config = [
-            {"nome": "Fornecedor 1 (PortalComDip)", "login_func": login_portalcomdip, "process_func": processar_lista_produtos_parallel, "tipo": "parallel"},
-            {"nome": "Fornecedor 2 (Roles)", "login_func": login_roles, "process_func": processar_lista_produtos_sequencial2, "tipo": "sequencial"},
-            {"nome": "Fornecedor 3 (Acaraujo)", "login_func": login_acaraujo, "process_func": processar_lista_produtos_sequencial3, "tipo": "sequencial"},
-            {"nome": "Fornecedor 4 (GB)", "login_func": login_fornecedor4, "process_func": processar_lista_produtos_sequencial4, "tipo": "sequencial"},
-            {"nome": "Fornecedor 5 (Jahu)", "login_func": login_jahu, "process_func": processar_lista_produtos_acaraujo, "tipo": "sequencial"},
-            {"nome": "Fornecedor 6 (Laguna)", "login_func": login_laguna_bypass, "process_func": processar_lista_produtos_sequencial6, "tipo": "sequencial"},
-            {"nome": "Fornecedor 7 (RMP)", "login_func": login_rmp, "process_func": processar_lista_produtos_sequencial1, "tipo": "sequencial"},
-            {"nome": "Fornecedor 8 (Sama)", "login_func": login_sama_bypass, "process_func": processar_lista_produtos_sequencial8, "tipo": "sequencial"},
-            {"nome": "Fornecedor 9 (Solroom)", "login_func": login_solroom, "process_func": processar_lista_produtos_sequencial9, "tipo": "sequencial"},
-            {"nome": "Fornecedor 10 (Matriz)", "login_func": login_matriz_bypass, "process_func": processar_lista_produtos_sequencial10, "tipo": "sequencial"},
-            {"nome": "Fornecedor 11 (DPK)", "login_func": login_dpk_bypass, "process_func": processar_lista_produtos_sequencial11, "tipo": "sequencial"},
-            {"nome": "Fornecedor 12 (Takao)", "login_func": login_takao_bypass, "process_func": processar_lista_produtos_sequencial12, "tipo": "sequencial"},
-            {"nome": "Fornecedor 13 (Skypecas)", "login_func": login_skypecas, "process_func": processar_lista_produtos_sequencial_sky, "tipo": "sequencial"},
-            {"nome": "Fornecedor 14 (Sky/Pellegrino)", "login_func": login_sky_bypass, "process_func": processar_lista_produtos_sequencial14, "tipo": "sequencial"},
-            {"nome": "Fornecedor 16 (Furacao)", "login_func": login_furacao_bypass, "process_func": processar_lista_produtos_sequencial16, "tipo": "sequencial"},
-            {"nome": "Fornecedor 17 (PLS/Odapel)", "login_func": login_pls_bypass, "process_func": processar_lista_produtos_sequencial17, "tipo": "sequencial"},
-        ]
-
-        sem = asyncio.Semaphore(concorrencia_fornecedores)
-
-        # Dispara tudo, mas o semaphore limita para 3 ao mesmo tempo
-        tarefas = [
-            executar_fornecedor(cfg, p, lista_produtos, sem)
-            for cfg in fornecedores_config
-        ]
-
-        resultados_fornecedores = await asyncio.gather(*tarefas)
-
-        # Consolidação final
-        todos_resultados = []
-        status_fornecedores = []
-
-        for r in resultados_fornecedores:
-            status_fornecedores.append({
+        fornecedores_pendentes = montar_fornecedores_config()
+        garantir_tabelas_checkpoint()
+        iniciar_execucao(execucao_id, lista_produtos)
+
+        if modo == "incremental":
+            fornecedores_pendentes, frescor = aplicar_frescor(fornecedores_pendentes, lista_produtos, execucao_id)
+
+    return {
+        "execucao_id": execucao_id,
+        "lista_produtos": lista_produtos,
+        "fornecedores": fornecedores_pendentes,
+        "retomada": retomada,
+        "frescor": frescor,
+    }
+
+
+def fechar_execucao(execucao_id):
+    """Run só deixa de ser retomável quando todos os fornecedores terminaram sem pendência."""
+    pendencias = carregar_execucao_retomavel()
+    incompletos = [
+        ch for ch, info in ((pendencias or {}).get("fornecedores") or {}).items()
+        if info["status"] != "concluido"
+    ] if pendencias and pendencias["execucao_id"] == execucao_id else []
+    finalizar_execucao(execucao_id, "incompleta" if incompletos else "concluida")
+    if incompletos:
+        print(f"⏯️ Run {execucao_id} ficou incompleto ({', '.join(incompletos)}). Use o modo 'retomar'.")
+    return incompletos
+
+
+def enfileirar_processamento(modo="completo", execucao_id=None):
+    """
+    Em vez de rodar aqui, grava 1 job por fornecedor na fila (services/fila_jobs.py)
+    para os workers (worker.py, em quantas máquinas/processos houver) consumirem.
+    """
+    preparo = preparar_execucao(modo, execucao_id)
+    if "erro" in preparo:
+        return preparo
+    if "resposta" in preparo:
+        return preparo["resposta"]
+
+    garantir_tabela_consultas()
+    garantir_tabela_jobs()
+
+    # prioridade da fila = scraping previsto (LPT): o worker livre pega o fornecedor mais longo
+    fornecedores_config, prioridades, _ = agendar_fornecedores(
+        preparo["fornecedores"], len(preparo["lista_produtos"]), 1, 1
+    )
+    if not enfileirar_execucao(preparo["execucao_id"], fornecedores_config, preparo["lista_produtos"], prioridades):
+        return {"erro": "Falha ao enfileirar jobs"}
+
+    return {
+        "status": "enfileirado",
+        "execucao_id": preparo["execucao_id"],
+        "jobs": len(fornecedores_config),
+        "retomada": preparo["retomada"],
+        "frescor": preparo["frescor"],
+    }
+
+
+async def executar_em_pool(fornecedores_config, lista_produtos, concorrencia_login,
+                           concorrencia_scraping, prioridades, execucao_id, controle=None):
+    """
+    Playwright + BrowserPool + pipeline para um grupo de fornecedores (no processo atual).
+    Sem controle (processo filho), registra um próprio para receber o cancelamento do pai.
+    """
+    controle_proprio = controle is None
+    if controle_proprio:
+        controle = registrar_controle(execucao_id)
+
+    async with async_playwright() as p:
+        # Um (ou poucos) Chromium para todos; cada fornecedor ganha seu próprio BrowserContext
+        pool = BrowserPool(p)
+
+        try:
+            resultados, etapas = await executar_pipeline(
+                fornecedores_config, pool.proxy(), lista_produtos,
+                concorrencia_login=concorrencia_login,
+                concorrencia_scraping=concorrencia_scraping,
+                prioridades=prioridades,
+                execucao_id=execucao_id,
+                controle=controle
+            )
+        finally:
+            resumo_pool = pool.resumo()
+            await pool.fechar()
+            if controle_proprio:
+                remover_controle(execucao_id)
+
+    return resultados, etapas, resumo_pool
+
+
+# ============================================================
+# 🎯 ATUALIZAÇÃO PONTUAL (poucos fornecedores x poucos códigos)
+# ============================================================
+def montar_lista_atualizacao(codigos):
+    """
+    codigos = ["31968", ...] ou [{"codigo", "quantidade"}, ...]. Sem quantidade, usa a
+    do XLSX mais recente (qtdSolicitada/valor_total iguais aos do run completo) ou 1.
+    """
+    quantidades = {}
+    if any(not isinstance(c, dict) or not c.get("quantidade") for c in codigos):
+        ultimo_arquivo = get_latest_xlsx("data/temp")
+        if ultimo_arquivo:
+            try:
+                quantidades = {p["codigo"]: p["quantidade"] for p in load_produtos_from_xlsx(ultimo_arquivo)}
+            except Exception as e:
+                print(f"⚠️ Não foi possível ler quantidades do XLSX ({e}). Usando 1.")
+
+    lista_produtos = []
+    vistos = set()
+    for c in codigos:
+        codigo = str(c.get("codigo") if isinstance(c, dict) else c).strip().split(".")[0]
+        if not codigo or codigo in vistos:
+            continue
+        vistos.add(codigo)
+        quantidade = c.get("quantidade") if isinstance(c, dict) else None
+        try:
+            quantidade = max(1, int(quantidade or quantidades.get(codigo) or 1))
+        except (TypeError, ValueError):
+            quantidade = 1
+        lista_produtos.append({"codigo": codigo, "quantidade": quantidade})
+    return lista_produtos
+
+
+async def atualizar_fornecedores(chaves, lista_produtos, controle=None):
+    """
+    Roda só `chaves` x `lista_produtos` pelo mesmo login/processamento do run completo.
+    Os itens vão para o banco pelo sink (upsert por fornecedor + código), então o dataset
+    atual é mesclado, não apagado. O checkpoint usa um execucao_id avulso que é descartado
+    no fim: o run retomável (se houver) continua intacto.
+    controle = ControleExecucao reservado pela rota (POST /processar/cancel), como no main.
+    """
+    por_chave = {c["chave"]: c for c in montar_fornecedores_config()}
+    desconhecidas = [ch for ch in chaves if ch not in por_chave]
+    if desconhecidas:
+        return {"erro": f"Fornecedores desconhecidos: {', '.join(desconhecidas)}"}
+    if not lista_produtos:
+        return {"erro": "Nenhum código válido para atualizar"}
+
+    # poucos SKUs: uma aba por fornecedor basta (abrir shards custaria mais que raspar)
+    fornecedores_config = [dict(por_chave[ch], abas=1) for ch in dict.fromkeys(chaves)]
+    execucao_id = f"atualizacao-{uuid.uuid4().hex[:6]}"
+    garantir_tabelas_checkpoint()
+    garantir_tabela_consultas()
+
+    print(f"🎯 Atualização pontual {execucao_id}: {len(lista_produtos)} códigos em "
+          f"{', '.join(c['nome'] for c in fornecedores_config)}.")
+
+    controle = registrar_controle(execucao_id, controle)
+    if controle.cancelado_tudo:
+        remover_controle(execucao_id)
+        descartar_execucao(execucao_id)
+        print(f"🛑 Atualização pontual {execucao_id} cancelada antes de começar.")
+        return {"status": "cancelado", "execucao_id": execucao_id, "total_processado": 0, "detalhes": []}
+
+    # login e scraping de todos os fornecedores ao mesmo tempo: a lista é pequena
+    n = len(fornecedores_config)
+    try:
+        resultados, etapas, resumo_pool = await executar_em_pool(
+            fornecedores_config, lista_produtos, n, n, {}, execucao_id, controle
+        )
+    finally:
+        remover_controle(execucao_id)
+        descartar_execucao(execucao_id)
+
+    return {
+        "status": "cancelado" if controle.cancelado_tudo else "ok",
+        "execucao_id": execucao_id,
+        "total_processado": sum(r["itens"] for r in resultados),
+        "codigos": [p["codigo"] for p in lista_produtos],
+        "tempo_total_s": etapas.get("total_s", 0.0),
+        "detalhes": [
+            {
+                "chave": r["chave"],
                 "fornecedor": r["fornecedor"],
                 "login_ok": r["login_ok"],
                 "erro": r["erro"],
-                "itens": r["itens"]
-            })
-            if r["dados"]:
-                todos_resultados.extend(r["dados"])
+                "itens": r["itens"],
+                "tempo_login_s": r.get("tempo_login_s", 0.0),
+                "tempo_scraping_s": r.get("tempo_scraping_s", 0.0),
+                "contadores": r.get("contadores"),
+            }
+            for r in resultados
+        ],
+    }
+
+
+async def main(concorrencia_fornecedores=5, concorrencia_login=None, execucao_id=None, modo="completo",
+               processos=None, controle=None):
+    """
+    concorrencia_fornecedores = limite da etapa de scraping.
+    concorrencia_login = limite da etapa de login (padrão: igual ao de scraping).
+    processos = quantos processos dividem os fornecedores (padrão: PROCESSOS_FORNECEDORES ou 1).
+      Os limites de login/scraping continuam globais e são repartidos entre os processos.
+    modo = "completo" (lê o XLSX e começa do zero), "incremental" (lê o XLSX e só consulta
+    o que não está fresco, ver aplicar_frescor) ou "retomar" (continua o último
+    run interrompido, só com os fornecedores/SKUs que faltaram).
+    controle = ControleExecucao reservado pela rota junto com o run: um cancelamento pedido
+    durante a preparação já vem marcado nele e o run para antes do primeiro login.
+    """
+    concorrencia_login = concorrencia_login or concorrencia_fornecedores
+    processos = int(processos or PROCESSOS_FORNECEDORES)
+
+    preparo = preparar_execucao(modo, execucao_id)
+    if "erro" in preparo:
+        return preparo
+    if "resposta" in preparo:
+        return preparo["resposta"]
+
+    execucao_id = preparo["execucao_id"]
+    lista_produtos = preparo["lista_produtos"]
+    fornecedores_pendentes = preparo["fornecedores"]
+    retomada = preparo["retomada"]
+    frescor = preparo["frescor"]
+
+    # toda consulta alimenta o TTL do próximo run incremental, qualquer que seja o modo
+    garantir_tabela_consultas()
 
-        total_ok = sum(1 for s in status_fornecedores if s["login_ok"])
-        total_fail = len(status_fornecedores) - total_ok
+    fornecedores_config, prioridades, previsto_fim = agendar_fornecedores(
+        fornecedores_pendentes, len(lista_produtos),
+        concorrencia_login, concorrencia_fornecedores
+    )
 
+    # handle do run: POST /processar/cancel chega aqui (services/controle_execucao.py)
+    controle = registrar_controle(execucao_id, controle)
+    if controle.cancelado_tudo:
+        remover_controle(execucao_id)
+        print(f"🛑 Run {execucao_id} cancelado antes do primeiro login. Use o modo 'retomar' para rodá-lo.")
         return {
-            "status": "ok",
-            "total_processado": len(todos_resultados),
-            "dados": todos_resultados,
+            "status": "cancelado",
+            "execucao_id": execucao_id,
+            "total_processado": 0,
             "relatorio": {
-                "fornecedores_total": len(status_fornecedores),
-                "logins_ok": total_ok,
-                "logins_falha": total_fail,
-                "detalhes": status_fornecedores
+                "fornecedores_total": len(fornecedores_config),
+                "logins_ok": 0,
+                "logins_falha": 0,
+                "retomada": retomada,
+                "frescor": frescor,
+                "cancelamento": dict(controle.resumo(), cancelados=[c["nome"] for c in fornecedores_config]),
             }
         }
+    try:
+        if processos > 1 and len(fornecedores_config) > 1:
+            # cada processo: event loop + Playwright + BrowserPool próprios, com um grupo de fornecedores
+            resultados_fornecedores, etapas, resumo_pool = await executar_em_processos(
+                fornecedores_config, lista_produtos, processos,
+                concorrencia_login, concorrencia_fornecedores,
+                prioridades, execucao_id, controle
+            )
+        else:
+            resultados_fornecedores, etapas, resumo_pool = await executar_em_pool(
+                fornecedores_config, lista_produtos,
+                concorrencia_login, concorrencia_fornecedores,
+                prioridades, execucao_id, controle
+            )
+    finally:
+        remover_controle(execucao_id)
+
+    itens_por_chave = {c["chave"]: len(c.get("lista_produtos", lista_produtos)) for c in fornecedores_config}
+    for r in resultados_fornecedores:
+        r["previsto_fim_s"] = previsto_fim.get(r["chave"])
+        r["itens_solicitados"] = itens_por_chave.get(r["chave"], len(lista_produtos))
+    registrar_historico(execucao_id, resultados_fornecedores, len(lista_produtos))
+
+    fechar_execucao(execucao_id)
+
+    # Consolidação final (só contadores: os itens foram gravados em micro-lotes durante o scraping)
+    status_fornecedores = []
+
+    for r in resultados_fornecedores:
+        status_fornecedores.append({
+            "fornecedor": r["fornecedor"],
+            "login_ok": r["login_ok"],
+            "erro": r["erro"],
+            "itens": r["itens"],
+            "sessao_reutilizada": r.get("sessao_reutilizada", False),
+            "tempo_login_s": r.get("tempo_login_s", 0.0),
+            "tempo_fila_s": r.get("tempo_fila_s", 0.0),
+            "tempo_scraping_s": r.get("tempo_scraping_s", 0.0),
+            "previsto_fim_s": r.get("previsto_fim_s"),
+            "concluido_fim_s": r.get("concluido_fim_s"),
+            "cancelado": r.get("cancelado", False),
+            "rede": r.get("rede"),
+            "esperas": r.get("esperas"),
+            "captura": r.get("captura"),
+            "http_direto": r.get("http_direto"),
+            "reciclagem": r.get("reciclagem"),
+            "contadores": r.get("contadores")
+        })
+
+    retentativas = {
+        "retentados": sum((s.get("contadores") or {}).get("retentados", 0) for s in status_fornecedores),
+        "recuperados": sum((s.get("contadores") or {}).get("recuperados", 0) for s in status_fornecedores),
+    }
+
+    circuitos = {
+        s["fornecedor"]: s["contadores"]["circuito"]
+        for s in status_fornecedores
+        if s.get("contadores") and s["contadores"].get("circuito")
+    }
+
+    total_ok = sum(1 for s in status_fornecedores if s["login_ok"])
+    total_fail = len(status_fornecedores) - total_ok
+    sessoes_reutilizadas = sum(1 for s in status_fornecedores if s["sessao_reutilizada"])
+
+    return {
+        "status": "cancelado" if controle.cancelado_tudo else "ok",
+        "execucao_id": execucao_id,
+        "total_processado": sum(s["itens"] for s in status_fornecedores),
+        "relatorio": {
+            "fornecedores_total": len(status_fornecedores),
+            "logins_ok": total_ok,
+            "logins_falha": total_fail,
+            "sessoes_reutilizadas": sessoes_reutilizadas,
+            "etapas": etapas,
+            "agenda": {
+                "politica": "LPT",
+                "makespan_previsto_s": max(previsto_fim.values()) if previsto_fim else 0.0,
+                "makespan_real_s": etapas.get("total_s", 0.0)
+            },
+            "navegadores": resumo_pool,
+            "retomada": retomada,
+            "frescor": frescor,
+            "retentativas": retentativas,
+            "rede": {
+                "requisicoes_bloqueadas": sum((s.get("rede") or {}).get("bloqueadas", 0) for s in status_fornecedores),
+                "requisicoes_permitidas": sum((s.get("rede") or {}).get("permitidas", 0) for s in status_fornecedores),
+            },
+            "esperas": {
+                "economia_s": round(sum((s.get("esperas") or {}).get("economia_s", 0) for s in status_fornecedores), 2),
+                "por_fornecedor": {
+                    s["fornecedor"]: s["esperas"]["economia_s"] for s in status_fornecedores if s.get("esperas")
+                },
+            },
+            "captura_json": {
+                "itens_json": sum((s.get("captura") or {}).get("json", 0) for s in status_fornecedores),
+                "itens_dom": sum((s.get("captura") or {}).get("dom", 0) for s in status_fornecedores),
+            },
+            "http_direto": {
+                "itens_http": sum((s.get("http_direto") or {}).get("http", 0) for s in status_fornecedores),
+                "fallback_navegador": sum((s.get("http_direto") or {}).get("navegador", 0) for s in status_fornecedores),
+            },
+            "reciclagem_paginas": {
+                "reciclagens": sum((s.get("reciclagem") or {}).get("reciclagens", 0) for s in status_fornecedores),
+                "heap_liberado_mb": round(sum((s.get("reciclagem") or {}).get("heap_liberado_mb", 0) for s in status_fornecedores), 1),
+                "por_fornecedor": {
+                    s["fornecedor"]: s["reciclagem"] for s in status_fornecedores if s.get("reciclagem")
+                },
+            },
+            "cancelamento": dict(
+                controle.resumo(),
+                cancelados=[s["fornecedor"] for s in status_fornecedores if s["cancelado"]]
+            ),
+            "circuitos": {
+                "aberturas": sum(c["aberturas"] for c in circuitos.values()),
+                "relogins": sum(c["relogins"] for c in circuitos.values()),
+                "abortados": [f for f, c in circuitos.items() if c["estado"] == "abortado"],
+                "por_fornecedor": circuitos
+            },
+            "detalhes": status_fornecedores
+        }
+    }
 
 
 if __name__ == "__main__":
@@ -214,3 +1309,5 @@ if __name__ == "__main__":
     print(f"\nRESUMO FINAL: {resultado.get('total_processado', 0)} itens extraídos no total.")
     rel = resultado.get("relatorio", {})
     print(f"LOGINS OK: {rel.get('logins_ok', 0)} | LOGINS FALHA: {rel.get('logins_falha', 0)}")
+    etapas = rel.get("etapas", {})
+    print(f"ETAPAS: login {etapas.get('login_s', 0)}s | scraping {etapas.get('scraping_s', 0)}s | total {etapas.get('total_s', 0)}s")
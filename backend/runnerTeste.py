@@ -27,7 +27,7 @@ from controllers.produtos.produtoController1 import processar_lista_produtos_par
 from controllers.produtos.produtoController2 import processar_lista_produtos_sequencial2
 from controllers.produtos.produtoController3 import processar_lista_produtos_sequencial3
 from controllers.produtos.produtoController4 import processar_lista_produtos_sequencial4
-from controllers.produtos.produtoController5 import processar_lista_produtos_acaraujo
+from controllers.produtos.produtoController5 import processar_lista_produtos_jahu
 from controllers.produtos.produtoController6 import processar_lista_produtos_sequencial6
 from controllers.produtos.produtoController7 import processar_lista_produtos_sequencial1
 from controllers.produtos.produtoController8 import processar_lista_produtos_sequencial8
@@ -50,7 +50,7 @@ FORNECEDORES = [
     ("F2", login_f2, processar_lista_produtos_sequencial2),
     ("F3", login_f3, processar_lista_produtos_sequencial3),
     ("F4", login_f4, processar_lista_produtos_sequencial4),
-    ("F5", login_f5, processar_lista_produtos_acaraujo),
+    ("F5", login_f5, processar_lista_produtos_jahu),
     ("F6", login_f6, processar_lista_produtos_sequencial6),
     ("F7", login_f7, processar_lista_produtos_sequencial1),
     ("F8", login_f8, processar_lista_produtos_sequencial8),
@@ -1,8 +1,15 @@
 # runner_carrinho.py
 from typing import Dict, Any, List, Optional, Tuple
 import asyncio
+import time
 from playwright.async_api import async_playwright
 
+from services.browser_pool import BrowserPool
+from services.sessoes import restaurar_sessao, salvar_sessao
+from services.perfis_lancamento import (
+    NAVEGADOR_HEADLESS, perfil_lancamento, fallback_headed_ativo, registrar_fallback_headed, headed_disponivel
+)
+
 # LOGINs
 from controllers.fornecedores.Fornecedor1Controller import login as login_portalcomdip
 from controllers.fornecedores.Fornecedor2Controller import login_roles
@@ -183,25 +190,49 @@ ALIASES = {
 # ============================================================
 # ✅ TESTE DE LOGIN (mesmo padrão do runner.py)
 # ============================================================
-async def testar_login(login_func, playwright_instance, timeout_segundos=60):
+async def testar_login(login_func, playwright_instance, timeout_segundos=60, chave_sessao=None):
+    """
+    Retorna (ok, browser, context, page, erro, info).
+    info = {"sessao_reutilizada": bool, "tempo_login_s": float}
+
+    Com chave_sessao, tenta primeiro a sessão salva (storage_state) e só cai no
+    login_* completo se ela não existir/tiver expirado. Login completo OK => salva a sessão.
+    """
+    inicio = time.perf_counter()
+    info = {"sessao_reutilizada": False, "tempo_login_s": 0.0}
+
+    def _fim(ok, browser, context, page, erro):
+        info["tempo_login_s"] = round(time.perf_counter() - inicio, 2)
+        return (ok, browser, context, page, erro, info)
+
     try:
+        if chave_sessao:
+            restaurada = await restaurar_sessao(playwright_instance, chave_sessao)
+            if restaurada:
+                info["sessao_reutilizada"] = True
+                browser, context, page = restaurada
+                return _fim(True, browser, context, page, "")
+
         browser, context, page = await asyncio.wait_for(
             login_func(playwright_instance),
             timeout=timeout_segundos,
         )
 
         if not browser or not context or not page:
-            return (False, browser, context, page, "Login não retornou browser/context/page válidos")
+            return _fim(False, browser, context, page, "Login não retornou browser/context/page válidos")
 
         if page.is_closed():
-            return (False, browser, context, page, "Page veio fechada após login")
+            return _fim(False, browser, context, page, "Page veio fechada após login")
+
+        if chave_sessao:
+            await salvar_sessao(chave_sessao, browser, context, page)
 
-        return (True, browser, context, page, "")
+        return _fim(True, browser, context, page, "")
 
     except asyncio.TimeoutError:
-        return (False, None, None, None, f"Timeout no login ({timeout_segundos}s)")
+        return _fim(False, None, None, None, f"Timeout no login ({timeout_segundos}s)")
     except Exception as e:
-        return (False, None, None, None, str(e))
+        return _fim(False, None, None, None, str(e))
 
 
 # ============================================================
@@ -225,7 +256,32 @@ async def executar_fornecedor_carrinho(fornecedor_key: str, itens: List[Dict[str
 
             print(f"\n--- 🛒 Iniciando carrinho: {nome_log} ---")
 
-            ok, browser, context, page, erro_login = await testar_login(login_func, playwright_instance, timeout_segundos=60)
+            # mesmo perfil do runner (logar_fornecedor): headless por padrão, headed se o
+            # fornecedor já caiu no fallback ou se o login headless for barrado agora
+            headed = fallback_headed_ativo(fornecedor_key)
+            with perfil_lancamento(fornecedor_key, headed=headed):
+                ok, browser, context, page, erro_login, info_login = await testar_login(
+                    login_func, playwright_instance, timeout_segundos=60, chave_sessao=fornecedor_key
+                )
+
+            if not ok and not headed and NAVEGADOR_HEADLESS and headed_disponivel():
+                print(f"🖥️ Login headless de {nome_log} falhou ({erro_login}). Tentando headed...")
+                if browser:
+                    try:
+                        await browser.close()
+                    except Exception:
+                        pass
+                with perfil_lancamento(fornecedor_key, headed=True):
+                    ok, browser, context, page, erro_headed, info_login = await testar_login(
+                        login_func, playwright_instance, timeout_segundos=60
+                    )
+                if ok:
+                    headed = True
+                    registrar_fallback_headed(fornecedor_key, erro_login)
+                    await salvar_sessao(fornecedor_key, browser, context, page)
+                else:
+                    erro_login = f"{erro_login} | headed: {erro_headed}"
+            info_login["navegador"] = "headed" if headed else "headless"
 
             if not ok:
                 print(f"❌ Falha no login de {nome_log}: {erro_login}")
@@ -233,9 +289,11 @@ async def executar_fornecedor_carrinho(fornecedor_key: str, itens: List[Dict[str
                     "success": False,
                     "fornecedor": fornecedor_key,
                     "error": erro_login,
+                    **info_login,
                 }
 
-            print(f"✅ Login OK: {nome_log}. Adicionando itens...")
+            origem = "sessão reaproveitada" if info_login["sessao_reutilizada"] else "login completo"
+            print(f"✅ Login OK: {nome_log} ({origem}, {info_login['tempo_login_s']}s). Adicionando itens...")
 
             resultado = await add_func(page, itens)
 
@@ -243,6 +301,7 @@ async def executar_fornecedor_carrinho(fornecedor_key: str, itens: List[Dict[str
                 "success": bool((resultado or {}).get("success")),
                 "fornecedor": fornecedor_key,
                 "detalhes": resultado,
+                **info_login,
             }
 
         except Exception as e:
@@ -282,7 +341,11 @@ async def executar_automacao_carrinho(
 
     async with async_playwright() as p:
         sem = asyncio.Semaphore(1)
-        return await executar_fornecedor_carrinho(fornecedor_key, itens, p, sem)
+        pool = BrowserPool(p)
+        try:
+            return await executar_fornecedor_carrinho(fornecedor_key, itens, pool.proxy(), sem)
+        finally:
+            await pool.fechar()
 
 
 # ============================================================
@@ -319,11 +382,16 @@ async def executar_automacao_carrinho_em_lotes(
     sem = asyncio.Semaphore(concorrencia_fornecedores)
 
     async with async_playwright() as p:
+        pool = BrowserPool(p)
+        p_pool = pool.proxy()
         tarefas = [
-            executar_fornecedor_carrinho(fk, itens, p, sem)
+            executar_fornecedor_carrinho(fk, itens, p_pool, sem)
             for fk in fornecedores_keys
         ]
-        resultados = await asyncio.gather(*tarefas)
+        try:
+            resultados = await asyncio.gather(*tarefas)
+        finally:
+            await pool.fechar()
 
     ok = sum(1 for r in resultados if r.get("success"))
     falha = len(resultados) - ok
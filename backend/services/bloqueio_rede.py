@@ -0,0 +1,128 @@
+# services/bloqueio_rede.py
+import os
+from urllib.parse import urlparse
+
+# Liga/desliga o bloqueio em todos os fornecedores (BLOQUEIO_REDE=0 para comparar/depurar)
+BLOQUEIO_REDE_ATIVO = os.getenv("BLOQUEIO_REDE", "1") != "0"
+
+# Perfil usado quando a config do fornecedor não tem "bloqueio_rede"
+PERFIL_PADRAO = os.getenv("BLOQUEIO_REDE_PERFIL", "completo")
+
+# Os controllers só leem o `src` das imagens: baixar o arquivo não serve para nada.
+# CSS e scripts ficam liberados (as SPAs e os checks de visibilidade dependem deles).
+PERFIS_BLOQUEIO = {
+    "completo": {"tipos": {"image", "media", "font"}, "rastreadores": True},
+    "sem_midia": {"tipos": {"media", "font"}, "rastreadores": True},
+    "rastreadores": {"tipos": set(), "rastreadores": True},
+    "desligado": None,
+}
+
+# Analytics, pixels e widgets de chat vistos nos portais (bloqueados por domínio/sufixo)
+DOMINIOS_RASTREADORES = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "facebook.net",
+    "facebook.com/tr",
+    "hotjar.com",
+    "clarity.ms",
+    "tawk.to",
+    "jivosite.com",
+    "zopim.com",
+    "zdassets.com",
+    "intercom.io",
+    "crisp.chat",
+    "hs-scripts.com",
+    "hs-analytics.net",
+    "rdstation.com.br",
+    "d335luupugsy2.cloudfront.net",  # loader do RD Station
+    "onesignal.com",
+    "nr-data.net",
+    "youtube.com/embed",
+)
+
+
+def eh_rastreador(url):
+    try:
+        parsed = urlparse(url)
+    except Exception:
+        return False
+    host = (parsed.hostname or "").lower()
+    caminho = host + (parsed.path or "")
+    for dominio in DOMINIOS_RASTREADORES:
+        if "/" in dominio:
+            if caminho.startswith(dominio) or ("." + dominio) in caminho:
+                return True
+        elif host == dominio or host.endswith("." + dominio):
+            return True
+    return False
+
+
+class BloqueioRede:
+    """
+    Handler de context.route("**/*") de UM fornecedor + contadores.
+    Aborta pelos resource_type do perfil e pelos domínios de rastreadores; o resto segue.
+    """
+
+    def __init__(self, perfil, nome=""):
+        self.perfil = perfil
+        self.nome = nome
+        regras = PERFIS_BLOQUEIO.get(perfil) or {"tipos": set(), "rastreadores": False}
+        self.tipos = set(regras["tipos"])
+        self.rastreadores = regras["rastreadores"]
+        self.permitidas = 0
+        self.bloqueadas = {}
+
+    def deve_bloquear(self, resource_type, url):
+        if resource_type in self.tipos:
+            return resource_type
+        if self.rastreadores and eh_rastreador(url):
+            return "rastreador"
+        return None
+
+    async def tratar(self, route):
+        request = route.request
+        motivo = self.deve_bloquear(request.resource_type, request.url)
+        try:
+            if motivo:
+                self.bloqueadas[motivo] = self.bloqueadas.get(motivo, 0) + 1
+                await route.abort("blockedbyclient")
+            else:
+                self.permitidas += 1
+                await route.continue_()
+        except Exception:
+            # página fechada / request já tratado: nada a fazer
+            pass
+
+    def resumo(self):
+        return {
+            "perfil": self.perfil,
+            "permitidas": self.permitidas,
+            "bloqueadas": sum(self.bloqueadas.values()),
+            "bloqueadas_por_tipo": dict(self.bloqueadas),
+        }
+
+
+async def aplicar_bloqueio(context, perfil=None, nome=""):
+    """Instala o bloqueio no contexto (vale para as abas atuais e futuras). Retorna o BloqueioRede ou None."""
+    perfil = perfil or PERFIL_PADRAO
+    if not BLOQUEIO_REDE_ATIVO or not PERFIS_BLOQUEIO.get(perfil):
+        return None
+    bloqueio = BloqueioRede(perfil, nome)
+    try:
+        await context.route("**/*", bloqueio.tratar)
+    except Exception as e:
+        print(f"⚠️ {nome}: não foi possível instalar o bloqueio de rede ({e}).")
+        return None
+    return bloqueio
+
+
+async def remover_bloqueio(context, bloqueio):
+    if bloqueio is None:
+        return
+    try:
+        await context.unroute("**/*", bloqueio.tratar)
+    except Exception:
+        pass
@@ -0,0 +1,207 @@
+# services/browser_pool.py
+import asyncio
+import time
+
+from services.perfis_lancamento import aplicar_perfil, fornecedor_do_perfil, opcoes_contexto_headless, SCRIPT_STEALTH_HEADLESS
+
+# Args "stealth" usados pelos login_* dos fornecedores. Como o processo do Chromium é
+# compartilhado, todo navegador do pool sobe com a união desses args (são inofensivos
+# para quem não pedia) e só os args fora dessa lista separam processos.
+ARGS_STEALTH = [
+    "--disable-blink-features=AutomationControlled",
+    "--start-maximized",
+    "--no-sandbox",
+    "--disable-infobars",
+    "--disable-dev-shm-usage",
+]
+
+IGNORE_DEFAULT_ARGS = ["--enable-automation"]
+
+
+class BrowserCompartilhado:
+    """
+    Visão de um Chromium compartilhado restrita a UM fornecedor.
+
+    Os login_* continuam chamando browser.new_context(...) / browser.close() normalmente:
+      - new_context cria o contexto isolado no processo compartilhado (UA, locale, init scripts
+        e cookies continuam por fornecedor)
+      - close fecha só os contextos deste fornecedor, nunca o processo do pool
+    """
+
+    def __init__(self, pool, browser, launch_kwargs):
+        self._pool = pool
+        self._browser = browser
+        self.launch_kwargs = launch_kwargs
+        self._contexts = []
+        self.opcoes_contexto = {}
+
+    async def new_context(self, **kwargs):
+        headless = self.launch_kwargs.get("headless", True)
+        if headless:
+            kwargs = opcoes_contexto_headless(kwargs)
+        context = await self._browser.new_context(**kwargs)
+        if headless:
+            await context.add_init_script(SCRIPT_STEALTH_HEADLESS)
+        self._contexts.append(context)
+        self.opcoes_contexto[id(context)] = dict(kwargs)
+        return context
+
+    async def new_page(self, **kwargs):
+        context = await self.new_context(**kwargs)
+        return await context.new_page()
+
+    @property
+    def contexts(self):
+        return list(self._contexts)
+
+    def is_connected(self):
+        return self._browser.is_connected()
+
+    async def close(self, **kwargs):
+        for context in self._contexts:
+            try:
+                await context.close()
+            except:
+                pass
+        self._contexts.clear()
+        self.opcoes_contexto.clear()
+
+    def __getattr__(self, nome):
+        return getattr(self._browser, nome)
+
+
+class _ChromiumDoPool:
+    def __init__(self, pool):
+        self._pool = pool
+
+    async def launch(self, **kwargs):
+        return await self._pool.obter_browser(**kwargs)
+
+    def __getattr__(self, nome):
+        return getattr(self._pool.playwright.chromium, nome)
+
+
+class PlaywrightDoPool:
+    """
+    Substitui o `p` passado aos login_*: `p.chromium.launch(...)` devolve um
+    BrowserCompartilhado em vez de subir um Chromium novo. O resto é repassado ao Playwright real.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self.chromium = _ChromiumDoPool(pool)
+
+    async def fechar_fornecedor(self, chave):
+        await self._pool.fechar_fornecedor(chave)
+
+    def __getattr__(self, nome):
+        return getattr(self._pool.playwright, nome)
+
+
+class BrowserPool:
+    """
+    Mantém poucos processos Chromium vivos durante uma execução do runner.
+
+    Navegadores são reaproveitados por assinatura de lançamento (headless, slow_mo e args
+    extras). Com os controllers atuais isso dá ~4 processos em vez de 1 por fornecedor.
+
+    O headless/slow_mo pedido pelo controller passa antes pelo perfil de lançamento
+    (services/perfis_lancamento.py): headless sem slow_mo, headed só no fallback do fornecedor.
+    Na prática sobra 1 processo headless (+1 headed se algum fornecedor caiu no fallback).
+    """
+
+    def __init__(self, playwright):
+        self.playwright = playwright
+        self._browsers = {}
+        self._lock = asyncio.Lock()
+        self.total_lancamentos = 0
+        self.lancamentos_headed = 0
+        self.tempo_lancamento_s = 0.0
+        # launches feitos dentro do perfil_lancamento de cada fornecedor (ver fechar_fornecedor)
+        self._por_fornecedor = {}
+
+    def proxy(self):
+        return PlaywrightDoPool(self)
+
+    @staticmethod
+    def _normalizar_launch(kwargs):
+        kwargs = dict(kwargs)
+        headless = kwargs.pop("headless", True)
+        slow_mo = kwargs.pop("slow_mo", 0) or 0
+        args_pedidos = kwargs.pop("args", None) or []
+        ignore_pedidos = kwargs.pop("ignore_default_args", None) or []
+
+        extras = [a for a in args_pedidos if a not in ARGS_STEALTH]
+        args = ARGS_STEALTH + extras
+
+        ignore = list(IGNORE_DEFAULT_ARGS)
+        if ignore_pedidos is True:
+            ignore = True
+        else:
+            ignore += [a for a in ignore_pedidos if a not in ignore]
+
+        launch_kwargs = dict(kwargs)
+        launch_kwargs.update({
+            "headless": headless,
+            "slow_mo": slow_mo,
+            "args": args,
+            "ignore_default_args": ignore,
+        })
+
+        chave = (
+            headless,
+            slow_mo,
+            tuple(sorted(extras)),
+            repr(ignore),
+            repr(sorted(kwargs.items())),
+        )
+        return chave, launch_kwargs
+
+    async def obter_browser(self, **kwargs):
+        chave, launch_kwargs = self._normalizar_launch(aplicar_perfil(kwargs))
+
+        async with self._lock:
+            browser = self._browsers.get(chave)
+            if browser is None or not browser.is_connected():
+                inicio = time.perf_counter()
+                browser = await self.playwright.chromium.launch(**launch_kwargs)
+                duracao = time.perf_counter() - inicio
+
+                self._browsers[chave] = browser
+                self.total_lancamentos += 1
+                if not launch_kwargs["headless"]:
+                    self.lancamentos_headed += 1
+                self.tempo_lancamento_s += duracao
+                print(f"🧩 Pool: Chromium #{self.total_lancamentos} iniciado em {duracao:.2f}s "
+                      f"(headless={launch_kwargs['headless']}, slow_mo={launch_kwargs['slow_mo']})")
+
+        compartilhado = BrowserCompartilhado(self, browser, launch_kwargs)
+        fornecedor = fornecedor_do_perfil()
+        if fornecedor:
+            self._por_fornecedor.setdefault(fornecedor, []).append(compartilhado)
+        return compartilhado
+
+    async def fechar_fornecedor(self, chave):
+        """
+        Fecha os contextos que os launches do fornecedor abriram. Para login cancelado no
+        meio: o login_* não chegou a devolver o browser, então só o pool sabe deles.
+        """
+        for compartilhado in self._por_fornecedor.pop(chave, []):
+            await compartilhado.close()
+
+    def resumo(self):
+        return {
+            "navegadores_ativos": sum(1 for b in self._browsers.values() if b.is_connected()),
+            "total_lancamentos": self.total_lancamentos,
+            "lancamentos_headed": self.lancamentos_headed,
+            "tempo_lancamento_s": round(self.tempo_lancamento_s, 2),
+        }
+
+    async def fechar(self):
+        for browser in list(self._browsers.values()):
+            try:
+                await browser.close()
+            except:
+                pass
+        self._browsers.clear()
+        print("🔒 Pool de navegadores encerrado.")
@@ -0,0 +1,446 @@
+# services/captura_respostas.py
+import asyncio
+import json
+import os
+import re
+from urllib.parse import urljoin
+
+# ============================================================
+# 🛰️ CAPTURA DAS RESPOSTAS JSON DA BUSCA (SPAs: PortalComDip, Takao, DPK, Furacão)
+# ------------------------------------------------------------
+# Enquanto a busca roda, escuta page.on("response") e lê os JSON de XHR/fetch
+# pelo MAPEAMENTO EXPLÍCITO do portal (caminho de cada campo, ver MAPEAMENTOS).
+# Achou o produto pesquisado: preço, estoque e UFs saem do JSON e a espera pelo
+# DOM é cancelada. Não achou: segue o scraping do DOM de sempre.
+#
+# Opt-in por fornecedor, e só para quem tem mapeamento conferido contra respostas
+# gravadas do portal (teste_captura_respostas.py). Sem isso, tudo pelo DOM:
+#
+#   CAPTURA_RESPOSTAS_LIGADA=portalcomdip,dpk
+#
+# Para escrever/conferir um mapeamento: rode com GRAVAR_RESPOSTAS=<pasta> (captura
+# desligada). Cada busca grava <pasta>/<fornecedor>/<codigo>.json com os JSON que
+# chegaram e o item que o DOM extraiu.
+# ============================================================
+
+FORNECEDORES_COM_CAPTURA = {c.strip() for c in os.getenv("CAPTURA_RESPOSTAS_LIGADA", "").split(",") if c.strip()}
+
+# Respostas maiores que isto não são lidas (listagens/catálogos inteiros)
+MAX_BYTES_RESPOSTA = 2 * 1024 * 1024
+
+# Depois que o DOM terminou: quanto esperar pelos corpos JSON ainda sendo lidos
+FOLGA_LEITURA_S = 0.5
+
+# Mapeamento de cada portal: caminhos "a.b.0.c" na resposta da busca.
+#   "produtos": lista (ou o próprio dict) de produtos ("" = a raiz da resposta)
+#   "codigo", "nome", "marca", "imagem": dentro do produto ("codigo" é obrigatório)
+#   "regioes": lista por UF dentro do produto (opcional: sem ela o produto é a única UF)
+#   "preco", "estoque", "disponivel", "uf": dentro de cada UF (ou do produto)
+# Entra aqui só junto com as gravações reais do portal em PASTA_GRAVACOES_TESTE e com
+# teste_captura_respostas.py passando (JSON x DOM iguais em todas).
+MAPEAMENTOS = {}
+
+# Como cada fornecedor monta o item (mesmos defaults do scraping do DOM dele)
+OPCOES_ITEM = {
+    # limitar_ao_pedido: como o DOM do portal (sondar_estoque), estoque só até a qtd pedida
+    "portalcomdip": {"uf_padrao": None, "exigir_estoque": True, "limitar_ao_pedido": True},
+    "takao": {"marca_padrao": "Takao"},
+    "dpk": {"marca_padrao": "N/A", "exigir_estoque": True},
+    "furacao": {"marca_padrao": "N/A", "exigir_estoque": True, "base_imagem": "https://vendas.furacao.com.br"},
+}
+
+# GRAVAR_RESPOSTAS=<pasta>: salva os JSON de cada busca + o item do DOM (mapeamentos/replay/testes)
+PASTA_GRAVACAO = os.getenv("GRAVAR_RESPOSTAS", "")
+# Gravações versionadas que o teste_captura_respostas.py confere
+PASTA_GRAVACOES_TESTE = "data/respostas_gravadas"
+# JSON guardados por busca na gravação (o resto da página: config, menus, carrinho...)
+MAX_RESPOSTAS_GRAVADAS = 20
+# Não vão para o disco (a gravação é para versionar)
+CABECALHOS_SENSIVEIS = {"cookie", "authorization", "x-xsrf-token", "x-csrf-token"}
+
+_estatisticas = {}
+
+# Última requisição de busca reconhecida por fornecedor (o modo HTTP direto monta o modelo a partir dela)
+_requisicoes = {}
+
+for _fornecedor in sorted(FORNECEDORES_COM_CAPTURA - set(MAPEAMENTOS)):
+    print(f"⚠️ CAPTURA_RESPOSTAS_LIGADA: {_fornecedor} não tem mapeamento em MAPEAMENTOS. Segue pelo DOM.")
+
+
+# ===================== MODO / ESTATÍSTICAS ===================== #
+def captura_ativa(fornecedor):
+    return fornecedor in FORNECEDORES_COM_CAPTURA and fornecedor in MAPEAMENTOS
+
+
+def _registrar(fornecedor, origem):
+    est = _estatisticas.setdefault(fornecedor or "?", {"json": 0, "dom": 0, "respostas_lidas": 0})
+    est[origem] += 1
+
+
+def resumo_captura(fornecedor):
+    est = _estatisticas.get(fornecedor)
+    if not est:
+        return None
+    total = est["json"] + est["dom"]
+    return dict(est, taxa_json=round(est["json"] / total, 2) if total else 0.0)
+
+
+def zerar_captura(fornecedor):
+    _estatisticas.pop(fornecedor, None)
+
+
+def requisicao_aprendida(fornecedor):
+    """{"url", "metodo", "headers", "corpo", "codigo"} da última busca cujo JSON tinha o produto."""
+    return _requisicoes.get(fornecedor)
+
+
+def esquecer_requisicao(fornecedor):
+    _requisicoes.pop(fornecedor, None)
+
+
+def _gravar_busca(fornecedor, codigo, respostas, item_dom):
+    try:
+        pasta = os.path.join(PASTA_GRAVACAO, fornecedor)
+        os.makedirs(pasta, exist_ok=True)
+        arquivo = os.path.join(pasta, f"{normalizar_codigo(codigo)}.json")
+        gravacao = {
+            "codigo": str(codigo),
+            "quantidade": item_dom.get("qtdSolicitada", 1),
+            "respostas": respostas,
+            "item_dom": item_dom,
+        }
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(gravacao, f, ensure_ascii=False, indent=1, default=str)
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar a busca de {fornecedor}: {e}")
+
+
+# ===================== LEITURA DO JSON ===================== #
+def normalizar_codigo(valor):
+    return re.sub(r"[^0-9A-Za-z]", "", str(valor)).upper()
+
+
+def _caminho(obj, caminho):
+    """"a.b.0.c" -> obj["a"]["b"][0]["c"]; None se o caminho não existe (ou não foi mapeado)."""
+    if caminho is None:
+        return None
+    for parte in caminho.split(".") if caminho else []:
+        if isinstance(obj, dict):
+            obj = obj.get(parte)
+        elif isinstance(obj, list) and parte.isdigit() and int(parte) < len(obj):
+            obj = obj[int(parte)]
+        else:
+            return None
+    return obj
+
+
+def _texto(valor):
+    return valor.strip() if isinstance(valor, str) and valor.strip() else None
+
+
+def _numero(valor):
+    """10 | 10.5 | "R$ 1.234,56" | "1234.56" -> float (None se não der)."""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, str):
+        texto = re.sub(r"[^\d,.\-]", "", valor)
+        if not texto:
+            return None
+        if "," in texto:
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            return float(texto)
+        except ValueError:
+            return None
+    return None
+
+
+def _regiao(d, mapeamento):
+    uf = _caminho(d, mapeamento.get("uf"))
+    disponivel = _caminho(d, mapeamento.get("disponivel"))
+    return {
+        "uf": str(uf).strip().upper() if isinstance(uf, (str, int)) and not isinstance(uf, bool) else None,
+        "preco_num": _numero(_caminho(d, mapeamento.get("preco"))),
+        "estoque": _numero(_caminho(d, mapeamento.get("estoque"))),
+        "disponivel": disponivel if isinstance(disponivel, bool) else None,
+    }
+
+
+def localizar_produto(dados, codigo, mapeamento):
+    """
+    Lê o produto pesquisado da resposta pelo `mapeamento` do portal (ver MAPEAMENTOS).
+    Retorna {"codigo", "nome", "marca", "imagem", "regioes": [{"uf", "preco_num", "estoque", "disponivel"}]}
+    ou None (sem mapeamento, produto fora da resposta ou sem preço em nenhuma UF).
+    """
+    alvo = normalizar_codigo(codigo)
+    if not mapeamento or not alvo:
+        return None
+
+    produtos = _caminho(dados, mapeamento.get("produtos", ""))
+    if isinstance(produtos, dict):
+        produtos = [produtos]
+    if not isinstance(produtos, list):
+        return None
+
+    for d in produtos:
+        if not isinstance(d, dict):
+            continue
+        cod = _caminho(d, mapeamento["codigo"])
+        if not isinstance(cod, (str, int)) or isinstance(cod, bool) or normalizar_codigo(cod) != alvo:
+            continue
+
+        if mapeamento.get("regioes"):
+            lista = _caminho(d, mapeamento["regioes"])
+            regioes = [_regiao(r, mapeamento) for r in lista if isinstance(r, dict)] if isinstance(lista, list) else []
+        else:
+            regioes = [_regiao(d, mapeamento)]
+        if all(r["preco_num"] is None for r in regioes):
+            return None
+
+        return {
+            "codigo": str(cod).strip(),
+            "nome": _texto(_caminho(d, mapeamento.get("nome"))),
+            "marca": _texto(_caminho(d, mapeamento.get("marca"))),
+            "imagem": _texto(_caminho(d, mapeamento.get("imagem"))),
+            "regioes": regioes,
+        }
+    return None
+
+
+def produto_da_resposta(fornecedor, dados, codigo):
+    """localizar_produto com o mapeamento do fornecedor (None se ele não tem mapeamento)."""
+    return localizar_produto(dados, codigo, MAPEAMENTOS.get(fornecedor))
+
+
+def _format_brl(valor):
+    if valor is None:
+        return None
+    return "R$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def montar_item(produto, quantidade=1, uf_padrao="RJ", marca_padrao=None, exigir_estoque=False, base_imagem=None,
+                limitar_ao_pedido=False):
+    """
+    Item no mesmo formato dos extrair_dados_produto (regioes + consolidação pela 1ª UF).
+    exigir_estoque=True: sem quantidade em estoque no JSON volta None (o DOM sabe descobrir).
+    limitar_ao_pedido=True: qtdDisponivel vai só até `quantidade` e valor_total = preço x
+    qtdDisponivel (UF sem preço sem valores), igual ao extrair_dados_produto do fornecedor.
+    """
+    if not produto:
+        return None
+    if exigir_estoque and any(r["estoque"] is None for r in produto["regioes"]):
+        return None
+
+    regioes = []
+    for r in produto["regioes"]:
+        preco = r["preco_num"] or 0.0
+        if r["estoque"] is not None:
+            qtd_disponivel = r["estoque"]
+        else:
+            # sem quantidade no JSON: mesmo critério das telas que só mostram "disponível"
+            qtd_disponivel = 1 if (r["disponivel"] if r["disponivel"] is not None else preco > 0) else 0
+        disponivel = bool((r["disponivel"] if r["disponivel"] is not None else qtd_disponivel > 0) and preco > 0)
+        pode_comprar = disponivel and (r["estoque"] is None or r["estoque"] >= quantidade)
+        mensagem = None if pode_comprar else ("Estoque insuficiente" if disponivel else "Indisponível")
+        valor_total = preco * quantidade
+
+        if limitar_ao_pedido:
+            if preco > 0:
+                qtd_disponivel = int(min(qtd_disponivel, quantidade))
+                valor_total = preco * qtd_disponivel
+                if disponivel and not pode_comprar:
+                    mensagem = f"Quantidade limitada a {qtd_disponivel} pelo portal"
+            else:
+                preco, qtd_disponivel, valor_total = None, 0, None
+
+        regioes.append({
+            "uf": r["uf"] or uf_padrao,
+            "preco": _format_brl(preco),
+            "preco_num": preco,
+            "preco_formatado": _format_brl(preco),
+            "qtdSolicitada": quantidade,
+            "qtdDisponivel": qtd_disponivel,
+            "valor_total": valor_total,
+            "valor_total_formatado": _format_brl(valor_total),
+            "podeComprar": pode_comprar,
+            "mensagem": mensagem,
+            "disponivel": disponivel,
+        })
+
+    primeira = regioes[0]
+    disponivel = any(r["disponivel"] for r in regioes)
+    imagem = produto["imagem"]
+    if imagem and base_imagem and not imagem.startswith("http"):
+        imagem = urljoin(base_imagem, imagem)
+
+    return {
+        "codigo": produto["codigo"],
+        "nome": produto["nome"],
+        "marca": produto["marca"] or marca_padrao,
+        "imagem": imagem,
+        "preco": primeira["preco"],
+        "preco_num": primeira["preco_num"],
+        "preco_formatado": primeira["preco_formatado"],
+        "valor_total": primeira["valor_total"],
+        "valor_total_formatado": primeira["valor_total_formatado"],
+        "uf": primeira["uf"],
+        "qtdSolicitada": quantidade,
+        "qtdDisponivel": primeira["qtdDisponivel"],
+        "podeComprar": primeira["podeComprar"],
+        "mensagem": primeira["mensagem"],
+        "disponivel": disponivel,
+        "status": "Disponível" if disponivel else "Indisponível",
+        "regioes": regioes,
+    }
+
+
+# ===================== CAPTURA NA ABA ===================== #
+def _consumir(tarefa):
+    """Lê a exceção de uma task abandonada (evita "Task exception was never retrieved")."""
+    if not tarefa.cancelled():
+        tarefa.exception()
+
+
+class CapturaBusca:
+    """
+    async with CapturaBusca(page, "dpk", codigo) as captura:
+        await apertar_buscar()
+        await captura.aguardar(esperar_card())   # JSON ou DOM, o que vier primeiro
+    item = captura.item(qtd)
+    if item is None:
+        item = await extrair_dados_produto(...)
+        captura.gravar(item)                     # só com GRAVAR_RESPOSTAS
+    """
+
+    def __init__(self, page, fornecedor, codigo):
+        self.page = page
+        self.fornecedor = fornecedor
+        self.codigo = codigo
+        self.ativa = captura_ativa(fornecedor)
+        self.mapeamento = MAPEAMENTOS.get(fornecedor)
+        self.gravando = bool(PASTA_GRAVACAO)
+        self.produto = None
+        self.url = None
+        self.urls_json = []
+        self.respostas = []
+        self._achou = asyncio.Event()
+        self._leituras = set()
+
+    @property
+    def escutando(self):
+        return self.ativa or self.gravando
+
+    async def __aenter__(self):
+        if self.escutando:
+            self.page.on("response", self._resposta)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.escutando:
+            try:
+                self.page.remove_listener("response", self._resposta)
+            except Exception:
+                pass
+        for tarefa in list(self._leituras):
+            tarefa.cancel()
+        return False
+
+    def _resposta(self, response):
+        try:
+            if response.request.resource_type not in ("xhr", "fetch"):
+                return
+            headers = response.headers
+            if "json" not in headers.get("content-type", ""):
+                return
+            if int(headers.get("content-length") or 0) > MAX_BYTES_RESPOSTA:
+                return
+        except Exception:
+            return
+        tarefa = asyncio.ensure_future(self._ler(response))
+        self._leituras.add(tarefa)
+        tarefa.add_done_callback(self._leituras.discard)
+
+    async def _ler(self, response):
+        try:
+            dados = await response.json()
+        except Exception:
+            return
+        self.urls_json.append(response.url)
+        est = _estatisticas.setdefault(self.fornecedor, {"json": 0, "dom": 0, "respostas_lidas": 0})
+        est["respostas_lidas"] += 1
+        if self.gravando and len(self.respostas) < MAX_RESPOSTAS_GRAVADAS:
+            requisicao = await self._requisicao(response.request)
+            requisicao["headers"] = {
+                k: v for k, v in requisicao["headers"].items() if k.lower() not in CABECALHOS_SENSIVEIS
+            }
+            self.respostas.append({"requisicao": requisicao, "resposta": dados})
+        if self.ativa and self.produto is None:
+            produto = localizar_produto(dados, self.codigo, self.mapeamento)
+            if produto:
+                self.produto = produto
+                self.url = response.url
+                self._achou.set()
+                _requisicoes[self.fornecedor] = await self._requisicao(response.request)
+
+    async def _requisicao(self, request):
+        try:
+            headers = await request.all_headers()
+        except Exception:
+            headers = dict(request.headers)
+        return {
+            "url": request.url,
+            "metodo": request.method,
+            "headers": headers,
+            "corpo": request.post_data,
+            "codigo": str(self.codigo),
+        }
+
+    async def aguardar(self, espera_dom):
+        """
+        Corre a espera do DOM contra a chegada do JSON do produto. Se o JSON vence, a espera do
+        DOM é cancelada; se o DOM termina antes, dá FOLGA_LEITURA_S aos JSON ainda sendo lidos.
+        Retorna o produto do JSON ou None (exceções da espera do DOM só sobem sem JSON).
+        """
+        tarefa_dom = asyncio.ensure_future(espera_dom)
+        if not self.ativa:
+            await tarefa_dom
+            if self.gravando and self._leituras:
+                await asyncio.wait(set(self._leituras), timeout=FOLGA_LEITURA_S)
+            return None
+
+        tarefa_json = asyncio.ensure_future(self._achou.wait())
+        try:
+            await asyncio.wait({tarefa_dom, tarefa_json}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for tarefa in (tarefa_dom, tarefa_json):
+                if not tarefa.done():
+                    tarefa.cancel()
+            # helpers com `except:` genérico podem engolir o cancelamento: não fica preso neles
+            await asyncio.wait({tarefa_dom, tarefa_json}, timeout=FOLGA_LEITURA_S)
+            tarefa_dom.add_done_callback(_consumir)
+
+        if self.produto is None and self._leituras:
+            await asyncio.wait(set(self._leituras), timeout=FOLGA_LEITURA_S)
+        if self.produto is None and tarefa_dom.done() and not tarefa_dom.cancelled() and tarefa_dom.exception():
+            raise tarefa_dom.exception()
+        return self.produto
+
+    def item(self, quantidade=1, **opcoes):
+        """Item montado do JSON (ver montar_item) ou None para seguir pelo DOM. Conta json x dom."""
+        if not self.ativa:
+            return None
+        item = montar_item(self.produto, quantidade, **dict(OPCOES_ITEM.get(self.fornecedor, {}), **opcoes))
+        _registrar(self.fornecedor, "json" if item else "dom")
+        if item:
+            print(f"🛰️ {self.codigo}: lido da resposta JSON ({self.url})")
+        elif self.urls_json and _estatisticas[self.fornecedor]["dom"] == 1:
+            # primeira vez sem produto no JSON: mostra o que veio, para conferir o MAPEAMENTOS do portal
+            print(f"ℹ️ {self.fornecedor}: produto não encontrado nos JSON da busca ({', '.join(self.urls_json[:3])}). Seguindo pelo DOM.")
+        return item
+
+    def gravar(self, item_dom):
+        """Com GRAVAR_RESPOSTAS: guarda os JSON desta busca junto com o item que o DOM extraiu."""
+        if self.gravando and self.respostas and isinstance(item_dom, dict):
+            _gravar_busca(self.fornecedor, self.codigo, self.respostas, item_dom)
@@ -0,0 +1,195 @@
+# services/checkpoints.py
+import json
+
+from configs.db import get_connection
+from services.db_saver import _sqlite_write_lock
+
+# Status de item no checkpoint:
+#   ok    -> SKU extraído (item_json guarda o resultado)
+#   vazio -> SKU consultado sem resultado (não encontrado / pulado pelo controller)
+#   erro  -> SKU falhou; na retomada ele é refeito
+#   fresco -> pulado no modo incremental (consulta recente ainda dentro do TTL)
+STATUS_CONCLUIDOS = ("ok", "vazio", "fresco")
+
+SQL_TABELAS_CHECKPOINT = [
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_execucoes (
+        execucao_id TEXT PRIMARY KEY,
+        iniciado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT,
+        lista_json TEXT
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_fornecedores (
+        execucao_id TEXT,
+        chave TEXT,
+        fornecedor TEXT,
+        total INTEGER,
+        status TEXT,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (execucao_id, chave)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_itens (
+        execucao_id TEXT,
+        chave TEXT,
+        indice INTEGER,
+        status TEXT,
+        item_json TEXT,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (execucao_id, chave, indice)
+    );
+    """,
+]
+
+
+def _executar_escrita(sqls_params):
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                for sql, params in sqls_params:
+                    conn.execute(sql, params)
+        return True
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar checkpoint: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def garantir_tabelas_checkpoint():
+    return _executar_escrita([(sql, ()) for sql in SQL_TABELAS_CHECKPOINT])
+
+
+def iniciar_execucao(execucao_id, lista_produtos):
+    """Registra o run e descarta checkpoints de runs anteriores (só o último é retomável)."""
+    return _executar_escrita([
+        ("DELETE FROM checkpoint_itens WHERE execucao_id <> ?;", (execucao_id,)),
+        ("DELETE FROM checkpoint_fornecedores WHERE execucao_id <> ?;", (execucao_id,)),
+        ("DELETE FROM checkpoint_execucoes WHERE execucao_id <> ?;", (execucao_id,)),
+        ("""
+            INSERT INTO checkpoint_execucoes (execucao_id, status, lista_json)
+            VALUES (?, 'em_andamento', ?)
+            ON CONFLICT(execucao_id) DO UPDATE SET status = 'em_andamento';
+        """, (execucao_id, json.dumps(lista_produtos, ensure_ascii=False))),
+    ])
+
+
+def descartar_execucao(execucao_id):
+    """Apaga os checkpoints de um run avulso (atualização pontual), sem tocar no run retomável."""
+    return _executar_escrita([
+        ("DELETE FROM checkpoint_itens WHERE execucao_id = ?;", (execucao_id,)),
+        ("DELETE FROM checkpoint_fornecedores WHERE execucao_id = ?;", (execucao_id,)),
+        ("DELETE FROM checkpoint_execucoes WHERE execucao_id = ?;", (execucao_id,)),
+    ])
+
+
+def finalizar_execucao(execucao_id, status="concluida"):
+    return _executar_escrita([
+        ("UPDATE checkpoint_execucoes SET status = ? WHERE execucao_id = ?;", (status, execucao_id)),
+    ])
+
+
+def marcar_fornecedor(execucao_id, chave, fornecedor, total, status):
+    return _executar_escrita([
+        ("""
+            INSERT INTO checkpoint_fornecedores (execucao_id, chave, fornecedor, total, status, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(execucao_id, chave) DO UPDATE SET
+                status = excluded.status,
+                total = excluded.total,
+                atualizado_em = CURRENT_TIMESTAMP;
+        """, (execucao_id, chave, fornecedor, total, status)),
+    ])
+
+
+def salvar_itens_checkpoint(execucao_id, chave, linhas):
+    """linhas = [(indice, status, resultados_ou_None), ...] numa transação só."""
+    sql = """
+        INSERT INTO checkpoint_itens (execucao_id, chave, indice, status, item_json, atualizado_em)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(execucao_id, chave, indice) DO UPDATE SET
+            status = excluded.status,
+            item_json = excluded.item_json,
+            atualizado_em = CURRENT_TIMESTAMP;
+    """
+    return _executar_escrita([
+        (sql, (execucao_id, chave, indice, status,
+               json.dumps(resultados, ensure_ascii=False, default=str) if resultados else None))
+        for indice, status, resultados in linhas
+    ])
+
+
+def salvar_item_checkpoint(execucao_id, chave, indice, status, resultados=None):
+    return salvar_itens_checkpoint(execucao_id, chave, [(indice, status, resultados)])
+
+
+def marcar_itens_frescos(execucao_id, chave, indices):
+    sql = """
+        INSERT INTO checkpoint_itens (execucao_id, chave, indice, status, item_json, atualizado_em)
+        VALUES (?, ?, ?, 'fresco', NULL, CURRENT_TIMESTAMP)
+        ON CONFLICT(execucao_id, chave, indice) DO NOTHING;
+    """
+    return _executar_escrita([(sql, (execucao_id, chave, i)) for i in sorted(indices)])
+
+
+def descartar_parciais(execucao_id, chave):
+    """Depois que a retomada grava os parciais no banco, eles não podem ser gravados de novo."""
+    return _executar_escrita([
+        ("UPDATE checkpoint_itens SET item_json = NULL WHERE execucao_id = ? AND chave = ?;", (execucao_id, chave)),
+    ])
+
+
+def carregar_execucao_retomavel():
+    """
+    Último run que não terminou. Retorna
+    {"execucao_id", "lista_produtos", "fornecedores": {chave: {"status", "concluidos": set, "parciais": [...]}}}
+    ou None.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        row = conn.execute("""
+            SELECT execucao_id, lista_json FROM checkpoint_execucoes
+            WHERE status <> 'concluida'
+            ORDER BY iniciado_em DESC
+            LIMIT 1;
+        """).fetchone()
+        if not row:
+            return None
+
+        execucao_id = row["execucao_id"]
+        fornecedores = {}
+
+        for f in conn.execute(
+            "SELECT chave, status FROM checkpoint_fornecedores WHERE execucao_id = ?;", (execucao_id,)
+        ).fetchall():
+            fornecedores[f["chave"]] = {"status": f["status"], "concluidos": set(), "parciais": []}
+
+        for it in conn.execute(
+            "SELECT chave, indice, status, item_json FROM checkpoint_itens WHERE execucao_id = ? ORDER BY indice;",
+            (execucao_id,)
+        ).fetchall():
+            info = fornecedores.setdefault(it["chave"], {"status": "em_andamento", "concluidos": set(), "parciais": []})
+            if it["status"] in STATUS_CONCLUIDOS:
+                info["concluidos"].add(it["indice"])
+            if it["item_json"]:
+                info["parciais"].extend(json.loads(it["item_json"]))
+
+        return {
+            "execucao_id": execucao_id,
+            "lista_produtos": json.loads(row["lista_json"] or "[]"),
+            "fornecedores": fornecedores,
+        }
+
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler checkpoints: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
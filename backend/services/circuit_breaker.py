@@ -0,0 +1,107 @@
+# services/circuit_breaker.py
+import os
+from collections import deque
+
+# Abre o circuito com N falhas seguidas OU taxa de erro alta na janela recente
+CIRCUITO_FALHAS_SEGUIDAS = int(os.getenv("CIRCUITO_FALHAS_SEGUIDAS", "5"))
+CIRCUITO_JANELA = int(os.getenv("CIRCUITO_JANELA", "20"))
+CIRCUITO_TAXA_ERRO = float(os.getenv("CIRCUITO_TAXA_ERRO", "0.5"))
+CIRCUITO_MIN_AMOSTRAS = int(os.getenv("CIRCUITO_MIN_AMOSTRAS", "10"))
+
+# Pausa antes de checar a saúde do portal, e quantas recuperações seguidas (sem nenhum SKU OK
+# entre elas) tenta antes de desistir
+CIRCUITO_PAUSA_S = float(os.getenv("CIRCUITO_PAUSA_S", "30"))
+CIRCUITO_MAX_RECUPERACOES = int(os.getenv("CIRCUITO_MAX_RECUPERACOES", "2"))
+
+
+class FornecedorAbortado(Exception):
+    """Circuito aberto e portal não se recuperou: o fornecedor para (fica retomável)."""
+
+
+class CircuitBreaker:
+    """
+    Conta falhas por SKU de UM fornecedor. Não faz I/O: quem pausa, checa a saúde
+    e reloga é o ExecucaoFornecedor (com a função de recuperação do runner).
+
+    Estados: fechado -> aberto (limite estourado) -> meio-aberto (após recuperar;
+    a primeira falha reabre na hora) -> fechado (primeiro SKU OK).
+    """
+
+    def __init__(self, falhas_seguidas=CIRCUITO_FALHAS_SEGUIDAS, janela=CIRCUITO_JANELA,
+                 taxa_erro=CIRCUITO_TAXA_ERRO, min_amostras=CIRCUITO_MIN_AMOSTRAS):
+        self.limite_seguidas = falhas_seguidas
+        self.taxa_erro = taxa_erro
+        self.min_amostras = min_amostras
+        self.janela = deque(maxlen=janela)
+
+        self.aberto = False
+        self.meio_aberto = False
+        self.abortado = False
+        self.motivo = ""
+
+        self.seguidas = 0
+        self.maior_sequencia = 0
+        self.aberturas = 0
+        self.recuperacoes = 0
+        self.recuperacoes_seguidas = 0
+        self.relogins = 0
+        self.skus_abandonados = 0
+
+    def taxa_atual(self):
+        return (sum(self.janela) / len(self.janela)) if self.janela else 0.0
+
+    def registrar(self, falhou):
+        self.janela.append(1 if falhou else 0)
+
+        if not falhou:
+            self.seguidas = 0
+            if self.meio_aberto:
+                # recuperação confirmada por um SKU OK
+                self.meio_aberto = False
+                self.recuperacoes_seguidas = 0
+            return
+
+        self.seguidas += 1
+        self.maior_sequencia = max(self.maior_sequencia, self.seguidas)
+
+        if self.aberto:
+            return
+        if self.meio_aberto:
+            self._abrir("falhou logo após a recuperação")
+        elif self.seguidas >= self.limite_seguidas:
+            self._abrir(f"{self.seguidas} falhas seguidas")
+        elif len(self.janela) >= self.min_amostras and self.taxa_atual() >= self.taxa_erro:
+            self._abrir(f"taxa de erro {self.taxa_atual():.0%} nos últimos {len(self.janela)} SKUs")
+
+    def _abrir(self, motivo):
+        self.aberto = True
+        self.meio_aberto = False
+        self.motivo = motivo
+        self.aberturas += 1
+
+    def fechar(self, relogou=False):
+        """Recuperado: volta a tentar, mas meio-aberto."""
+        self.aberto = False
+        self.meio_aberto = True
+        self.seguidas = 0
+        self.janela.clear()
+        self.recuperacoes += 1
+        self.recuperacoes_seguidas += 1
+        if relogou:
+            self.relogins += 1
+
+    def abortar(self, restantes=0):
+        self.abortado = True
+        self.skus_abandonados = restantes
+
+    def resumo(self):
+        return {
+            "estado": "abortado" if self.abortado else ("aberto" if self.aberto else ("meio_aberto" if self.meio_aberto else "fechado")),
+            "aberturas": self.aberturas,
+            "recuperacoes": self.recuperacoes,
+            "relogins": self.relogins,
+            "maior_sequencia_falhas": self.maior_sequencia,
+            "taxa_erro_recente": round(self.taxa_atual(), 2),
+            "ultimo_motivo": self.motivo,
+            "skus_abandonados": self.skus_abandonados,
+        }
@@ -0,0 +1,139 @@
+# services/controle_execucao.py
+import asyncio
+import threading
+
+# Execuções rodando NESTE processo: {execucao_id: ControleExecucao}.
+# O Flask cancela a partir de outra thread, por isso tudo que mexe em task passa
+# por loop.call_soon_threadsafe.
+_EXECUCOES_ATIVAS = {}
+_lock_registro = threading.Lock()
+
+# Quanto tempo o fechamento de contextos de um fornecedor cancelado pode levar
+TIMEOUT_FECHAR_S = 5
+
+
+class ControleExecucao:
+    """
+    Handle de um run: tasks de login/scraping por fornecedor + cancelamento.
+    `cancelar(chave)` vale para um fornecedor; `cancelar()` para o run todo
+    (inclusive quem ainda nem começou).
+    """
+
+    def __init__(self, execucao_id, loop=None):
+        self.execucao_id = execucao_id
+        self.loop = loop
+        self.tarefas = {}
+        self.execucoes = {}
+        self.cancelados = set()
+        self.cancelado_tudo = False
+        # cancelamento repassado para outros processos (modo multiprocesso)
+        self.repassar = []
+        # logados esperando scraping: {chave: fechar()} (o cancelamento fecha na hora)
+        self.aguardando = {}
+
+    def cancelado(self, chave):
+        return self.cancelado_tudo or chave in self.cancelados
+
+    def registrar_tarefa(self, chave, tarefa):
+        self.tarefas.setdefault(chave, set()).add(tarefa)
+        tarefa.add_done_callback(lambda t: self.tarefas.get(chave, set()).discard(t))
+
+    def registrar_execucao(self, chave, execucao):
+        """ExecucaoFornecedor do fornecedor: o hook por SKU também enxerga o cancelamento."""
+        if execucao is not None:
+            self.execucoes[chave] = execucao
+            execucao.cancelado = self.cancelado(chave)
+
+    def aguardar_scraping(self, chave, fechar):
+        """Sessão logada na fila de prontos: se o fornecedor for cancelado antes do scraping, `fechar()` roda."""
+        self.aguardando[chave] = fechar
+
+    def iniciar_scraping(self, chave):
+        self.aguardando.pop(chave, None)
+
+    async def rodar(self, chave, coro):
+        """Roda `coro` como task cancelável por fornecedor."""
+        tarefa = asyncio.ensure_future(coro)
+        self.registrar_tarefa(chave, tarefa)
+        return await tarefa
+
+    def cancelar(self, chave=None):
+        """Thread-safe. Retorna as chaves afetadas."""
+        if chave:
+            self.cancelados.add(chave)
+        else:
+            self.cancelado_tudo = True
+
+        for repasse in self.repassar:
+            try:
+                repasse(chave)
+            except Exception as e:
+                print(f"⚠️ Falha ao repassar cancelamento: {e}")
+
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._cancelar_tarefas, chave)
+
+        return [chave] if chave else sorted(list(self.execucoes))
+
+    def _cancelar_tarefas(self, chave):
+        alvos = [chave] if chave else set(self.tarefas) | set(self.execucoes) | set(self.aguardando)
+        for ch in alvos:
+            if ch in self.execucoes:
+                self.execucoes[ch].cancelado = True
+            fechar = self.aguardando.pop(ch, None)
+            if fechar is not None:
+                asyncio.ensure_future(fechar())
+            for tarefa in list(self.tarefas.get(ch, ())):
+                if not tarefa.done():
+                    tarefa.cancel()
+
+    def resumo(self):
+        return {
+            "cancelado_tudo": self.cancelado_tudo,
+            "fornecedores_cancelados": sorted(self.cancelados),
+        }
+
+
+def reservar_controle(session_id):
+    """
+    Controle criado junto com a reserva do run (services/registro_runs.py), antes de
+    existir execucao_id ou event loop: o cancelamento pedido durante a preparação fica
+    guardado (cancelado_tudo/cancelados) e vale quando o run começar.
+    """
+    controle = ControleExecucao(session_id)
+    with _lock_registro:
+        _EXECUCOES_ATIVAS[session_id] = controle
+    return controle
+
+
+def registrar_controle(execucao_id, controle=None):
+    """Com `controle` (reservado pela rota), ele passa a responder também pelo execucao_id, no loop atual."""
+    controle = controle or ControleExecucao(execucao_id)
+    with _lock_registro:
+        controle.execucao_id = execucao_id
+        controle.loop = asyncio.get_running_loop()
+        _EXECUCOES_ATIVAS[execucao_id] = controle
+    return controle
+
+
+def remover_controle(execucao_id):
+    with _lock_registro:
+        _EXECUCOES_ATIVAS.pop(execucao_id, None)
+
+
+def obter_controle(execucao_id=None):
+    """Sem id: a execução ativa mais recente."""
+    with _lock_registro:
+        if execucao_id:
+            return _EXECUCOES_ATIVAS.get(execucao_id)
+        return list(_EXECUCOES_ATIVAS.values())[-1] if _EXECUCOES_ATIVAS else None
+
+
+def cancelar_execucao(execucao_id=None, chave=None):
+    """Retorna (execucao_id, chaves_afetadas) ou (None, []) se não há run ativo."""
+    controle = obter_controle(execucao_id)
+    if not controle:
+        return None, []
+    print(f"🛑 Cancelamento pedido: execução {controle.execucao_id}"
+          f"{f', fornecedor {chave}' if chave else ' (todos os fornecedores)'}.")
+    return controle.execucao_id, controle.cancelar(chave)
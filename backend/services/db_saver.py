@@ -284,3 +284,49 @@ def limpar_banco_processamento():
     finally:
         if conn:
             conn.close()
+
+
+def remover_itens_fora_da_lista(fornecedor, codigos_manter):
+    """
+    Modo incremental (o banco não é limpo): apaga os itens do fornecedor cujo código não está
+    em codigos_manter, ou seja, de códigos que saíram da planilha. Retorna quantos saíram (None se falhou).
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        with _sqlite_write_lock:
+            with conn:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS codigos_manter (codigo TEXT PRIMARY KEY);")
+                cursor.execute("DELETE FROM codigos_manter;")
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO codigos_manter (codigo) VALUES (?);",
+                    [(str(c),) for c in codigos_manter]
+                )
+                cursor.execute("""
+                    SELECT ip.id
+                    FROM itens_processados ip
+                    JOIN processamentos_lotes pl ON pl.id = ip.lote_id
+                    WHERE pl.fornecedor = ?
+                      AND CAST(ip.codigo_produto AS TEXT) NOT IN (SELECT codigo FROM codigos_manter);
+                """, (fornecedor,))
+                ids = [(row[0],) for row in cursor.fetchall()]
+
+                cursor.executemany("DELETE FROM itens_detalhes_regionais WHERE item_id = ?;", ids)
+                cursor.executemany("DELETE FROM itens_processados WHERE id = ?;", ids)
+
+        return len(ids)
+
+    except Exception as e:
+        if conn:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        print(f"❌ Erro ao remover itens fora da lista (SQLite): {e}")
+        return None
+
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,330 @@
+# services/esperas.py
+import asyncio
+import os
+import time
+import uuid
+
+# ============================================================
+# ⏱️ ESPERAS POR EVENTO (no lugar dos asyncio.sleep fixos dos loops)
+# ------------------------------------------------------------
+# Cada espera recebe o sleep antigo como TETO: termina assim que a página
+# mostra o resultado (ou o "não encontrado"), e no pior caso espera o mesmo
+# que antes. Se o evento não puder ser observado (página navegou, evaluate
+# falhou), dorme o que falta do teto: o comportamento antigo é o fallback.
+#
+#   ESPERAS_EVENTO=0            -> todos os fornecedores voltam aos sleeps fixos
+#   ESPERAS_FIXAS=jahu,takao    -> só esses voltam (A/B por fornecedor)
+# ============================================================
+
+ESPERAS_POR_EVENTO = os.getenv("ESPERAS_EVENTO", "1") != "0"
+FORNECEDORES_ESPERA_FIXA = {c.strip() for c in os.getenv("ESPERAS_FIXAS", "").split(",") if c.strip()}
+
+# Depois que o resultado aparece: deixa o framework terminar de preencher a linha/card
+ASSENTAMENTO_S = 0.25
+
+# Pausa entre um SKU e outro no modo por evento (os sleeps de "respiro" caem para isto)
+PAUSA_ENTRE_BUSCAS_S = 0.5
+
+INTERVALO_POLL_MS = 100
+
+_estatisticas = {}
+
+# Marca os nós que já estavam na tela antes da ação (propriedade JS: não dispara MutationObserver)
+_JS_MARCAR = """
+([seletores, marca]) => {
+    window.__esperaMarca = marca;
+    const visivel = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    let total = 0;
+    for (const sel of seletores) {
+        for (const el of document.querySelectorAll(sel)) {
+            el.__esperaMarca = marca;
+            el.__esperaTexto = el.innerText || '';
+            el.__esperaVisivel = visivel(el);
+            total++;
+        }
+    }
+    return total;
+}
+"""
+
+# Reinicia o relógio de "DOM parado" (instala o observer na primeira vez em cada documento)
+_JS_OBSERVAR = """
+() => {
+    const w = window;
+    if (!w.__esperaObs) {
+        w.__esperaObs = new MutationObserver(() => { w.__esperaUlt = performance.now(); });
+        w.__esperaObs.observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true, attributes: true
+        });
+    }
+    w.__esperaUlt = performance.now();
+    return true;
+}
+"""
+
+# Corrida: loader visível segura tudo; depois ganha o primeiro alvo visível que não seja
+# um nó antigo intacto; "estavel" ganha se o DOM ficou parado por estavelMs.
+# novaPagina: nada vale enquanto o documento ainda for o de antes da ação.
+_JS_CORRIDA = """
+({alvos, carregando, marca, estavelMs, exigirTexto, novaPagina}) => {
+    if (novaPagina && marca && window.__esperaMarca === marca) return false;
+    const visivel = (el) => !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+    if (carregando && Array.from(document.querySelectorAll(carregando)).some(visivel)) return false;
+    for (const [nome, sel] of alvos) {
+        for (const el of document.querySelectorAll(sel)) {
+            if (!visivel(el)) continue;
+            const texto = el.innerText || '';
+            if (exigirTexto && !texto.trim()) continue;
+            // antigo intacto = já estava visível com o mesmo texto (ng-show/ngIf que reaparece conta como novo)
+            if (marca && el.__esperaMarca === marca && el.__esperaVisivel && el.__esperaTexto === texto) continue;
+            return nome;
+        }
+    }
+    if (estavelMs) {
+        const w = window;
+        if (!w.__esperaObs) {
+            // documento novo (a busca navegou): começa a contar a partir daqui
+            w.__esperaObs = new MutationObserver(() => { w.__esperaUlt = performance.now(); });
+            w.__esperaObs.observe(document.documentElement, {
+                childList: true, subtree: true, characterData: true, attributes: true
+            });
+            w.__esperaUlt = performance.now();
+        }
+        if (performance.now() - w.__esperaUlt >= estavelMs) return 'estavel';
+    }
+    return false;
+}
+"""
+
+
+# ===================== MODO / ESTATÍSTICAS ===================== #
+def eventos_ativos(fornecedor=None):
+    return ESPERAS_POR_EVENTO and fornecedor not in FORNECEDORES_ESPERA_FIXA
+
+
+def modo_espera(fornecedor=None):
+    return "eventos" if eventos_ativos(fornecedor) else "fixo"
+
+
+def _registrar(fornecedor, inicio, teto_s, desfecho, vencedor=None):
+    gasto = time.perf_counter() - inicio
+    est = _estatisticas.setdefault(fornecedor or "?", {
+        "esperas": 0, "tempo_s": 0.0, "teto_s": 0.0, "tetos": 0, "fallbacks": 0, "vencedores": {}
+    })
+    est["esperas"] += 1
+    est["tempo_s"] += gasto
+    est["teto_s"] += teto_s
+    if desfecho == "teto":
+        est["tetos"] += 1
+    elif desfecho == "fallback":
+        est["fallbacks"] += 1
+    if vencedor:
+        est["vencedores"][vencedor] = est["vencedores"].get(vencedor, 0) + 1
+
+
+def resumo_esperas(fornecedor):
+    """Quanto das esperas o fornecedor gastou de fato vs. o que os sleeps fixos gastariam."""
+    est = _estatisticas.get(fornecedor)
+    if not est:
+        return None
+    return {
+        "modo": modo_espera(fornecedor),
+        "esperas": est["esperas"],
+        "tempo_s": round(est["tempo_s"], 2),
+        "teto_s": round(est["teto_s"], 2),
+        "economia_s": round(est["teto_s"] - est["tempo_s"], 2) + 0.0,
+        "tetos": est["tetos"],
+        "fallbacks": est["fallbacks"],
+        "vencedores": dict(est["vencedores"]),
+    }
+
+
+def zerar_esperas(fornecedor):
+    _estatisticas.pop(fornecedor, None)
+
+
+# ===================== PRIMITIVAS ===================== #
+async def marcar_estado(page, seletores):
+    """Marca o que já está na tela (tabela/cards da busca anterior) para a corrida ignorar."""
+    marca = uuid.uuid4().hex[:8]
+    try:
+        await page.evaluate(_JS_MARCAR, [list(seletores), marca])
+    except Exception:
+        pass
+    return marca
+
+
+async def pausa(fornecedor, segundos):
+    """Respiro entre SKUs: no modo por evento cai para PAUSA_ENTRE_BUSCAS_S."""
+    inicio = time.perf_counter()
+    await asyncio.sleep(segundos if not eventos_ativos(fornecedor) else min(segundos, PAUSA_ENTRE_BUSCAS_S))
+    _registrar(fornecedor, inicio, segundos, "pausa")
+
+
+class MonitorXHR:
+    """Conta XHR/fetch em voo numa aba a partir de agora (para "esperar a busca terminar")."""
+
+    def __init__(self, page, filtro=None):
+        self.page = page
+        self.filtro = filtro
+        self.vistas = 0
+        self._em_voo = set()
+        self._ocioso = asyncio.Event()
+        self._ocioso.set()
+        page.on("request", self._inicio)
+        page.on("requestfinished", self._fim)
+        page.on("requestfailed", self._fim)
+
+    def _interessa(self, request):
+        if request.resource_type not in ("xhr", "fetch"):
+            return False
+        return not self.filtro or self.filtro in request.url
+
+    def _inicio(self, request):
+        if self._interessa(request):
+            self.vistas += 1
+            self._em_voo.add(request)
+            self._ocioso.clear()
+
+    def _fim(self, request):
+        self._em_voo.discard(request)
+        if not self._em_voo:
+            self._ocioso.set()
+
+    async def esperar_ocioso(self, teto_s, primeira_s=0.5):
+        """Espera alguma XHR começar (até primeira_s) e todas terminarem. False se estourou o teto."""
+        fim = time.perf_counter() + teto_s
+        limite_primeira = min(fim, time.perf_counter() + primeira_s)
+        while not self.vistas and time.perf_counter() < limite_primeira:
+            await asyncio.sleep(INTERVALO_POLL_MS / 1000)
+        try:
+            await asyncio.wait_for(self._ocioso.wait(), timeout=max(0.0, fim - time.perf_counter()))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def soltar(self):
+        for evento, handler in (("request", self._inicio), ("requestfinished", self._fim), ("requestfailed", self._fim)):
+            try:
+                self.page.remove_listener(evento, handler)
+            except Exception:
+                pass
+
+
+async def esperar_resultado(page, alvos, teto_s, fornecedor, acao=None, marca=None, carregando=None,
+                            estavel_ms=0, aguardar_xhr=False, exigir_texto=False, nova_pagina=False):
+    """
+    Corrida "resultado x vazio x loader": `alvos` é {nome: seletor}. Com `acao` (ex.: apertar Enter),
+    marca o estado atual antes, roda a ação e ignora o que já estava na tela (ou use uma `marca`
+    de marcar_estado quando há outras esperas entre a ação e esta).
+    Retorna o nome do alvo que apareceu, "estavel" (DOM parado por estavel_ms) ou None (teto).
+    nova_pagina=True para buscas que navegam: só conta o documento carregado depois da ação.
+    """
+    if not eventos_ativos(fornecedor):
+        if acao:
+            await acao()
+        inicio = time.perf_counter()
+        await asyncio.sleep(teto_s)
+        _registrar(fornecedor, inicio, teto_s, "fixo")
+        return None
+
+    if marca is None and acao:
+        marca = await marcar_estado(page, alvos.values())
+    monitor = MonitorXHR(page) if aguardar_xhr else None
+    inicio = time.perf_counter()
+    try:
+        if acao:
+            await acao()
+
+        vencedor, desfecho = None, "evento"
+        try:
+            if monitor:
+                await monitor.esperar_ocioso(teto_s)
+            if estavel_ms:
+                try:
+                    await page.evaluate(_JS_OBSERVAR)
+                except Exception:
+                    pass
+            restante = max(0.05, teto_s - (time.perf_counter() - inicio))
+            handle = await page.wait_for_function(
+                _JS_CORRIDA,
+                arg={
+                    "alvos": list(alvos.items()),
+                    "carregando": carregando,
+                    "marca": marca,
+                    "estavelMs": estavel_ms,
+                    "exigirTexto": exigir_texto,
+                    "novaPagina": nova_pagina,
+                },
+                timeout=restante * 1000,
+                polling=INTERVALO_POLL_MS,
+            )
+            vencedor = await handle.json_value()
+            await asyncio.sleep(ASSENTAMENTO_S)
+        except Exception as e:
+            if "Timeout" in type(e).__name__ or "Timeout" in str(e):
+                desfecho = "teto"
+            else:
+                # não deu para observar (navegação no meio, contexto destruído): volta ao sleep antigo
+                desfecho = "fallback"
+                await asyncio.sleep(max(0.0, teto_s - (time.perf_counter() - inicio)))
+    finally:
+        if monitor:
+            monitor.soltar()
+
+    _registrar(fornecedor, inicio, teto_s, desfecho, vencedor)
+    return vencedor
+
+
+async def esperar_mudanca(page, seletor, teto_s, fornecedor, acao=None, marca=None,
+                          exigir_texto=True, aguardar_xhr=False):
+    """"Até a tabela/card mudar": espera um `seletor` novo (ou com texto diferente) depois da ação."""
+    vencedor = await esperar_resultado(
+        page, {"mudou": seletor}, teto_s, fornecedor, acao=acao, marca=marca,
+        aguardar_xhr=aguardar_xhr, exigir_texto=exigir_texto
+    )
+    return vencedor == "mudou"
+
+
+async def esperar_xhr(page, acao, teto_s, fornecedor, filtro=None):
+    """Roda a ação e espera as XHR/fetch que ela disparou terminarem. True se terminaram antes do teto."""
+    if not eventos_ativos(fornecedor):
+        await acao()
+        inicio = time.perf_counter()
+        await asyncio.sleep(teto_s)
+        _registrar(fornecedor, inicio, teto_s, "fixo")
+        return False
+
+    monitor = MonitorXHR(page, filtro)
+    inicio = time.perf_counter()
+    try:
+        await acao()
+        ok = await monitor.esperar_ocioso(teto_s)
+        if ok and monitor.vistas:
+            await asyncio.sleep(ASSENTAMENTO_S)
+    finally:
+        monitor.soltar()
+    _registrar(fornecedor, inicio, teto_s, "evento" if ok else "teto", "xhr" if monitor.vistas else None)
+    return ok
+
+
+async def repetir_ate_limpo(fornecedor, checar, tentativas, intervalo_s, intervalo_evento_s=0.4):
+    """
+    Checagens repetidas (ex.: fechar modais 3x a cada 1.2s). No modo por evento para na
+    primeira checagem que não encontrou nada; quem achou algo espera só intervalo_evento_s.
+    """
+    inicio = time.perf_counter()
+    teto_s = tentativas * intervalo_s
+    encontrados = 0
+    for tentativa in range(tentativas):
+        achou = await checar(tentativa)
+        if achou:
+            encontrados += 1
+        if eventos_ativos(fornecedor):
+            if not achou:
+                break
+            await asyncio.sleep(intervalo_evento_s)
+        else:
+            await asyncio.sleep(intervalo_s)
+    _registrar(fornecedor, inicio, teto_s, "evento" if eventos_ativos(fornecedor) else "fixo")
+    return encontrados
@@ -0,0 +1,269 @@
+# services/execucao_fornecedor.py
+import asyncio
+import os
+
+from services.checkpoints import marcar_fornecedor, salvar_item_checkpoint, salvar_itens_checkpoint
+from services.frescor import registrar_consulta, registrar_consultas
+from services.circuit_breaker import (
+    CircuitBreaker, FornecedorAbortado, CIRCUITO_PAUSA_S, CIRCUITO_MAX_RECUPERACOES
+)
+
+# Fila de retentativa: SKUs com erro são refeitos no fim da passada do fornecedor,
+# no mesmo contexto logado, com espera crescente (backoff * 2^(rodada-1))
+RETENTATIVA_MAX_RODADAS = int(os.getenv("RETENTATIVA_MAX_RODADAS", "2"))
+RETENTATIVA_BACKOFF_S = float(os.getenv("RETENTATIVA_BACKOFF_S", "5"))
+
+
+class ExecucaoFornecedor:
+    """
+    Estado de UM fornecedor dentro de um run.
+
+    Os processar_lista_produtos_* recebem uma fatia (execucao=...) e avisam a cada SKU;
+    aqui isso vira checkpoint (índice na lista do run + resultado parcial) e contadores.
+    `indices` mapeia a posição na lista recebida -> posição em lista_produtos do run
+    (na retomada o fornecedor recebe só os pendentes).
+
+    Com `sink` (SinkLote) os itens vão para o banco em micro-lotes durante o scraping e
+    saem da lista do controller (o save do fim do loop não acha nada). O checkpoint do
+    SKU só é gravado depois do micro-lote dele estar no banco.
+
+    O circuito (CircuitBreaker) vê o status de cada SKU; aberto, o próximo SKU espera a
+    pausa + `recuperar_func` (do runner: checa a saúde e reloga) e segue, ou o fornecedor
+    é abortado com FornecedorAbortado.
+    """
+
+    def __init__(self, execucao_id, chave, nome, total, indices=None, sink=None):
+        self.execucao_id = execucao_id
+        self.chave = chave
+        self.nome = nome
+        self.total = total
+        self.indices = indices
+        self.sink = sink
+        self.processados = 0
+        self.ok = 0
+        self.vazios = 0
+        self.falhas = 0
+        self.itens = 0
+        self._pendentes = []
+        self._itens_pendentes = 0
+
+        self.circuito = CircuitBreaker()
+        self.recuperar_func = None
+        self._lock_circuito = asyncio.Lock()
+        # marcado pelo ControleExecucao (POST /processar/cancel)
+        self.cancelado = False
+
+        # {indice_local: item} dos SKUs que falharam e ainda não foram recuperados
+        self.falhados = {}
+        self.retentados = 0
+        self.recuperados = 0
+
+    def indice_global(self, indice_local):
+        return self.indices[indice_local] if self.indices is not None else indice_local
+
+    def fatia(self, offset=0, mapa=None, pagina=None):
+        return FatiaExecucao(self, offset, mapa, pagina)
+
+    def marcar_status(self, status):
+        marcar_fornecedor(self.execucao_id, self.chave, self.nome, self.total, status)
+
+    def concluir(self):
+        """SKU com erro ou não visitado (loop que deu break) deixa o fornecedor retomável."""
+        status = "concluido" if (self.falhas == 0 and self.processados >= self.total) else "incompleto"
+        self.marcar_status(status)
+        return status
+
+    def fila_retentativa(self):
+        """[(indice_local, item), ...] dos SKUs com erro, na ordem da lista."""
+        return sorted(self.falhados.items())
+
+    async def registrar(self, indice_local, item, resultados, erro=None):
+        resultados = [r for r in (resultados or []) if r]
+        if indice_local in self.falhados:
+            # retentativa: a falha anterior sai da conta, vale o resultado novo
+            del self.falhados[indice_local]
+            self.falhas -= 1
+            self.processados -= 1
+            self.retentados += 1
+            if erro is None or resultados:
+                self.recuperados += 1
+
+        if erro is not None and not resultados:
+            status = "erro"
+            self.falhas += 1
+            self.falhados[indice_local] = item
+        elif resultados:
+            status = "ok"
+            self.ok += 1
+        else:
+            status = "vazio"
+            self.vazios += 1
+        self.processados += 1
+        self.itens += len(resultados)
+        self.circuito.registrar(status == "erro")
+
+        if self.sink is None:
+            salvar_item_checkpoint(self.execucao_id, self.chave, self.indice_global(indice_local), status, resultados)
+            registrar_consulta(self.chave, item, status, resultados)
+            return
+
+        self._pendentes.append((self.indice_global(indice_local), item, status, resultados))
+        self._itens_pendentes += len(resultados)
+        if self._itens_pendentes >= self.sink.tamanho or len(self._pendentes) >= self.sink.tamanho:
+            await self.descarregar()
+
+    async def descarregar(self):
+        """Grava o micro-lote pendente (fora do event loop) e só então os checkpoints dele."""
+        if not self._pendentes:
+            return
+        lote, self._pendentes, self._itens_pendentes = self._pendentes, [], 0
+        await asyncio.to_thread(self._gravar_lote, lote)
+
+    def _gravar_lote(self, lote):
+        itens = [r for _, _, _, resultados in lote for r in resultados]
+        no_banco = self.sink.gravar(itens)
+
+        # se o banco falhou, o resultado fica no checkpoint para a retomada salvar
+        salvar_itens_checkpoint(self.execucao_id, self.chave, [
+            (indice, status, None if no_banco else resultados)
+            for indice, _, status, resultados in lote
+        ])
+        registrar_consultas(self.chave, [(item, status, resultados) for _, item, status, resultados in lote])
+
+    async def verificar_circuito(self):
+        """Chamado antes de cada SKU. Só UMA aba/shard faz a recuperação; as outras esperam."""
+        if self.cancelado:
+            # reforça o task.cancel() caso algum `except:` do controller tenha engolido o CancelledError
+            raise asyncio.CancelledError()
+        if self.circuito.abortado:
+            raise FornecedorAbortado(f"circuito aberto: {self.circuito.motivo}")
+        if not self.circuito.aberto:
+            return
+
+        async with self._lock_circuito:
+            if self.circuito.abortado:
+                raise FornecedorAbortado(f"circuito aberto: {self.circuito.motivo}")
+            if not self.circuito.aberto:
+                return
+
+            motivo = self.circuito.motivo
+            if self.circuito.recuperacoes_seguidas >= CIRCUITO_MAX_RECUPERACOES:
+                self._abortar(f"circuito abriu de novo ({motivo}) após {self.circuito.recuperacoes_seguidas} recuperações seguidas")
+
+            print(f"🧯 {self.nome}: circuito aberto ({motivo}). Pausando {CIRCUITO_PAUSA_S:.0f}s antes de checar o portal...")
+            await asyncio.sleep(CIRCUITO_PAUSA_S)
+
+            situacao = "saudavel"
+            if self.recuperar_func:
+                try:
+                    situacao = await self.recuperar_func()
+                except Exception as e:
+                    print(f"⚠️ {self.nome}: erro na recuperação: {e}")
+                    situacao = None
+
+            if not situacao:
+                self._abortar(f"portal não se recuperou ({motivo})")
+
+            self.circuito.fechar(relogou=(situacao == "relogado"))
+            print(f"🔁 {self.nome}: {'relogado' if situacao == 'relogado' else 'portal respondeu'}, retomando os SKUs.")
+
+    def _abortar(self, motivo):
+        self.circuito.motivo = motivo
+        self.circuito.abortar(max(0, self.total - self.processados))
+        print(f"🛑 {self.nome}: abortado ({motivo}). {self.circuito.skus_abandonados} SKUs ficam para a retomada.")
+        raise FornecedorAbortado(f"circuito aberto: {motivo}")
+
+    def resumo(self):
+        resumo = {
+            "processados": self.processados,
+            "ok": self.ok,
+            "vazios": self.vazios,
+            "falhas": self.falhas,
+            "itens": self.itens,
+            "retentados": self.retentados,
+            "recuperados": self.recuperados,
+            "circuito": self.circuito.resumo(),
+        }
+        if self.sink:
+            resumo.update(self.sink.resumo())
+        return resumo
+
+
+class FatiaExecucao:
+    """
+    Visão da execução para UMA chamada de processar_lista_produtos_* (ou um shard dela).
+
+    Os loops só marcam o início de cada SKU; o que foi adicionado em `itens` desde a
+    marca anterior é o resultado daquele SKU. Assim continue/break dos loops não
+    precisam de tratamento especial.
+    """
+
+    def __init__(self, execucao, offset=0, mapa=None, pagina=None):
+        self.execucao = execucao
+        self.offset = offset
+        # retentativa: a sublista não é contígua, mapa[idx] = índice na lista do fornecedor
+        self.mapa = mapa
+        # PaginaReciclavel do loop (services/reciclagem_paginas.py): pode trocar a page entre SKUs
+        self.pagina = pagina
+        self._atual = None
+        self._marca = 0
+        self._erro = None
+        # SKUs da sublista já registrados (os loops vão em ordem): onde uma retentativa continua
+        self.feitos = 0
+
+    async def registrar(self, idx, item, resultados, erro=None):
+        indice = self.mapa[idx] if self.mapa is not None else self.offset + idx
+        self.feitos = max(self.feitos, idx + 1)
+        await self.execucao.registrar(indice, item, resultados, erro)
+        return self.execucao.sink is not None
+
+    async def proximo(self, idx, item, itens):
+        await self._fechar_atual(itens)
+        await self.execucao.verificar_circuito()
+        if self.pagina is not None:
+            await self.pagina.entre_skus()
+        self._atual = (idx, item)
+        self._marca = len(itens)
+        self._erro = None
+
+    def falha(self, erro):
+        self._erro = erro
+
+    async def finalizar(self, itens):
+        await self._fechar_atual(itens)
+
+    async def _fechar_atual(self, itens):
+        if self._atual is None:
+            return
+        idx, item = self._atual
+        self._atual = None
+        if await self.registrar(idx, item, itens[self._marca:], erro=self._erro):
+            # já foi para o sink: a lista do controller não acumula o run inteiro
+            del itens[self._marca:]
+
+
+# ============================================================
+# Atalhos usados nos loops dos controllers (execucao=None => não faz nada)
+# ============================================================
+async def acompanhar_item(execucao, idx, item, itens):
+    if execucao:
+        await execucao.proximo(idx, item, itens)
+
+
+def marcar_falha(execucao, erro):
+    if execucao:
+        execucao.falha(erro)
+
+
+async def finalizar_itens(execucao, itens):
+    if execucao:
+        await execucao.finalizar(itens)
+
+
+async def registrar_item(execucao, idx, item, resultados, erro=None):
+    """True => o item foi para o sink e o controller não precisa guardá-lo."""
+    if execucao:
+        consumido = await execucao.registrar(idx, item, resultados, erro)
+        await execucao.execucao.verificar_circuito()
+        return consumido
+    return False
@@ -0,0 +1,76 @@
+# services/extracao_dom.py
+
+# ============================================================
+# 🧾 EXTRAÇÃO DO DOM NUM ÚNICO page.evaluate
+# ------------------------------------------------------------
+# Cada inner_text / get_attribute / count num locator é uma ida e volta ao
+# navegador. Aqui o controller declara os campos da linha/card e TODOS são lidos
+# de uma vez, em JS, devolvendo JSON puro. O controller continua montando o item
+# do jeito dele (clean_price, format_brl, regiões...).
+#
+# Campo = dict:
+#   "sel":    CSS relativo à linha/card (vazio => o próprio elemento)
+#   "coluna": índice do <td> da linha (no lugar de "sel"; = tr.locator("td").nth(n))
+#   "attr":   lê o atributo em vez do texto (= get_attribute)
+#   "ultimo": pega o último match em vez do primeiro (= .last)
+#   "todos":  lista com o valor de cada match
+#   "existe": True/False se há match (= count() > 0)
+#   "campos": lista de sub-dicts, um por match (ex.: as UFs de um card)
+#   "obrigatorio": sem valor => CampoAusente (onde o inner_text antigo estourava)
+#
+# Textos já vêm com trim (os controllers sempre faziam .strip()).
+# ============================================================
+
+_JS_EXTRAIR = """
+([seletor, campos, limite]) => {
+    const texto = el => (el.innerText ?? el.textContent ?? '').trim();
+    const ler = (raiz, campos) => {
+        const saida = {};
+        for (const [nome, c] of Object.entries(campos)) {
+            let els;
+            if (c.coluna !== undefined && c.coluna !== null) {
+                const td = raiz.querySelectorAll('td')[c.coluna];
+                els = td ? [td] : [];
+            } else if (!c.sel) {
+                els = [raiz];
+            } else {
+                els = Array.from(raiz.querySelectorAll(c.sel));
+            }
+
+            if (c.existe) { saida[nome] = els.length > 0; continue; }
+            if (c.campos) { saida[nome] = els.map(el => ler(el, c.campos)); continue; }
+
+            const valor = el => c.attr ? el.getAttribute(c.attr) : texto(el);
+            if (c.todos) { saida[nome] = els.map(valor); continue; }
+
+            const el = c.ultimo ? els[els.length - 1] : els[0];
+            saida[nome] = el ? valor(el) : null;
+        }
+        return saida;
+    };
+
+    let linhas = Array.from(document.querySelectorAll(seletor));
+    if (limite) linhas = linhas.slice(0, limite);
+    return linhas.map(linha => ler(linha, campos));
+}
+"""
+
+
+class CampoAusente(ValueError):
+    pass
+
+
+async def extrair_linhas(page, seletor, campos, limite=None):
+    """Lê `campos` de cada elemento `seletor` (até `limite`) numa ida só ao navegador."""
+    linhas = await page.evaluate(_JS_EXTRAIR, [seletor, campos, limite or 0])
+    for linha in linhas:
+        for nome, campo in campos.items():
+            if campo.get("obrigatorio") and linha.get(nome) is None:
+                raise CampoAusente(f"campo '{nome}' não encontrado em {seletor}")
+    return linhas
+
+
+async def extrair_primeira(page, seletor, campos):
+    """Só a primeira linha/card (o que os controllers faziam com .first). None se não há nenhum."""
+    linhas = await extrair_linhas(page, seletor, campos, limite=1)
+    return linhas[0] if linhas else None
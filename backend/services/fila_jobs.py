@@ -0,0 +1,241 @@
+# services/fila_jobs.py
+import json
+import os
+import time
+import uuid
+
+from configs.db import get_connection
+from services.db_saver import _sqlite_write_lock
+
+# Lease: quanto tempo um worker segura o job sem renovar. Worker morto => lease vence
+# e o job volta para a fila (conta como tentativa).
+LEASE_JOB_S = float(os.getenv("LEASE_JOB_S", "300"))
+MAX_TENTATIVAS_JOB = int(os.getenv("MAX_TENTATIVAS_JOB", "3"))
+
+SQL_TABELA_JOBS = """
+    CREATE TABLE IF NOT EXISTS jobs_fornecedores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        execucao_id TEXT,
+        chave TEXT,
+        prioridade REAL DEFAULT 0,
+        status TEXT DEFAULT 'pendente',
+        tentativas INTEGER DEFAULT 0,
+        max_tentativas INTEGER,
+        worker_id TEXT,
+        token TEXT,
+        lease_ate_ts REAL,
+        payload_json TEXT,
+        resultado_json TEXT,
+        erro TEXT,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (execucao_id, chave)
+    );
+"""
+
+
+def _executar_escrita(sql, params=()):
+    """Retorna rowcount (0 = nada mudou / outro worker chegou antes) ou None em erro."""
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                return conn.execute(sql, params).rowcount
+    except Exception as e:
+        print(f"⚠️ Falha na fila de jobs: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def garantir_tabela_jobs():
+    return _executar_escrita(SQL_TABELA_JOBS) is not None
+
+
+def enfileirar_execucao(execucao_id, fornecedores_config, lista_produtos, prioridades=None):
+    """1 job por (execução, fornecedor). A lista vai no payload (a retomada/incremental manda só os pendentes)."""
+    prioridades = prioridades or {}
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                for config in fornecedores_config:
+                    payload = {
+                        "lista_produtos": config.get("lista_produtos", lista_produtos),
+                        "indices": config.get("indices"),
+                    }
+                    conn.execute("""
+                        INSERT INTO jobs_fornecedores
+                        (execucao_id, chave, prioridade, status, max_tentativas, payload_json)
+                        VALUES (?, ?, ?, 'pendente', ?, ?)
+                        ON CONFLICT(execucao_id, chave) DO NOTHING;
+                    """, (execucao_id, config["chave"], prioridades.get(config["chave"], 0.0),
+                          MAX_TENTATIVAS_JOB, json.dumps(payload, ensure_ascii=False)))
+        print(f"📬 {len(fornecedores_config)} jobs enfileirados para a execução {execucao_id}.")
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao enfileirar jobs: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def liberar_leases_vencidos():
+    """Job de worker morto volta para 'pendente' (ou 'falhou' se já esgotou as tentativas)."""
+    agora = time.time()
+    falhou = _executar_escrita("""
+        UPDATE jobs_fornecedores
+        SET status = 'falhou', erro = 'lease vencido (worker parou de responder)',
+            token = NULL, atualizado_em = CURRENT_TIMESTAMP
+        WHERE status = 'executando' AND lease_ate_ts < ? AND tentativas >= max_tentativas;
+    """, (agora,)) or 0
+    voltou = _executar_escrita("""
+        UPDATE jobs_fornecedores
+        SET status = 'pendente', worker_id = NULL, token = NULL, atualizado_em = CURRENT_TIMESTAMP
+        WHERE status = 'executando' AND lease_ate_ts < ?;
+    """, (agora,)) or 0
+    if falhou or voltou:
+        print(f"⏰ Leases vencidos: {voltou} jobs de volta à fila, {falhou} desistidos.")
+    return voltou + falhou
+
+
+def reivindicar_job(worker_id, lease_s=LEASE_JOB_S, chaves=None):
+    """
+    Pega o próximo job pendente (maior prioridade primeiro) para este worker.
+    O UPDATE com token é atômico no SQLite: dois workers nunca ficam com o mesmo job.
+    Retorna dict do job ou None.
+    """
+    liberar_leases_vencidos()
+
+    token = uuid.uuid4().hex
+    filtro = ""
+    params = [worker_id, token, time.time() + lease_s]
+    if chaves:
+        filtro = f"AND chave IN ({', '.join('?' for _ in chaves)})"
+        params.extend(chaves)
+
+    mudou = _executar_escrita(f"""
+        UPDATE jobs_fornecedores
+        SET status = 'executando', worker_id = ?, token = ?, lease_ate_ts = ?,
+            tentativas = tentativas + 1, atualizado_em = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM jobs_fornecedores
+            WHERE status = 'pendente' {filtro}
+            ORDER BY prioridade DESC, id
+            LIMIT 1
+        );
+    """, params)
+    if not mudou:
+        return None
+
+    conn = None
+    try:
+        conn = get_connection()
+        row = conn.execute("SELECT * FROM jobs_fornecedores WHERE token = ?;", (token,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job.pop("payload_json") or "{}")
+        return job
+    finally:
+        if conn:
+            conn.close()
+
+
+def renovar_lease(job, lease_s=LEASE_JOB_S):
+    """False => o job não é mais deste worker (lease venceu e outro pegou)."""
+    mudou = _executar_escrita("""
+        UPDATE jobs_fornecedores SET lease_ate_ts = ?, atualizado_em = CURRENT_TIMESTAMP
+        WHERE id = ? AND token = ? AND status = 'executando';
+    """, (time.time() + lease_s, job["id"], job["token"]))
+    return bool(mudou)
+
+
+def concluir_job(job, resultado):
+    mudou = _executar_escrita("""
+        UPDATE jobs_fornecedores
+        SET status = 'concluido', resultado_json = ?, erro = ?, token = NULL, atualizado_em = CURRENT_TIMESTAMP
+        WHERE id = ? AND token = ?;
+    """, (json.dumps(resultado, ensure_ascii=False, default=str), resultado.get("erro") or None, job["id"], job["token"]))
+    return bool(mudou)
+
+
+def falhar_job(job, erro):
+    """Erro do worker (não do fornecedor): volta para a fila enquanto houver tentativas."""
+    mudou = _executar_escrita("""
+        UPDATE jobs_fornecedores
+        SET status = CASE WHEN tentativas >= max_tentativas THEN 'falhou' ELSE 'pendente' END,
+            erro = ?, worker_id = NULL, token = NULL, atualizado_em = CURRENT_TIMESTAMP
+        WHERE id = ? AND token = ?;
+    """, (str(erro), job["id"], job["token"]))
+    return bool(mudou)
+
+
+def resumo_jobs(execucao_id):
+    """{"execucao_id", "contagem": {status: n}, "jobs": [...]} sem os dados extraídos."""
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT id, chave, status, tentativas, max_tentativas, worker_id, lease_ate_ts, erro,
+                   criado_em, atualizado_em, resultado_json
+            FROM jobs_fornecedores WHERE execucao_id = ? ORDER BY id;
+        """, (execucao_id,)).fetchall()
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler a fila de jobs: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+    jobs = []
+    contagem = {}
+    for r in rows:
+        job = dict(r)
+        resultado = json.loads(job.pop("resultado_json") or "{}")
+        job["itens"] = resultado.get("itens", 0)
+        job["login_ok"] = resultado.get("login_ok")
+        jobs.append(job)
+        contagem[job["status"]] = contagem.get(job["status"], 0) + 1
+
+    return {"execucao_id": execucao_id, "contagem": contagem, "jobs": jobs}
+
+
+def ultima_execucao_enfileirada():
+    conn = None
+    try:
+        conn = get_connection()
+        row = conn.execute("SELECT execucao_id FROM jobs_fornecedores ORDER BY id DESC LIMIT 1;").fetchone()
+        return row["execucao_id"] if row else None
+    except Exception:
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def execucao_em_fila():
+    """
+    Execução distribuída ainda em andamento (jobs pendentes ou com worker) ou None.
+    Conta como run ativo no single-flight do app: enquanto houver job na fila, os
+    workers ainda escrevem no banco.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        row = conn.execute("""
+            SELECT execucao_id, MIN(criado_em) AS inicio, COUNT(*) AS jobs
+            FROM jobs_fornecedores WHERE status IN ('pendente', 'executando')
+            GROUP BY execucao_id ORDER BY MIN(id) LIMIT 1;
+        """).fetchone()
+        return dict(row) if row else None
+    except Exception:
+        # tabela ainda não existe: nunca houve execução distribuída
+        return None
+    finally:
+        if conn:
+            conn.close()
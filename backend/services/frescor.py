@@ -0,0 +1,147 @@
+# services/frescor.py
+import json
+import os
+import time
+
+from configs.db import get_connection
+from services.db_saver import _sqlite_write_lock
+
+# Quanto tempo uma consulta (fornecedor, código) vale no modo incremental.
+# Cada fornecedor pode sobrescrever com "ttl_horas" na config do runner.
+TTL_FRESCOR_HORAS = float(os.getenv("TTL_FRESCOR_HORAS", "6"))
+
+# Só esses resultados contam como frescos; "erro" sempre é consultado de novo
+STATUS_FRESCOS = ("ok", "vazio")
+
+SQL_TABELA_CONSULTAS = """
+    CREATE TABLE IF NOT EXISTS consultas_fornecedores (
+        chave TEXT,
+        codigo TEXT,
+        quantidade INTEGER,
+        status TEXT,
+        consultado_em_ts REAL,
+        codigos_itens TEXT,
+        PRIMARY KEY (chave, codigo)
+    );
+"""
+
+
+def garantir_tabela_consultas():
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                conn.execute(SQL_TABELA_CONSULTAS)
+                colunas = {r["name"] for r in conn.execute("PRAGMA table_info(consultas_fornecedores);")}
+                if "codigos_itens" not in colunas:
+                    # tabelas de antes da limpeza do incremental: sem o mapa, a consulta não conta como fresca
+                    conn.execute("ALTER TABLE consultas_fornecedores ADD COLUMN codigos_itens TEXT;")
+        return True
+    except Exception as e:
+        print(f"⚠️ Não foi possível garantir consultas_fornecedores: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def _codigos_itens(resultados):
+    """Códigos com que os itens da busca foram gravados (o portal pode devolver outro código)."""
+    return json.dumps(sorted({str(r["codigo"]) for r in resultados or [] if r and r.get("codigo") is not None}))
+
+
+def registrar_consultas(chave, consultas):
+    """
+    consultas = [(item, status, resultados), ...]; chamado pelo ExecucaoFornecedor a cada SKU/micro-lote.
+    Guarda também os códigos dos itens gravados (ver codigos_da_lista); num "erro" fica o mapa anterior.
+    """
+    agora = time.time()
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO consultas_fornecedores (chave, codigo, quantidade, status, consultado_em_ts, codigos_itens)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(chave, codigo) DO UPDATE SET
+                        quantidade = excluded.quantidade,
+                        status = excluded.status,
+                        consultado_em_ts = excluded.consultado_em_ts,
+                        codigos_itens = CASE WHEN excluded.status = 'erro'
+                            THEN consultas_fornecedores.codigos_itens ELSE excluded.codigos_itens END;
+                """, [
+                    (chave, str(item.get("codigo")), item.get("quantidade"), status, agora, _codigos_itens(resultados))
+                    for item, status, resultados in consultas
+                ])
+        return True
+    except Exception as e:
+        print(f"⚠️ Falha ao registrar consultas de {chave}: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def registrar_consulta(chave, item, status, resultados=None):
+    return registrar_consultas(chave, [(item, status, resultados)])
+
+
+def indices_frescos(chave, lista_produtos, ttl_horas):
+    """
+    Índices de lista_produtos que o fornecedor consultou há menos de ttl_horas,
+    com resultado válido e a mesma quantidade (qtdSolicitada/valor_total gravados continuam certos).
+    """
+    if not ttl_horas or ttl_horas <= 0:
+        return set()
+
+    limite = time.time() - ttl_horas * 3600
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT codigo, quantidade FROM consultas_fornecedores
+            WHERE chave = ? AND consultado_em_ts >= ? AND status IN (?, ?) AND codigos_itens IS NOT NULL;
+        """, (chave, limite, *STATUS_FRESCOS)).fetchall()
+    except Exception as e:
+        print(f"⚠️ Frescor indisponível para {chave} ({e}). Consultando tudo.")
+        return set()
+    finally:
+        if conn:
+            conn.close()
+
+    frescos = {r["codigo"]: r["quantidade"] for r in rows}
+    return {
+        i for i, item in enumerate(lista_produtos)
+        if str(item.get("codigo")) in frescos and frescos[str(item.get("codigo"))] == item.get("quantidade")
+    }
+
+
+def codigos_da_lista(chave, lista_produtos):
+    """
+    Códigos que os itens do fornecedor podem ter no banco para a lista atual: os da planilha
+    e os que a busca de cada um devolveu da última vez. None se a tabela não pôde ser lida.
+    """
+    codigos = {str(item.get("codigo")) for item in lista_produtos}
+    conn = None
+    try:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT codigo, codigos_itens FROM consultas_fornecedores
+            WHERE chave = ? AND codigos_itens IS NOT NULL;
+        """, (chave,)).fetchall()
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler as consultas de {chave} ({e}).")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+    for r in rows:
+        if r["codigo"] in codigos:
+            try:
+                codigos.update(json.loads(r["codigos_itens"]))
+            except Exception:
+                pass
+    return codigos
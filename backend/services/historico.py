@@ -0,0 +1,209 @@
+# services/historico.py
+from configs.db import get_connection
+from services.db_saver import _sqlite_write_lock
+
+# Sem histórico ainda: chute conservador (s/SKU) e login médio
+TEMPO_POR_ITEM_PADRAO_S = 6.0
+TEMPO_LOGIN_PADRAO_S = 30.0
+
+# Quantos runs recentes entram na média de cada fornecedor
+JANELA_HISTORICO = 5
+
+SQL_TABELA_HISTORICO = """
+    CREATE TABLE IF NOT EXISTS historico_fornecedores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        execucao_id TEXT,
+        chave TEXT,
+        fornecedor TEXT,
+        iniciado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        login_ok BOOLEAN,
+        itens_solicitados INTEGER,
+        itens_retornados INTEGER,
+        tempo_login_s REAL,
+        tempo_fila_s REAL,
+        tempo_scraping_s REAL,
+        tempo_por_item_s REAL,
+        previsto_fim_s REAL,
+        concluido_fim_s REAL,
+        modo_espera TEXT
+    );
+"""
+
+# Colunas adicionadas depois da criação da tabela (bancos antigos recebem via ALTER TABLE)
+COLUNAS_NOVAS_HISTORICO = {
+    "modo_espera": "TEXT",
+}
+
+
+def garantir_tabela_historico():
+    """Bancos criados antes desta tabela existir não rodam o websrc.sql de novo."""
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                conn.execute(SQL_TABELA_HISTORICO)
+                existentes = {r["name"] for r in conn.execute("PRAGMA table_info(historico_fornecedores);").fetchall()}
+                for coluna, tipo in COLUNAS_NOVAS_HISTORICO.items():
+                    if coluna not in existentes:
+                        conn.execute(f"ALTER TABLE historico_fornecedores ADD COLUMN {coluna} {tipo};")
+        return True
+    except Exception as e:
+        print(f"⚠️ Não foi possível garantir historico_fornecedores: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def estimar_duracoes(chaves):
+    """
+    Retorna {chave: {"login_s", "por_item_s", "amostras"}} pela média dos últimos runs.
+    Fornecedor sem histórico recebe a média dos outros (ou os padrões).
+    """
+    estimativas = {}
+    conn = None
+    try:
+        conn = get_connection()
+        for chave in chaves:
+            rows = conn.execute("""
+                SELECT tempo_login_s, tempo_por_item_s
+                FROM historico_fornecedores
+                WHERE chave = ? AND login_ok = 1 AND tempo_por_item_s IS NOT NULL
+                ORDER BY id DESC
+                LIMIT ?;
+            """, (chave, JANELA_HISTORICO)).fetchall()
+
+            if rows:
+                estimativas[chave] = {
+                    "login_s": sum(r["tempo_login_s"] or 0.0 for r in rows) / len(rows),
+                    "por_item_s": sum(r["tempo_por_item_s"] for r in rows) / len(rows),
+                    "amostras": len(rows),
+                }
+    except Exception as e:
+        print(f"⚠️ Histórico indisponível para agenda ({e}). Usando estimativas padrão.")
+    finally:
+        if conn:
+            conn.close()
+
+    conhecidos = list(estimativas.values())
+    por_item_padrao = (sum(e["por_item_s"] for e in conhecidos) / len(conhecidos)) if conhecidos else TEMPO_POR_ITEM_PADRAO_S
+    login_padrao = (sum(e["login_s"] for e in conhecidos) / len(conhecidos)) if conhecidos else TEMPO_LOGIN_PADRAO_S
+
+    for chave in chaves:
+        estimativas.setdefault(chave, {"login_s": login_padrao, "por_item_s": por_item_padrao, "amostras": 0})
+
+    return estimativas
+
+
+def simular_agenda(previsoes, concorrencia_login, concorrencia_scraping):
+    """
+    Simula o pipeline (login -> fila por prioridade -> scraping) e devolve
+    {chave: previsto_fim_s}. `previsoes` vem na ordem de início dos logins:
+    [(chave, login_s, scraping_s), ...]
+    """
+    livres_login = [0.0] * max(1, concorrencia_login)
+    prontos = []
+    for chave, login_s, scraping_s in previsoes:
+        i = livres_login.index(min(livres_login))
+        livres_login[i] += login_s
+        prontos.append([livres_login[i], chave, scraping_s])
+
+    livres_scraping = [0.0] * max(1, concorrencia_scraping)
+    previsto_fim = {}
+    while prontos:
+        i = livres_scraping.index(min(livres_scraping))
+        agora = max(livres_scraping[i], min(p[0] for p in prontos))
+        candidatos = [p for p in prontos if p[0] <= agora]
+        escolhido = max(candidatos, key=lambda p: p[2])
+        prontos.remove(escolhido)
+
+        livres_scraping[i] = agora + escolhido[2]
+        previsto_fim[escolhido[1]] = round(livres_scraping[i], 1)
+
+    return previsto_fim
+
+
+def registrar_historico(execucao_id, resultados, itens_solicitados):
+    conn = None
+    try:
+        conn = get_connection()
+        with _sqlite_write_lock:
+            with conn:
+                for r in resultados:
+                    # na retomada cada fornecedor recebe só os SKUs pendentes
+                    solicitados = r.get("itens_solicitados", itens_solicitados)
+                    tempo_scraping = r.get("tempo_scraping_s")
+                    por_item = (tempo_scraping / solicitados) if (r.get("login_ok") and tempo_scraping and solicitados) else None
+                    conn.execute("""
+                        INSERT INTO historico_fornecedores
+                        (execucao_id, chave, fornecedor, login_ok, itens_solicitados, itens_retornados,
+                         tempo_login_s, tempo_fila_s, tempo_scraping_s, tempo_por_item_s,
+                         previsto_fim_s, concluido_fim_s, modo_espera)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                    """, (
+                        execucao_id,
+                        r.get("chave"),
+                        r.get("fornecedor"),
+                        bool(r.get("login_ok")),
+                        solicitados,
+                        r.get("itens", 0),
+                        r.get("tempo_login_s"),
+                        r.get("tempo_fila_s"),
+                        tempo_scraping,
+                        por_item,
+                        r.get("previsto_fim_s"),
+                        r.get("concluido_fim_s"),
+                        r.get("modo_espera"),
+                    ))
+        return True
+    except Exception as e:
+        print(f"⚠️ Falha ao registrar histórico de durações: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def comparar_modos_espera(chaves=None, janela=JANELA_HISTORICO):
+    """
+    A/B das esperas (services/esperas.py): média de s/SKU dos últimos runs de cada fornecedor
+    com esperas por evento vs. com os sleeps fixos (ESPERAS_FIXAS / ESPERAS_EVENTO=0).
+    Retorna {chave: {"fornecedor", "eventos", "fixo", "economia_por_item_s", "economia_pct"}}.
+    """
+    comparativo = {}
+    conn = None
+    try:
+        conn = get_connection()
+        if chaves is None:
+            chaves = [r["chave"] for r in conn.execute(
+                "SELECT DISTINCT chave FROM historico_fornecedores WHERE modo_espera IS NOT NULL;"
+            ).fetchall()]
+        for chave in chaves:
+            linha = {"fornecedor": None, "eventos": None, "fixo": None,
+                     "economia_por_item_s": None, "economia_pct": None}
+            for modo in ("eventos", "fixo"):
+                rows = conn.execute("""
+                    SELECT fornecedor, tempo_por_item_s
+                    FROM historico_fornecedores
+                    WHERE chave = ? AND modo_espera = ? AND login_ok = 1 AND tempo_por_item_s IS NOT NULL
+                    ORDER BY id DESC
+                    LIMIT ?;
+                """, (chave, modo, janela)).fetchall()
+                if rows:
+                    linha["fornecedor"] = rows[0]["fornecedor"]
+                    linha[modo] = {
+                        "por_item_s": round(sum(r["tempo_por_item_s"] for r in rows) / len(rows), 2),
+                        "amostras": len(rows),
+                    }
+            if linha["eventos"] and linha["fixo"]:
+                economia = linha["fixo"]["por_item_s"] - linha["eventos"]["por_item_s"]
+                linha["economia_por_item_s"] = round(economia, 2)
+                linha["economia_pct"] = round(100 * economia / linha["fixo"]["por_item_s"], 1) if linha["fixo"]["por_item_s"] else None
+            comparativo[chave] = linha
+    except Exception as e:
+        print(f"⚠️ Histórico indisponível para o comparativo de esperas ({e}).")
+    finally:
+        if conn:
+            conn.close()
+    return comparativo
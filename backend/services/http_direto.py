@@ -0,0 +1,263 @@
+# services/http_direto.py
+import asyncio
+import os
+import time
+from urllib.parse import quote, quote_plus, urlsplit, urlunsplit
+
+from services.captura_respostas import OPCOES_ITEM, captura_ativa, montar_item, produto_da_resposta, requisicao_aprendida
+from services.execucao_fornecedor import registrar_item
+
+# ============================================================
+# ⚡ MODO HTTP DIRETO (busca sem dirigir o navegador)
+# ------------------------------------------------------------
+# Nos portais cuja busca é um endpoint JSON, o 1º SKU vai pelo navegador e a
+# CapturaBusca (services/captura_respostas.py) guarda a requisição que trouxe o
+# produto. Dela sai um ModeloBusca (URL/corpo com o código trocado por um
+# marcador, headers de auth/XSRF), e os demais SKUs viram requisições diretas
+# pelo context.request do Playwright: mesmo cookie jar do contexto logado, pool
+# de conexões próprio, sem renderizar nada. Concorrência alta com limite de
+# requisições/s por fornecedor. O que falhar (HTTP != 2xx, JSON inválido,
+# produto fora da resposta) volta para o fluxo do navegador.
+#
+# Aqui não há tela para desmentir um campo mal lido: só roda para fornecedor com a
+# captura JSON ligada, ou seja, com mapeamento explícito conferido contra respostas
+# gravadas (CAPTURA_RESPOSTAS_LIGADA + MAPEAMENTOS, services/captura_respostas.py).
+# HTTP_DIRETO=0 desliga para todos; HTTP_DIRETO_DESLIGADO=dpk,takao para alguns.
+# ============================================================
+
+HTTP_DIRETO_ATIVO = os.getenv("HTTP_DIRETO", "1") != "0"
+FORNECEDORES_SEM_HTTP = {c.strip() for c in os.getenv("HTTP_DIRETO_DESLIGADO", "").split(",") if c.strip()}
+
+CONCORRENCIA_HTTP = int(os.getenv("HTTP_DIRETO_CONCORRENCIA", "8"))
+TIMEOUT_HTTP_S = 20
+# falhas seguidas que desligam o HTTP no run (ex.: token expirou): o resto vai pelo navegador
+MAX_FALHAS_HTTP_SEGUIDAS = 5
+
+# Requisições por segundo por fornecedor (quem não está aqui usa o padrão)
+LIMITE_RPS = {
+    "portalcomdip": 4.0,
+    "dpk": 4.0,
+    "takao": 2.0,
+    "furacao": 3.0,
+}
+LIMITE_RPS_PADRAO = 2.0
+
+MARCADOR_CODIGO = "__CODIGO_BUSCA__"
+
+# O cookie vem do próprio contexto; o resto destes o cliente recalcula
+CABECALHOS_DESCARTADOS = {"cookie", "content-length", "host", "connection", "accept-encoding", "transfer-encoding"}
+
+_estatisticas = {}
+
+
+class ErroHttpDireto(Exception):
+    pass
+
+
+def http_direto_ativo(fornecedor):
+    return HTTP_DIRETO_ATIVO and fornecedor not in FORNECEDORES_SEM_HTTP and captura_ativa(fornecedor)
+
+
+def resumo_http(fornecedor):
+    """{"modelo", "http", "navegador", "requisicoes", "tempo_s", "por_sku_s", "desligado"} do último run."""
+    e = _estatisticas.get(fornecedor)
+    if not e:
+        return None
+    resumo = dict(e)
+    resumo["tempo_s"] = round(e["tempo_s"], 2)
+    resumo["por_sku_s"] = round(e["tempo_s"] / e["http"], 3) if e["http"] else None
+    return resumo
+
+
+def zerar_http(fornecedor):
+    _estatisticas.pop(fornecedor, None)
+
+
+def _stats(fornecedor):
+    return _estatisticas.setdefault(fornecedor, {
+        "modelo": None, "http": 0, "navegador": 0, "requisicoes": 0, "tempo_s": 0.0, "desligado": None,
+    })
+
+
+class ModeloBusca:
+    """Requisição de busca aprendida no navegador, com o código no lugar de MARCADOR_CODIGO."""
+
+    def __init__(self, url, metodo="GET", headers=None, corpo=None):
+        self.url = url
+        self.metodo = metodo
+        self.headers = headers or {}
+        self.corpo = corpo
+
+    @classmethod
+    def de_requisicao(cls, requisicao):
+        """None se o código buscado não aparece na URL nem no corpo (não dá para reaproveitar)."""
+        if not requisicao:
+            return None
+        codigo = str(requisicao["codigo"])
+        url, corpo = requisicao["url"], requisicao.get("corpo")
+
+        achou = False
+        for forma in (quote(codigo, safe=""), quote_plus(codigo), codigo):
+            if forma in url:
+                url = url.replace(forma, MARCADOR_CODIGO)
+                achou = True
+                break
+        if corpo:
+            for forma in (codigo, quote_plus(codigo)):
+                if forma in corpo:
+                    corpo = corpo.replace(forma, MARCADOR_CODIGO)
+                    achou = True
+                    break
+        if not achou:
+            return None
+
+        headers = {
+            k: v for k, v in (requisicao.get("headers") or {}).items()
+            if not k.startswith(":") and k.lower() not in CABECALHOS_DESCARTADOS
+        }
+        return cls(url, requisicao.get("metodo") or "GET", headers, corpo)
+
+    def montar(self, codigo):
+        """(url, metodo, headers, corpo) da busca de `codigo`."""
+        codigo = str(codigo)
+        url = self.url.replace(MARCADOR_CODIGO, quote(codigo, safe=""))
+        corpo = self.corpo
+        if corpo:
+            tipo = next((v for k, v in self.headers.items() if k.lower() == "content-type"), "")
+            valor = quote_plus(codigo) if "urlencoded" in tipo else codigo.replace("\\", "\\\\").replace('"', '\\"')
+            corpo = corpo.replace(MARCADOR_CODIGO, valor)
+        return url, self.metodo, self.headers, corpo
+
+    def com_origem(self, origem):
+        """Mesma requisição apontando para outro host (ex.: servidor de replay local)."""
+        base = urlsplit(origem)
+        partes = urlsplit(self.url)
+        url = urlunsplit((base.scheme, base.netloc, partes.path, partes.query, partes.fragment))
+        return ModeloBusca(url, self.metodo, dict(self.headers), self.corpo)
+
+    def resumo(self):
+        partes = urlsplit(self.url)
+        return f"{self.metodo} {partes.netloc}{partes.path}"
+
+
+def modelo_da_busca(fornecedor):
+    return ModeloBusca.de_requisicao(requisicao_aprendida(fornecedor))
+
+
+class LimitadorTaxa:
+    """Espaça as requisições de um fornecedor em no máximo `por_segundo` por segundo (entre todos os workers)."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        async with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+async def buscar_http(requisitante, modelo, fornecedor, codigo, quantidade=1, timeout_s=TIMEOUT_HTTP_S):
+    """
+    Uma busca direta. `requisitante` é um APIRequestContext (context.request ou
+    playwright.request.new_context()). Item no formato dos controllers, ou None se o
+    produto não veio na resposta. ErroHttpDireto se a resposta não serve.
+    """
+    url, metodo, headers, corpo = modelo.montar(codigo)
+    resposta = await requisitante.fetch(
+        url, method=metodo, headers=headers, data=corpo,
+        timeout=timeout_s * 1000, fail_on_status_code=False,
+    )
+    try:
+        if not resposta.ok:
+            raise ErroHttpDireto(f"HTTP {resposta.status}")
+        try:
+            dados = await resposta.json()
+        except Exception:
+            raise ErroHttpDireto("resposta não é JSON")
+    finally:
+        try:
+            await resposta.dispose()
+        except:
+            pass
+
+    produto = produto_da_resposta(fornecedor, dados, codigo)
+    if not produto:
+        return None
+    return montar_item(produto, quantidade, **OPCOES_ITEM.get(fornecedor, {}))
+
+
+async def extrair_via_http(fornecedor, nome, requisitante, modelo, pendentes, execucao=None, concorrencia=None):
+    """
+    Roda `pendentes` ([(indice, item)] da lista do fornecedor) em requisições diretas.
+
+    Retorna (itens, para_navegador): `itens` são os resultados que NÃO foram para o sink
+    (sem execucao, cabe ao chamador gravar) e `para_navegador` os (indice, item) que
+    precisam do fluxo normal.
+    """
+    stats = _stats(fornecedor)
+    stats["modelo"] = modelo.resumo()
+    limitador = LimitadorTaxa(LIMITE_RPS.get(fornecedor, LIMITE_RPS_PADRAO))
+    fatia = execucao.fatia() if execucao else None
+
+    fila = asyncio.Queue()
+    for pendente in pendentes:
+        fila.put_nowait(pendente)
+
+    itens, para_navegador = [], []
+    estado = {"falhas_seguidas": 0}
+    inicio = time.perf_counter()
+
+    async def worker():
+        while True:
+            try:
+                indice, item = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            if stats["desligado"]:
+                para_navegador.append((indice, item))
+                continue
+            if execucao:
+                await execucao.verificar_circuito()
+
+            await limitador.aguardar()
+            stats["requisicoes"] += 1
+            try:
+                resultado = await buscar_http(requisitante, modelo, fornecedor, item["codigo"], item.get("quantidade", 1))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                estado["falhas_seguidas"] += 1
+                if estado["falhas_seguidas"] >= MAX_FALHAS_HTTP_SEGUIDAS and not stats["desligado"]:
+                    stats["desligado"] = f"{estado['falhas_seguidas']} falhas seguidas ({e})"
+                    print(f"⚠️ {nome}: HTTP direto desligado: {stats['desligado']}. O resto vai pelo navegador.")
+                para_navegador.append((indice, item))
+                continue
+
+            estado["falhas_seguidas"] = 0
+            if resultado is None:
+                # fora da resposta: o navegador decide (pode ser variação de código que a tela resolve)
+                para_navegador.append((indice, item))
+                continue
+
+            stats["http"] += 1
+            print(f"⚡ {nome}: {item['codigo']} | {resultado['preco_formatado']} | Estoque: {resultado['qtdDisponivel']}")
+            if not await registrar_item(fatia, indice, item, [resultado]):
+                itens.append(resultado)
+
+    n_workers = max(1, min(concorrencia or CONCORRENCIA_HTTP, len(pendentes)))
+    try:
+        await asyncio.gather(*(worker() for _ in range(n_workers)))
+    finally:
+        stats["tempo_s"] += time.perf_counter() - inicio
+
+    para_navegador.sort(key=lambda p: p[0])
+    stats["navegador"] += len(para_navegador)
+    return itens, para_navegador
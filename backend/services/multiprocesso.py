@@ -0,0 +1,256 @@
+# services/multiprocesso.py
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+# Processos filhos são "spawn": o Flask roda o processamento numa thread, e fork com
+# threads vivas (lock do stdout, do SQLite, do driver do Playwright) pode travar o filho.
+CONTEXTO_MP = multiprocessing.get_context("spawn")
+
+# Sem sinal do filho por esse tempo => considera o processo morto
+TIMEOUT_SILENCIO_S = float(os.getenv("TIMEOUT_SILENCIO_PROCESSO_S", "1800"))
+
+
+class _StdoutParaFila:
+    """stdout do processo filho: cada linha vai para o pai (que imprime no LogCapture)."""
+
+    def __init__(self, fila, prefixo):
+        self.fila = fila
+        self.prefixo = prefixo
+        self._pendente = ""
+
+    def write(self, text):
+        self._pendente += text
+        while "\n" in self._pendente:
+            linha, self._pendente = self._pendente.split("\n", 1)
+            if linha.strip():
+                self.fila.put(("log", f"{self.prefixo} {linha}"))
+
+    def flush(self):
+        if self._pendente.strip():
+            self.fila.put(("log", f"{self.prefixo} {self._pendente}"))
+        self._pendente = ""
+
+
+def distribuir_fornecedores(fornecedores_config, n_processos, duracao_prevista):
+    """
+    Divide os fornecedores entre os processos equilibrando a duração prevista
+    (mesmo LPT da agenda: o mais demorado vai para o processo menos carregado).
+    Mantém a ordem original dentro de cada grupo.
+    """
+    n_processos = max(1, min(n_processos, len(fornecedores_config)))
+    cargas = [0.0] * n_processos
+    grupos = [[] for _ in range(n_processos)]
+
+    ordem = sorted(range(len(fornecedores_config)),
+                   key=lambda i: duracao_prevista.get(fornecedores_config[i]["chave"], 0.0), reverse=True)
+    for i in ordem:
+        alvo = cargas.index(min(cargas))
+        grupos[alvo].append(i)
+        cargas[alvo] += duracao_prevista.get(fornecedores_config[i]["chave"], 0.0)
+
+    return [sorted(g) for g in grupos if g]
+
+
+def dividir_limite(limite, tamanhos):
+    """
+    Reparte um limite global (ex.: 5 logins simultâneos) entre os processos:
+    mínimo 1 cada, o resto vai para quem tem mais fornecedores sem vaga.
+    """
+    limites = [1] * len(tamanhos)
+    sobra = limite - len(tamanhos)
+    while sobra > 0:
+        candidatos = [i for i in range(len(tamanhos)) if limites[i] < tamanhos[i]]
+        if not candidatos:
+            break
+        i = max(candidatos, key=lambda i: tamanhos[i] - limites[i])
+        limites[i] += 1
+        sobra -= 1
+    return limites
+
+
+def _ouvir_controle(fila_controle, execucao_id):
+    """Thread do filho: repassa ("cancelar", chave_ou_None) do pai para o ControleExecucao local."""
+    from services.controle_execucao import obter_controle
+
+    while True:
+        msg = fila_controle.get()
+        if msg is None:
+            return
+        if msg[0] != "cancelar":
+            continue
+        # o controle do filho nasce no executar_em_pool; o pedido pode chegar antes
+        controle = obter_controle(execucao_id)
+        while controle is None:
+            time.sleep(0.2)
+            controle = obter_controle(execucao_id)
+        controle.cancelar(msg[1])
+
+
+def _processo_fornecedores(numero, fila, chaves, ajustes, lista_produtos,
+                           concorrencia_login, concorrencia_scraping, prioridades, execucao_id,
+                           fila_controle=None):
+    """Entrada do processo filho: event loop + Playwright + BrowserPool próprios."""
+    sys.stdout = sys.stderr = _StdoutParaFila(fila, f"[P{numero}]")
+
+    if fila_controle is not None:
+        threading.Thread(target=_ouvir_controle, args=(fila_controle, execucao_id), daemon=True).start()
+
+    try:
+        from runner import montar_fornecedores_config, executar_em_pool
+
+        # funções de login/processamento não são picklable: a config é remontada aqui pela chave
+        por_chave = {c["chave"]: c for c in montar_fornecedores_config()}
+        configs = [dict(por_chave[ch], **ajustes.get(ch, {})) for ch in chaves]
+
+        resultados, etapas, resumo_pool = asyncio.run(executar_em_pool(
+            configs, lista_produtos, concorrencia_login, concorrencia_scraping,
+            prioridades, execucao_id
+        ))
+        sys.stdout.flush()
+        fila.put(("resultado", numero, resultados, etapas, resumo_pool))
+
+    except Exception as e:
+        sys.stdout.flush()
+        fila.put(("erro", numero, repr(e)))
+
+
+def _juntar_etapas(lista_etapas):
+    soma = lambda campo: round(sum(e.get(campo, 0.0) for e in lista_etapas), 2)
+    maior = lambda campo: round(max((e.get(campo, 0.0) for e in lista_etapas), default=0.0), 2)
+    return {
+        "total_s": maior("total_s"),
+        "login_s": maior("login_s"),
+        "scraping_s": maior("scraping_s"),
+        "soma_login_s": soma("soma_login_s"),
+        "soma_fila_s": soma("soma_fila_s"),
+        "soma_scraping_s": soma("soma_scraping_s"),
+        "concorrencia_login": sum(e.get("concorrencia_login", 0) for e in lista_etapas),
+        "concorrencia_scraping": sum(e.get("concorrencia_scraping", 0) for e in lista_etapas),
+        "processos": len(lista_etapas),
+    }
+
+
+def _juntar_pools(resumos):
+    return {
+        "navegadores_ativos": sum(r.get("navegadores_ativos", 0) for r in resumos),
+        "total_lancamentos": sum(r.get("total_lancamentos", 0) for r in resumos),
+        "lancamentos_headed": sum(r.get("lancamentos_headed", 0) for r in resumos),
+        "tempo_lancamento_s": round(sum(r.get("tempo_lancamento_s", 0.0) for r in resumos), 2),
+    }
+
+
+async def executar_em_processos(fornecedores_config, lista_produtos, n_processos,
+                                concorrencia_login, concorrencia_scraping,
+                                prioridades, execucao_id, controle=None):
+    """
+    Roda o pipeline (login -> fila -> scraping) em N processos, cada um com um grupo
+    de fornecedores. Logs chegam no pai linha a linha (prefixo [Pn]) e os resultados
+    voltam no mesmo formato de executar_pipeline, na ordem de fornecedores_config.
+    prioridades = {chave: scraping previsto}, usado também para equilibrar os grupos.
+    Com controle, um cancelamento no pai é repassado a todos os filhos por uma fila própria.
+    Retorna (resultados, etapas, resumo_pool).
+    """
+    grupos = distribuir_fornecedores(fornecedores_config, n_processos, prioridades)
+    tamanhos = [len(g) for g in grupos]
+    limites_login = dividir_limite(concorrencia_login, tamanhos)
+    limites_scraping = dividir_limite(concorrencia_scraping, tamanhos)
+
+    print(f"🧵 Distribuindo {len(fornecedores_config)} fornecedores em {len(grupos)} processos:")
+    fila = CONTEXTO_MP.Queue()
+    filas_controle = []
+    processos = {}
+    for n, grupo in enumerate(grupos, start=1):
+        configs = [fornecedores_config[i] for i in grupo]
+        print(f"   • P{n}: {', '.join(c['nome'] for c in configs)}")
+
+        chaves = [c["chave"] for c in configs]
+        ajustes = {
+            c["chave"]: {k: c[k] for k in ("lista_produtos", "indices") if k in c}
+            for c in configs
+        }
+        fila_controle = CONTEXTO_MP.Queue()
+        filas_controle.append(fila_controle)
+        proc = CONTEXTO_MP.Process(
+            target=_processo_fornecedores,
+            args=(n, fila, chaves, ajustes, lista_produtos,
+                  limites_login[n - 1], limites_scraping[n - 1],
+                  {ch: prioridades.get(ch, 0.0) for ch in chaves}, execucao_id, fila_controle),
+            daemon=True,
+        )
+        proc.start()
+        processos[n] = (proc, configs)
+
+    if controle is not None:
+        controle.repassar.append(lambda chave: [f.put(("cancelar", chave)) for f in filas_controle])
+
+    loop = asyncio.get_running_loop()
+    resultados_por_chave = {}
+    etapas_processos = []
+    pools = []
+    pendentes = set(processos)
+
+    def _ler_fila():
+        try:
+            return fila.get(timeout=5)
+        except queue.Empty:
+            return None
+
+    ultimo_sinal = time.monotonic()
+    while pendentes:
+        msg = await loop.run_in_executor(None, _ler_fila)
+
+        if msg is None:
+            # processo que morreu sem mandar nada (OOM, kill) não pode travar o run
+            for n in list(pendentes):
+                proc, configs = processos[n]
+                if not proc.is_alive() or time.monotonic() - ultimo_sinal > TIMEOUT_SILENCIO_S:
+                    print(f"❌ P{n} terminou sem resultado (exitcode {proc.exitcode}).")
+                    for c in configs:
+                        resultados_por_chave[c["chave"]] = _resultado_processo_perdido(c, f"Processo P{n} morreu")
+                    pendentes.discard(n)
+            continue
+
+        ultimo_sinal = time.monotonic()
+        if msg[0] == "log":
+            print(msg[1])
+        elif msg[0] == "resultado":
+            _, n, resultados, etapas, resumo_pool = msg
+            for r in resultados:
+                resultados_por_chave[r["chave"]] = r
+            etapas_processos.append(etapas)
+            pools.append(resumo_pool)
+            pendentes.discard(n)
+            print(f"✅ P{n} concluído.")
+        elif msg[0] == "erro":
+            _, n, erro = msg
+            print(f"🔥 P{n} falhou: {erro}")
+            for c in processos[n][1]:
+                resultados_por_chave.setdefault(c["chave"], _resultado_processo_perdido(c, erro))
+            pendentes.discard(n)
+
+    for f in filas_controle:
+        f.put(None)
+    for proc, _ in processos.values():
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.terminate()
+
+    resultados = [resultados_por_chave[c["chave"]] for c in fornecedores_config if c["chave"] in resultados_por_chave]
+    return resultados, _juntar_etapas(etapas_processos), _juntar_pools(pools)
+
+
+def _resultado_processo_perdido(config, erro):
+    return {
+        "chave": config["chave"],
+        "fornecedor": config["nome"],
+        "login_ok": False,
+        "erro": erro,
+        "itens": 0,
+        "sessao_reutilizada": False,
+        "tempo_login_s": 0.0,
+    }
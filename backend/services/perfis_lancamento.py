@@ -0,0 +1,191 @@
+# services/perfis_lancamento.py
+import contextvars
+import json
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+
+# ============================================================
+# 🧭 PERFIS DE LANÇAMENTO (headless por padrão, headed só como fallback)
+# ------------------------------------------------------------
+# Os login_* continuam com HEADLESS/slow_mo próprios, mas todo launch passa pelo
+# BrowserPool, que aplica o perfil daqui: headless + sem slow_mo + scripts stealth.
+# Se o login headless de um fornecedor falha, o runner tenta de novo headed
+# (DISPLAY do servidor ou um Xvfb próprio) e lembra disso por FALLBACK_HEADED_HORAS.
+# ============================================================
+
+# NAVEGADOR_HEADLESS=0 volta ao comportamento antigo (o que cada controller pedir)
+NAVEGADOR_HEADLESS = os.getenv("NAVEGADOR_HEADLESS", "1") != "0"
+FALLBACK_HEADED_HORAS = float(os.getenv("FALLBACK_HEADED_HORAS", "24"))
+ARQUIVO_PERFIS = os.getenv("PERFIS_NAVEGADOR_ARQUIVO", "data/perfis_navegador.json")
+
+# Fornecedores que sempre sobem headed (ex.: portal que detecta headless mesmo com stealth)
+SEMPRE_HEADED = {c.strip() for c in os.getenv("FORNECEDORES_HEADED", "").split(",") if c.strip()}
+
+# UA de desktop para contextos que não definem user_agent (o padrão headless diz "HeadlessChrome")
+USER_AGENT_PADRAO = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Remove as diferenças mais checadas entre Chromium headless e um Chrome comum
+SCRIPT_STEALTH_HEADLESS = """
+(() => {
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'languages', { get: () => ['pt-BR', 'pt', 'en-US', 'en'] });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+    window.chrome = window.chrome || { runtime: {}, app: {}, csi: () => {}, loadTimes: () => {} };
+    const query = window.navigator.permissions && window.navigator.permissions.query;
+    if (query) {
+        window.navigator.permissions.query = (p) => p && p.name === 'notifications'
+            ? Promise.resolve({ state: Notification.permission })
+            : query.call(window.navigator.permissions, p);
+    }
+    if (window.WebGLRenderingContext) {
+        const getParameter = WebGLRenderingContext.prototype.getParameter;
+        WebGLRenderingContext.prototype.getParameter = function (p) {
+            if (p === 37445) return 'Intel Inc.';
+            if (p === 37446) return 'Intel Iris OpenGL Engine';
+            return getParameter.call(this, p);
+        };
+    }
+})();
+"""
+
+# Perfil do login em andamento (setado pelo runner; o BrowserPool lê no launch)
+_perfil_atual = contextvars.ContextVar("perfil_lancamento", default=None)
+
+_xvfb = {"processo": None, "display": None}
+
+
+# ===================== FALLBACK HEADED (persistido) ===================== #
+def _ler_perfis():
+    try:
+        with open(ARQUIVO_PERFIS, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _gravar_perfis(perfis):
+    try:
+        os.makedirs(os.path.dirname(ARQUIVO_PERFIS) or ".", exist_ok=True)
+        temporario = f"{ARQUIVO_PERFIS}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(perfis, f, ensure_ascii=False)
+        os.replace(temporario, ARQUIVO_PERFIS)
+    except Exception as e:
+        print(f"⚠️ Não foi possível salvar perfis de navegador: {e}")
+
+
+def fallback_headed_ativo(chave):
+    if chave in SEMPRE_HEADED:
+        return True
+    info = _ler_perfis().get(chave) or {}
+    return time.time() < info.get("headed_ate_ts", 0)
+
+
+def registrar_fallback_headed(chave, motivo=""):
+    perfis = _ler_perfis()
+    perfis[chave] = {"headed_ate_ts": time.time() + FALLBACK_HEADED_HORAS * 3600, "motivo": str(motivo)[:200]}
+    _gravar_perfis(perfis)
+    print(f"🖥️ {chave}: headless bloqueado. Próximos logins sobem headed por {FALLBACK_HEADED_HORAS:.0f}h.")
+
+
+# ===================== DISPLAY (headed em servidor) ===================== #
+def garantir_display():
+    """DISPLAY para um launch headed: o do ambiente, um Xvfb já iniciado, ou sobe um. None se não há como."""
+    if os.environ.get("DISPLAY"):
+        return os.environ["DISPLAY"]
+    if _xvfb["processo"] is not None and _xvfb["processo"].poll() is None:
+        return _xvfb["display"]
+    if not shutil.which("Xvfb"):
+        return None
+
+    display = f":{90 + os.getpid() % 100}"
+    try:
+        _xvfb["processo"] = subprocess.Popen(
+            ["Xvfb", display, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        time.sleep(0.5)
+        if _xvfb["processo"].poll() is not None:
+            return None
+        _xvfb["display"] = display
+        print(f"🖥️ Xvfb iniciado em {display} para logins headed.")
+        return display
+    except Exception as e:
+        print(f"⚠️ Não foi possível iniciar o Xvfb: {e}")
+        return None
+
+
+def headed_disponivel():
+    return garantir_display() is not None
+
+
+# ===================== PERFIL DO LOGIN ATUAL ===================== #
+@contextmanager
+def perfil_lancamento(chave=None, headed=None):
+    """
+    Vale para os launches feitos dentro do bloco (mesma task asyncio).
+    headed=None decide pelo fallback persistido do fornecedor.
+    """
+    if headed is None:
+        headed = chave is not None and fallback_headed_ativo(chave)
+    token = _perfil_atual.set({"chave": chave, "headed": headed})
+    try:
+        yield
+    finally:
+        _perfil_atual.reset(token)
+
+
+def fornecedor_do_perfil():
+    """Chave do fornecedor cujo login está lançando o navegador (None fora de perfil_lancamento)."""
+    return (_perfil_atual.get() or {}).get("chave")
+
+
+def aplicar_perfil(kwargs):
+    """Ajusta os kwargs de chromium.launch pedidos pelo controller conforme o perfil atual."""
+    kwargs = dict(kwargs)
+    if not NAVEGADOR_HEADLESS:
+        # modo antigo: respeita o que o controller pediu
+        return kwargs
+
+    perfil = _perfil_atual.get() or {}
+    if perfil.get("headed"):
+        if preparar_display(kwargs):
+            kwargs["headless"] = False
+            return kwargs
+        print(f"⚠️ {perfil.get('chave') or 'navegador'}: headed pedido mas não há DISPLAY/Xvfb. Seguindo headless.")
+
+    # headless: slow_mo só servia para acompanhar o navegador na tela
+    kwargs["headless"] = True
+    kwargs["slow_mo"] = 0
+    kwargs.pop("env", None)
+    return kwargs
+
+
+def preparar_display(kwargs):
+    """
+    Launch headed: garante um DISPLAY e, se for o Xvfb próprio, passa no env do Chromium.
+    O env é montado na hora (nunca vem de sessão salva). False se não há display.
+    """
+    display = garantir_display()
+    if not display:
+        return False
+    if display != os.environ.get("DISPLAY"):
+        kwargs["env"] = dict(os.environ, DISPLAY=display)
+    else:
+        kwargs.pop("env", None)
+    return True
+
+
+def opcoes_contexto_headless(kwargs):
+    """Contexto novo num Chromium headless: UA de desktop e viewport de desktop (sem janela, no_viewport vira 800x600)."""
+    kwargs = dict(kwargs)
+    kwargs.setdefault("user_agent", USER_AGENT_PADRAO)
+    if kwargs.pop("no_viewport", False) or not kwargs.get("viewport"):
+        kwargs["viewport"] = {"width": 1366, "height": 768}
+    return kwargs
@@ -0,0 +1,226 @@
+# services/reciclagem_paginas.py
+import os
+import statistics
+import time
+
+from services.sharding import preparar_aba
+
+# ============================================================
+# ♻️ RECICLAGEM DE PÁGINAS EM RUNS SEQUENCIAIS LONGOS
+# ------------------------------------------------------------
+# Nas SPAs (Laguna, Sama, Takao, PLS...) a mesma page faz centenas de buscas e
+# acumula DOM, heap JS e nós soltos até o portal ficar lento ou travar no
+# loading. O runner entrega ao controller uma PaginaReciclavel: tudo é repassado
+# para a page atual, e entre um SKU e outro (gancho do checkpoint, ver
+# FatiaExecucao.proximo) ela mede o heap via CDP (Performance.getMetrics, só
+# Chromium) e a deriva da latência por SKU. Passou do limite => abre uma page
+# nova no MESMO contexto logado, na URL pós-login, e fecha a antiga.
+#
+# RECICLAGEM_PAGINAS=0 desliga; RECICLAGEM_DESLIGADA=laguna,sama para alguns.
+# ============================================================
+
+RECICLAGEM_ATIVA = os.getenv("RECICLAGEM_PAGINAS", "1") != "0"
+FORNECEDORES_SEM_RECICLAGEM = {c.strip() for c in os.getenv("RECICLAGEM_DESLIGADA", "").split(",") if c.strip()}
+
+HEAP_MAX_MB = float(os.getenv("RECICLAGEM_HEAP_MAX_MB", "350"))
+# latência recente (mediana) > DERIVA_MAX x a do início da page, e pelo menos DERIVA_MIN_S a mais
+DERIVA_MAX = float(os.getenv("RECICLAGEM_DERIVA", "2.0"))
+DERIVA_MIN_S = float(os.getenv("RECICLAGEM_DERIVA_MIN_S", "1.5"))
+JANELA_LATENCIA = int(os.getenv("RECICLAGEM_JANELA", "10"))
+INTERVALO_MEDICAO = int(os.getenv("RECICLAGEM_INTERVALO", "10"))   # mede a cada N SKUs
+MIN_SKUS = int(os.getenv("RECICLAGEM_MIN_SKUS", "30"))            # SKUs mínimos numa page antes de reciclar
+
+_estatisticas = {}
+
+
+def reciclagem_ativa(fornecedor):
+    return RECICLAGEM_ATIVA and fornecedor not in FORNECEDORES_SEM_RECICLAGEM
+
+
+def resumo_reciclagem(fornecedor):
+    """{"reciclagens", "heap_max_mb", "heap_liberado_mb", "eventos"} do último run."""
+    e = _estatisticas.get(fornecedor)
+    if not e:
+        return None
+    eventos = e["eventos"]
+    return {
+        "reciclagens": len(eventos),
+        "heap_max_mb": e["heap_max_mb"],
+        "heap_liberado_mb": round(sum(
+            ev["heap_antes_mb"] - ev["heap_depois_mb"]
+            for ev in eventos if ev["heap_antes_mb"] is not None and ev["heap_depois_mb"] is not None
+        ), 1),
+        "eventos": eventos[-10:],
+    }
+
+
+def zerar_reciclagem(fornecedor):
+    _estatisticas.pop(fornecedor, None)
+
+
+def _stats(fornecedor):
+    return _estatisticas.setdefault(fornecedor, {"heap_max_mb": None, "eventos": []})
+
+
+def embrulhar_pagina(config, context, page):
+    """PaginaReciclavel para fornecedores sequenciais (com a reciclagem ligada); senão a própria page."""
+    if config.get("tipo") == "parallel" or not reciclagem_ativa(config.get("chave")):
+        return page
+    return PaginaReciclavel(page, context, config.get("chave"), config["nome"])
+
+
+def pagina_monitorada(page):
+    """A própria page se for reciclável (para o gancho entre SKUs), senão None."""
+    return page if isinstance(page, PaginaReciclavel) else None
+
+
+class PaginaReciclavel:
+    """
+    Proxy da page do controller. Atributos/métodos vão para a page atual; `atual`
+    é a page real. Só troca entre SKUs, então locators criados dentro de um SKU
+    continuam valendo.
+    """
+
+    def __init__(self, page, context, fornecedor, nome, url_base=None):
+        self._page = page
+        self._context = context
+        self._fornecedor = fornecedor
+        self._nome = nome
+        self._url = url_base or page.url
+        self._cdp = None
+        self._cdp_de = None
+        self._sem_cdp = False
+        self._skus = 0
+        self._skus_na_pagina = 0
+        self._ultimo_t = None
+        self._latencias = []
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self._page, nome)
+
+    def __repr__(self):
+        return f"<PaginaReciclavel {self._nome} {self._page!r}>"
+
+    @property
+    def atual(self):
+        return self._page
+
+    def irma(self, page):
+        """Mesma política para outra aba do contexto (shards de processar_em_abas)."""
+        return PaginaReciclavel(page, self._context, self._fornecedor, self._nome)
+
+    async def medir(self):
+        """{"heap_mb", "nos", "listeners", "documentos"} da page atual via CDP. None fora do Chromium."""
+        if self._sem_cdp:
+            return None
+        try:
+            if self._cdp is None or self._cdp_de is not self._page:
+                self._cdp = await self._context.new_cdp_session(self._page)
+                await self._cdp.send("Performance.enable")
+                self._cdp_de = self._page
+        except Exception:
+            # Firefox/WebKit: fica só a deriva de latência
+            self._sem_cdp = True
+            return None
+        try:
+            resposta = await self._cdp.send("Performance.getMetrics")
+        except Exception:
+            self._cdp = None
+            return None
+
+        metricas = {m["name"]: m["value"] for m in resposta.get("metrics", [])}
+        medida = {
+            "heap_mb": round(metricas.get("JSHeapUsedSize", 0) / 1048576, 1),
+            "nos": int(metricas.get("Nodes", 0)),
+            "listeners": int(metricas.get("JSEventListeners", 0)),
+            "documentos": int(metricas.get("Documents", 0)),
+        }
+        stats = _stats(self._fornecedor)
+        stats["heap_max_mb"] = max(stats["heap_max_mb"] or 0.0, medida["heap_mb"])
+        return medida
+
+    def _deriva(self):
+        """(mediana do início, mediana recente) se a latência por SKU derivou, senão None."""
+        if len(self._latencias) < 2 * JANELA_LATENCIA:
+            return None
+        inicio = statistics.median(self._latencias[:JANELA_LATENCIA])
+        recente = statistics.median(self._latencias[-JANELA_LATENCIA:])
+        if recente > inicio * DERIVA_MAX and recente - inicio > DERIVA_MIN_S:
+            return inicio, recente
+        return None
+
+    async def entre_skus(self):
+        """Gancho chamado antes de cada SKU: mede de tempos em tempos e recicla se precisar."""
+        agora = time.perf_counter()
+        if self._ultimo_t is not None:
+            self._latencias.append(agora - self._ultimo_t)
+        self._ultimo_t = agora
+        self._skus += 1
+        self._skus_na_pagina += 1
+
+        if self._skus_na_pagina < MIN_SKUS or self._skus_na_pagina % INTERVALO_MEDICAO:
+            return
+
+        medida = await self.medir()
+        motivo = None
+        if medida and medida["heap_mb"] > HEAP_MAX_MB:
+            motivo = f"heap {medida['heap_mb']:.0f} MB > {HEAP_MAX_MB:.0f} MB"
+        else:
+            deriva = self._deriva()
+            if deriva:
+                motivo = f"latência {deriva[0]:.1f}s -> {deriva[1]:.1f}s por SKU"
+        if motivo:
+            await self.reciclar(motivo, medida)
+
+    async def reciclar(self, motivo, antes=None):
+        """Troca a page atual por uma nova no mesmo contexto. False se não conseguiu (segue com a atual)."""
+        if antes is None:
+            antes = await self.medir()
+        latencia_antes = statistics.median(self._latencias[-JANELA_LATENCIA:]) if self._latencias else None
+
+        nova = None
+        try:
+            nova = await self._context.new_page()
+            await preparar_aba(nova, self._url)
+        except Exception as e:
+            print(f"⚠️ {self._nome}: não deu para reciclar a página ({e}). Seguindo com a atual.")
+            if nova is not None:
+                try:
+                    await nova.close()
+                except:
+                    pass
+            self._skus_na_pagina = 0
+            return False
+
+        velha, self._page = self._page, nova
+        self._cdp = None
+        try:
+            await velha.close()
+        except:
+            pass
+        depois = await self.medir()
+
+        evento = {
+            "sku": self._skus,
+            "skus_na_pagina": self._skus_na_pagina,
+            "motivo": motivo,
+            "heap_antes_mb": antes["heap_mb"] if antes else None,
+            "heap_depois_mb": depois["heap_mb"] if depois else None,
+            "nos_antes": antes["nos"] if antes else None,
+            "nos_depois": depois["nos"] if depois else None,
+            "latencia_antes_s": round(latencia_antes, 2) if latencia_antes is not None else None,
+        }
+        _stats(self._fornecedor)["eventos"].append(evento)
+
+        memoria = (
+            f"heap {evento['heap_antes_mb']} -> {evento['heap_depois_mb']} MB, nós {evento['nos_antes']} -> {evento['nos_depois']}"
+            if antes and depois else "sem métricas CDP"
+        )
+        print(f"♻️ {self._nome}: página reciclada após {self._skus_na_pagina} SKUs ({motivo}). {memoria}.")
+
+        self._skus_na_pagina = 0
+        self._ultimo_t = None
+        self._latencias = []
+        return True
@@ -0,0 +1,91 @@
+# services/registro_runs.py
+import os
+import threading
+import uuid
+from datetime import datetime
+
+# Quantos processamentos (POST /processar) podem rodar ao mesmo tempo neste servidor.
+# Acima de 1 os runs dividem o mesmo LogCapture (logs misturados) e o modo "completo"
+# limpa o banco de quem já está rodando: só aumente para runs incremental/retomar.
+MAX_RUNS_SIMULTANEOS = int(os.getenv("MAX_RUNS_SIMULTANEOS", "1"))
+
+# Runs terminados que continuam consultáveis em /processar/status
+MAX_RUNS_HISTORICO = 20
+
+STATUS_ATIVOS = ("iniciando", "processando")
+
+_runs = {}
+_lock_runs = threading.Lock()
+
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def reservar_run(modo, processos=None, limite=None):
+    """
+    Single-flight: cria o registro do run se há vaga. Retorna (run, None) ou
+    (None, run_ativo_mais_antigo) quando o limite de runs simultâneos já foi atingido.
+    A checagem e a reserva acontecem sob o mesmo lock (dois cliques não passam os dois).
+    """
+    limite = limite or MAX_RUNS_SIMULTANEOS
+    with _lock_runs:
+        ativos = [r for r in _runs.values() if r["status"] in STATUS_ATIVOS]
+        if len(ativos) >= limite:
+            return None, dict(ativos[0])
+
+        run = {
+            "session_id": str(uuid.uuid4()),
+            "execucao_id": None,
+            "modo": modo,
+            "processos": processos,
+            "status": "iniciando",
+            "inicio": _agora(),
+            "fim": None,
+            "total_processado": 0,
+            "erro": None,
+        }
+        _runs[run["session_id"]] = run
+        _podar_historico()
+        return dict(run), None
+
+
+def liberar_run(session_id):
+    """Desfaz uma reserva que não virou run (nada foi iniciado, não entra no histórico)."""
+    with _lock_runs:
+        _runs.pop(session_id, None)
+
+
+def atualizar_run(session_id, **campos):
+    with _lock_runs:
+        if session_id in _runs:
+            _runs[session_id].update(campos)
+
+
+def finalizar_run(session_id, status, **campos):
+    """status: concluido | cancelado | erro."""
+    atualizar_run(session_id, status=status, fim=_agora(), **campos)
+
+
+def obter_run(session_id=None):
+    """Sem session_id: o run ativo mais antigo ou, sem ativo, o último que terminou."""
+    with _lock_runs:
+        if session_id:
+            run = _runs.get(session_id)
+            return dict(run) if run else None
+        if not _runs:
+            return None
+        ativos = [r for r in _runs.values() if r["status"] in STATUS_ATIVOS]
+        # dict mantém a ordem de criação
+        return dict(ativos[0] if ativos else list(_runs.values())[-1])
+
+
+def runs_ativos():
+    with _lock_runs:
+        return [dict(r) for r in _runs.values() if r["status"] in STATUS_ATIVOS]
+
+
+def _podar_historico():
+    terminados = [r for r in _runs.values() if r["status"] not in STATUS_ATIVOS]
+    for run in terminados[:max(0, len(terminados) - MAX_RUNS_HISTORICO)]:
+        _runs.pop(run["session_id"], None)
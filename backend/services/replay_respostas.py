@@ -0,0 +1,113 @@
+# services/replay_respostas.py
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote_plus
+
+from services.captura_respostas import PASTA_GRAVACOES_TESTE, normalizar_codigo, produto_da_resposta
+
+# ============================================================
+# 📼 SERVIDOR DE REPLAY (respostas gravadas das buscas)
+# ------------------------------------------------------------
+# Com GRAVAR_RESPOSTAS=<pasta> a CapturaBusca salva <pasta>/<fornecedor>/<codigo>.json
+# ({"codigo", "quantidade", "respostas": [{"requisicao", "resposta"}], "item_dom"}).
+# Este servidor local devolve, para qualquer rota, a resposta em que o mapeamento
+# do fornecedor acha o produto: procura o código gravado no path/query/corpo da
+# requisição. Assim o modo HTTP direto e o parser (localizar_produto/montar_item)
+# rodam sem o portal, sem login e sem rede.
+# ============================================================
+
+PASTA_GRAVACOES_PADRAO = PASTA_GRAVACOES_TESTE
+
+
+def carregar_gravacoes(pasta, fornecedor):
+    """{codigo_normalizado: gravação} de um fornecedor (formato antigo, 1 requisicao/resposta, também vale)."""
+    gravacoes = {}
+    base = os.path.join(pasta, fornecedor)
+    if not os.path.isdir(base):
+        return gravacoes
+    for arquivo in sorted(os.listdir(base)):
+        if not arquivo.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(base, arquivo), encoding="utf-8") as f:
+                gravacao = json.load(f)
+            if "respostas" not in gravacao:
+                gravacao = {"codigo": gravacao["requisicao"]["codigo"], "respostas": [gravacao], "item_dom": None}
+            gravacoes[normalizar_codigo(gravacao["codigo"])] = gravacao
+        except Exception as e:
+            print(f"⚠️ Gravação inválida {arquivo}: {e}")
+    return gravacoes
+
+
+def respostas_do_produto(fornecedor, gravacoes):
+    """{codigo: {"requisicao", "resposta"}}: em cada gravação, a resposta em que o mapeamento acha o produto."""
+    achadas = {}
+    for codigo, gravacao in gravacoes.items():
+        for r in gravacao["respostas"]:
+            if produto_da_resposta(fornecedor, r["resposta"], gravacao["codigo"]):
+                achadas[codigo] = r
+                break
+    return achadas
+
+
+class ServidorReplay:
+    """Servidor HTTP numa thread. Use como context manager; `origem` = http://127.0.0.1:<porta>."""
+
+    def __init__(self, gravacoes, porta=0):
+        """gravacoes = {codigo: {"requisicao", "resposta"}} (ver respostas_do_produto)."""
+        self.gravacoes = gravacoes
+        self.requisicoes = 0
+        self.nao_encontradas = 0
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _responder(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho).decode("utf-8", "ignore") if tamanho else ""
+                gravacao = servidor.procurar(unquote_plus(self.path) + " " + corpo)
+                servidor.requisicoes += 1
+                if gravacao is None:
+                    servidor.nao_encontradas += 1
+                    payload, status = {"itens": []}, 200
+                else:
+                    payload, status = gravacao["resposta"], 200
+                dados = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            do_GET = _responder
+            do_POST = _responder
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self._thread = None
+
+    @property
+    def origem(self):
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def procurar(self, texto):
+        """Gravação cujo código aparece na requisição (o código mais longo ganha: 123 x 1234)."""
+        texto = normalizar_codigo(texto)
+        for codigo in sorted(self.gravacoes, key=len, reverse=True):
+            if codigo and codigo in texto:
+                return self.gravacoes[codigo]
+        return None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        return False
@@ -0,0 +1,193 @@
+# services/sessoes.py
+import json
+import os
+import time
+from datetime import datetime
+
+from services.perfis_lancamento import preparar_display
+
+# Sessões salvas (cookies + localStorage) por fornecedor. Contém credenciais de sessão:
+# a pasta fica fora do git (ver backend/.gitignore).
+SESSOES_DIR = os.getenv("SESSOES_DIR", "data/sessions")
+
+# Só estes kwargs de chromium.launch vão para o arquivo. O "env" do fallback headed
+# (os.environ inteiro + DISPLAY do Xvfb) tem segredos do .env e é refeito na restauração.
+LAUNCH_KWARGS_SALVOS = ("headless", "slow_mo", "args", "ignore_default_args")
+
+# Depois disso a sessão é descartada sem nem tentar (o portal provavelmente já expirou)
+SESSAO_TTL_HORAS = float(os.getenv("SESSAO_TTL_HORAS", "12"))
+
+SCRIPT_STEALTH = "Object.defineProperty(navigator, 'webdriver', { get: () => undefined });"
+
+# Probes baratos no estilo validar_login_sucesso (Laguna/Sama):
+#   - marcadores_login: trechos de URL que indicam que caímos na tela de login
+#   - seletores: sinais de tela logada (basta 1 aparecer)
+#   - seletores_deslogado: se algum estiver visível, a sessão caiu
+PROBES_SESSAO = {
+    "portalcomdip": {"marcadores_login": ["/login"], "seletores": ["input[name='src'][formcontrolname='search']"]},
+    "roles": {"marcadores_login": ["/account/login"], "seletores": ["input#search-prod"]},
+    "acaraujo": {"marcadores_login": ["/entrar"], "seletores": ["input.search__input[name='s']"]},
+    "gb": {"marcadores_login": ["#/homee"], "seletores": ["#txt-search-simples", "a[href='#/unit004']"], "seletores_deslogado": ["#username"]},
+    "jahu": {"marcadores_login": [], "seletores": ["#search-input", "#listEmpresa-main", "#listClient-main"], "seletores_deslogado": ["#user"]},
+    "laguna": {"marcadores_login": ["/account/login"], "seletores": ["#search-prod", ".kt-header", ".kt-menu"]},
+    "rmp": {"marcadores_login": ["/customer/account/login"], "seletores": ["#search-cod-fab-input"]},
+    "sama": {"marcadores_login": ["/account/login"], "seletores": ["#search-prod", ".kt-header", ".kt-menu"]},
+    "solroom": {"marcadores_login": ["login"], "seletores": ["input#pesquisa"]},
+    "suportematriz": {"marcadores_login": [], "seletores": ["input#codigo"], "seletores_deslogado": ["#email"]},
+    "dpk": {"marcadores_login": ["#/login"], "seletores": ["input[formcontrolname='searchTerm']"]},
+    "takao": {"marcadores_login": [], "seletores": ["input#inputSearch"], "seletores_deslogado": ["#icon-login button[data-testid='btnLogin']"]},
+    "skypecas": {"marcadores_login": ["/login"], "seletores": ["#inpCodigo"], "seletores_deslogado": ["#txtCNPJCPF"]},
+    "pellegrino": {"marcadores_login": ["/account/login"], "seletores": ["#search-prod", ".kt-header"]},
+    "furacao": {"marcadores_login": ["/login"], "seletores": ["input#gsearch"], "seletores_deslogado": ["#f"]},
+    "odapel": {"marcadores_login": [], "seletores": ["a[href='#tabs-2']", "#codPeca"], "seletores_deslogado": ["#usuario"]},
+}
+
+
+def caminho_sessao(chave):
+    return os.path.join(SESSOES_DIR, f"{chave}.json")
+
+
+def invalidar_sessao(chave):
+    try:
+        os.remove(caminho_sessao(chave))
+        print(f"🗑️ Sessão salva de {chave} descartada.")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Não foi possível apagar sessão de {chave}: {e}")
+
+
+def carregar_sessao(chave):
+    caminho = caminho_sessao(chave)
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Sessão de {chave} ilegível ({e}).")
+        invalidar_sessao(chave)
+        return None
+
+    if "env" in (dados.get("launch_kwargs") or {}):
+        # arquivo antigo com o ambiente do processo gravado: não reaproveita e apaga do disco
+        print(f"🧹 Sessão de {chave} foi salva com variáveis de ambiente. Descartando.")
+        invalidar_sessao(chave)
+        return None
+
+    idade_h = (time.time() - float(dados.get("salvo_em_ts", 0))) / 3600
+    if idade_h > SESSAO_TTL_HORAS:
+        print(f"⌛ Sessão de {chave} tem {idade_h:.1f}h (TTL {SESSAO_TTL_HORAS}h).")
+        invalidar_sessao(chave)
+        return None
+
+    return dados
+
+
+def _launch_salvavel(launch_kwargs):
+    return {k: v for k, v in (launch_kwargs or {}).items() if k in LAUNCH_KWARGS_SALVOS}
+
+
+async def salvar_sessao(chave, browser, context, page):
+    """
+    Salva storage_state + o necessário para recriar o contexto igual ao do login
+    (args de launch e opções do new_context capturados pelo BrowserPool).
+    Sem o pool não há como recriar UA/locale do fornecedor, então não salva.
+    """
+    if not chave or not hasattr(browser, "opcoes_contexto"):
+        return False
+
+    try:
+        opcoes = dict(browser.opcoes_contexto.get(id(context)) or {})
+        opcoes.pop("storage_state", None)
+
+        dados = {
+            "chave": chave,
+            "salvo_em": datetime.now().isoformat(),
+            "salvo_em_ts": time.time(),
+            "url": page.url,
+            "launch_kwargs": _launch_salvavel(browser.launch_kwargs),
+            "opcoes_contexto": opcoes,
+            "storage_state": await context.storage_state(),
+        }
+
+        os.makedirs(SESSOES_DIR, exist_ok=True)
+        caminho = caminho_sessao(chave)
+        tmp = caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(tmp, caminho)
+
+        print(f"💾 Sessão de {chave} salva para os próximos runs.")
+        return True
+
+    except Exception as e:
+        print(f"⚠️ Falha ao salvar sessão de {chave}: {e}")
+        return False
+
+
+async def validar_sessao(page, chave, timeout_ms=6000):
+    probe = PROBES_SESSAO.get(chave) or {}
+    url = (page.url or "").lower()
+
+    for marcador in probe.get("marcadores_login", []):
+        if marcador in url:
+            return False
+
+    for sel in probe.get("seletores_deslogado", []):
+        try:
+            if await page.locator(sel).first.is_visible():
+                return False
+        except:
+            pass
+
+    seletores = probe.get("seletores", [])
+    if not seletores:
+        return True
+
+    try:
+        await page.wait_for_selector(", ".join(seletores), state="attached", timeout=timeout_ms)
+        return True
+    except:
+        return False
+
+
+async def restaurar_sessao(playwright_instance, chave):
+    """
+    Tenta reabrir o fornecedor com a sessão salva.
+    Retorna (browser, context, page) se a sessão ainda vale, senão None (e descarta o arquivo).
+    """
+    dados = carregar_sessao(chave)
+    if not dados:
+        return None
+
+    browser = None
+    try:
+        print(f"♻️ Reaproveitando sessão salva de {chave}...")
+        launch_kwargs = _launch_salvavel(dados["launch_kwargs"])
+        if not launch_kwargs.get("headless", True) and not preparar_display(launch_kwargs):
+            launch_kwargs["headless"] = True
+        browser = await playwright_instance.chromium.launch(**launch_kwargs)
+        context = await browser.new_context(**dados["opcoes_contexto"], storage_state=dados["storage_state"])
+        await context.add_init_script(SCRIPT_STEALTH)
+
+        page = await context.new_page()
+        await page.goto(dados["url"], wait_until="domcontentloaded", timeout=30000)
+
+        if await validar_sessao(page, chave):
+            print(f"✅ Sessão de {chave} ainda válida. Login pulado.")
+            return browser, context, page
+
+        print(f"⌛ Sessão de {chave} expirou no portal. Fazendo login completo...")
+
+    except Exception as e:
+        print(f"⚠️ Erro ao restaurar sessão de {chave}: {e}")
+
+    invalidar_sessao(chave)
+    if browser:
+        try:
+            await browser.close()
+        except:
+            pass
+    return None
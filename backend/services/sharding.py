@@ -0,0 +1,146 @@
+# services/sharding.py
+import asyncio
+
+from services.circuit_breaker import FornecedorAbortado
+
+
+def dividir_em_shards(lista_produtos, n_abas):
+    """Divide a lista em até N fatias contíguas (mantém a ordem original ao juntar)."""
+    n_abas = max(1, min(int(n_abas or 1), len(lista_produtos)))
+    tamanho, resto = divmod(len(lista_produtos), n_abas)
+
+    shards = []
+    inicio = 0
+    for i in range(n_abas):
+        fim = inicio + tamanho + (1 if i < resto else 0)
+        shards.append(lista_produtos[inicio:fim])
+        inicio = fim
+    return [s for s in shards if s]
+
+
+async def limpar_overlays(page):
+    """Fecha tutoriais/modais genéricos que travam uma aba nova (driver.js, swal2, bootstrap)."""
+    try:
+        await page.keyboard.press("Escape")
+    except:
+        pass
+
+    for sel in [".driver-popover-close-btn", "button.swal2-confirm"]:
+        try:
+            btn = page.locator(sel).first
+            if await btn.is_visible():
+                await btn.click(timeout=2000)
+        except:
+            pass
+
+    try:
+        await page.evaluate("""
+            () => {
+                document.querySelectorAll('.modal-backdrop, .driver-overlay').forEach(e => e.remove());
+                document.body.classList.remove('modal-open');
+            }
+        """)
+    except:
+        pass
+
+
+async def preparar_aba(page, url_base):
+    await page.goto(url_base, wait_until="domcontentloaded", timeout=60000)
+    try:
+        await page.wait_for_load_state("networkidle", timeout=10000)
+    except:
+        pass
+    await limpar_overlays(page)
+
+
+async def processar_em_abas(process_func, context, page, lista_produtos, n_abas, nome="", tentativas_shard=2, execucao=None, offset_base=0, envolver_pagina=None):
+    """
+    Roda um processar_lista_produtos_sequencial* em N abas do MESMO contexto logado.
+
+    - shard 0 usa a page do login; os outros abrem abas novas na URL pós-login
+    - cada shard tem sua própria recuperação: se estourar exceção, a aba é descartada
+      e o shard roda de novo numa aba nova, sem parar os demais. Com `execucao`, a nova
+      tentativa começa no 1º SKU que a fatia anterior não registrou (nada é raspado
+      nem contado duas vezes); sem ela o shard inteiro é refeito (a exceção levou junto
+      o que a tentativa tinha extraído)
+    - resultados voltam concatenados na ordem da lista
+    - com `execucao`, cada shard recebe a fatia do checkpoint a partir do seu offset
+      (`offset_base` quando `lista_produtos` já é um pedaço da lista do fornecedor)
+    - com `envolver_pagina` (reciclagem), as abas novas são embrulhadas como a page
+      recebida, e a fatia de cada shard leva a sua page para o gancho entre SKUs
+    """
+    shards = dividir_em_shards(lista_produtos, n_abas)
+
+    def _fatia(offset, page_shard):
+        return execucao.fatia(offset, pagina=page_shard if envolver_pagina else None)
+
+    if len(shards) <= 1:
+        if execucao is None:
+            return await process_func(page, lista_produtos)
+        return await process_func(page, lista_produtos, execucao=_fatia(offset_base, page))
+
+    url_base = page.url
+    print(f"🗂️ {nome}: dividindo {len(lista_produtos)} códigos em {len(shards)} abas "
+          f"({', '.join(str(len(s)) for s in shards)})")
+
+    offsets = []
+    inicio = offset_base
+    for s in shards:
+        offsets.append(inicio)
+        inicio += len(s)
+
+    async def _rodar_shard(indice, sublista):
+        page_shard = page if indice == 0 else None
+        # SKUs do shard já registrados no checkpoint: a retentativa continua dali
+        feitos = 0
+
+        for tentativa in range(1, tentativas_shard + 1):
+            fatia = None
+            try:
+                if page_shard is None or page_shard.is_closed():
+                    page_shard = await context.new_page()
+                    await preparar_aba(page_shard, url_base)
+                    if envolver_pagina:
+                        page_shard = envolver_pagina(page_shard)
+
+                if execucao is None:
+                    return await process_func(page_shard, sublista) or []
+                if feitos >= len(sublista):
+                    return []
+                fatia = _fatia(offsets[indice] + feitos, page_shard)
+                return await process_func(page_shard, sublista[feitos:], execucao=fatia) or []
+
+            except FornecedorAbortado:
+                # circuito do fornecedor desistiu: não adianta tentar o shard numa aba nova
+                raise
+            except Exception as e:
+                if fatia is not None:
+                    feitos += fatia.feitos
+                print(f"⚠️ {nome} [aba {indice + 1}] falhou (tentativa {tentativa}/{tentativas_shard}, "
+                      f"{feitos}/{len(sublista)} códigos feitos): {e}")
+                if page_shard is not None and page_shard is not page:
+                    try:
+                        await page_shard.close()
+                    except:
+                        pass
+                page_shard = None
+
+        print(f"❌ {nome} [aba {indice + 1}] desistiu de {len(sublista) - feitos} códigos.")
+        return []
+
+    try:
+        resultados = await asyncio.gather(*(_rodar_shard(i, s) for i, s in enumerate(shards)))
+    finally:
+        # page reciclada do shard 0: a aba que fica aberta é a atual, não a do login
+        principal = page.atual if envolver_pagina else page
+        for aba in list(context.pages):
+            if aba is not principal:
+                try:
+                    await aba.close()
+                except:
+                    pass
+
+    dados = []
+    for r in resultados:
+        dados.extend(r)
+    return dados
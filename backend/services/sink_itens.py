@@ -0,0 +1,59 @@
+# services/sink_itens.py
+import os
+
+from services.db_saver import salvar_lote_sqlite
+
+# Itens por micro-lote gravado no banco durante o scraping
+TAMANHO_LOTE_STREAM = int(os.getenv("TAMANHO_LOTE_STREAM", "25"))
+
+# Mesmos filtros que cada controller aplicava no save do fim do loop
+FILTROS_LOTE = {
+    "com_codigo": lambda r: bool(r.get("codigo")),
+    "sem_erro": lambda r: bool(r.get("codigo")) and "erro" not in r,
+    "encontrados": lambda r: r.get("status") != "Não encontrado",
+    "todos": lambda r: True,
+}
+
+
+def filtrar_itens(itens, filtro="encontrados"):
+    aceita = FILTROS_LOTE.get(filtro) or FILTROS_LOTE["encontrados"]
+    return [r for r in itens if r and aceita(r)]
+
+
+class SinkLote:
+    """
+    Destino dos itens de UM fornecedor: grava micro-lotes no banco com o
+    preparar_dados_finais do próprio controller, em vez de um lote só no fim.
+    """
+
+    def __init__(self, nome, preparar_func, filtro="encontrados", tamanho=TAMANHO_LOTE_STREAM):
+        self.nome = nome
+        self.preparar_func = preparar_func
+        self.filtro = filtro
+        self.tamanho = max(1, tamanho)
+        self.salvos = 0
+        self.lotes = 0
+        self.falhas = 0
+
+    def gravar(self, itens):
+        """Retorna True se os itens estão no banco (ou não havia nada a gravar)."""
+        validos = filtrar_itens(itens, self.filtro)
+        if not validos:
+            return True
+
+        ok = False
+        try:
+            ok = bool(salvar_lote_sqlite(self.preparar_func(validos)))
+        except Exception as e:
+            print(f"⚠️ {self.nome}: erro ao gravar micro-lote: {e}")
+
+        if ok:
+            self.salvos += len(validos)
+            self.lotes += 1
+            print(f"💾 {self.nome}: +{len(validos)} itens no banco ({self.salvos} no total).")
+        else:
+            self.falhas += 1
+        return ok
+
+    def resumo(self):
+        return {"itens_salvos": self.salvos, "lotes": self.lotes, "lotes_com_falha": self.falhas}
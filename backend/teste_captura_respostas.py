@@ -0,0 +1,103 @@
+import argparse
+import sys
+
+from services.captura_respostas import (
+    MAPEAMENTOS, OPCOES_ITEM, PASTA_GRAVACOES_TESTE, montar_item, normalizar_codigo, produto_da_resposta
+)
+from services.replay_respostas import carregar_gravacoes
+
+# ============================================================
+# 🧪 TESTE: mapeamento JSON de cada portal x item do DOM
+# ------------------------------------------------------------
+# Para cada fornecedor em MAPEAMENTOS (services/captura_respostas.py), lê as
+# buscas gravadas em data/respostas_gravadas/<fornecedor>/ (GRAVAR_RESPOSTAS num
+# run com a captura desligada: JSON que chegaram + item que o DOM extraiu) e
+# confere que o item montado do JSON pelo mapeamento é o mesmo que o DOM gravou.
+#
+# Falha (saída 1) se algum fornecedor mapeado não tem gravação, se o mapeamento
+# não acha um produto que o DOM achou, ou se algum campo que vai para o banco
+# diverge. Só ligue a captura (CAPTURA_RESPOSTAS_LIGADA) de quem passa aqui.
+#
+#   python teste_captura_respostas.py
+#   python teste_captura_respostas.py --fornecedor dpk --pasta /tmp/gravacoes
+# ============================================================
+
+# O que vai para o banco (a "mensagem" fica de fora: o DOM traz o texto do portal)
+CAMPOS_COMPARADOS = ("preco_num", "valor_total", "qtdDisponivel", "podeComprar", "disponivel", "uf")
+
+
+def _valor(item, campo):
+    valor = item.get(campo)
+    return round(valor, 2) if isinstance(valor, float) else valor
+
+
+def _divergencias(item_dom, item_json):
+    if normalizar_codigo(item_dom.get("codigo") or "") != normalizar_codigo(item_json["codigo"]):
+        return [f"codigo: DOM {item_dom.get('codigo')!r} x JSON {item_json['codigo']!r}"]
+    return [
+        f"{campo}: DOM {_valor(item_dom, campo)!r} x JSON {_valor(item_json, campo)!r}"
+        for campo in CAMPOS_COMPARADOS
+        if campo in item_dom and _valor(item_dom, campo) != _valor(item_json, campo)
+    ]
+
+
+def testar_fornecedor(fornecedor, pasta):
+    """Retorna quantas falhas o fornecedor teve."""
+    gravacoes = [g for g in carregar_gravacoes(pasta, fornecedor).values() if g.get("item_dom")]
+    if not gravacoes:
+        print(f"❌ {fornecedor}: nenhuma busca gravada com item do DOM em {pasta}/{fornecedor}.")
+        return 1
+
+    falhas = 0
+    for gravacao in gravacoes:
+        codigo, item_dom = gravacao["codigo"], gravacao["item_dom"]
+        produto = next(
+            (p for p in (produto_da_resposta(fornecedor, r["resposta"], codigo) for r in gravacao["respostas"]) if p),
+            None
+        )
+        item_json = montar_item(produto, gravacao.get("quantidade") or 1, **OPCOES_ITEM.get(fornecedor, {}))
+
+        if item_json is None:
+            if item_dom.get("preco_num"):
+                falhas += 1
+                print(f"❌ {fornecedor} {codigo}: o DOM achou o produto, o mapeamento não.")
+            else:
+                print(f"✅ {fornecedor} {codigo}: sem produto nos dois.")
+            continue
+
+        erros = _divergencias(item_dom, item_json)
+        if erros:
+            falhas += 1
+            print(f"❌ {fornecedor} {codigo}: " + "; ".join(erros))
+        else:
+            print(f"✅ {fornecedor} {codigo}: JSON igual ao DOM.")
+
+    print(f"📋 {fornecedor}: {len(gravacoes) - falhas}/{len(gravacoes)} buscas conferem.")
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fornecedor", default=None, help="só este fornecedor (padrão: todos os de MAPEAMENTOS)")
+    parser.add_argument("--pasta", default=PASTA_GRAVACOES_TESTE, help="pasta das buscas gravadas")
+    args = parser.parse_args()
+
+    fornecedores = [args.fornecedor] if args.fornecedor else sorted(MAPEAMENTOS)
+    if not fornecedores:
+        print("ℹ️ Nenhum fornecedor com mapeamento: a captura JSON fica desligada para todos.")
+        return 0
+
+    falhas = 0
+    for fornecedor in fornecedores:
+        if fornecedor not in MAPEAMENTOS:
+            print(f"❌ {fornecedor}: sem mapeamento em MAPEAMENTOS.")
+            falhas += 1
+            continue
+        falhas += testar_fornecedor(fornecedor, args.pasta)
+
+    print(f"\n=== {'OK' if not falhas else f'{falhas} FALHAS'} ===")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
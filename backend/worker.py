@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import os
+import socket
+import uuid
+from playwright.async_api import async_playwright
+
+from services.browser_pool import BrowserPool
+from services.fila_jobs import (
+    LEASE_JOB_S, garantir_tabela_jobs, reivindicar_job, renovar_lease,
+    concluir_job, falhar_job, resumo_jobs
+)
+from services.historico import garantir_tabela_historico, registrar_historico
+from services.frescor import garantir_tabela_consultas
+from services.checkpoints import garantir_tabelas_checkpoint
+from runner import montar_fornecedores_config, executar_fornecedor, fechar_execucao
+
+# ============================================================
+# 🛠️ WORKER DA FILA DE JOBS (1 job = 1 fornecedor de uma execução)
+# ------------------------------------------------------------
+# Pega jobs de jobs_fornecedores com lease, roda login + scraping via
+# runner.executar_fornecedor e grava o resultado de volta. Worker que morre
+# para de renovar o lease e o job volta para a fila.
+#
+#   python worker.py                        # roda até ser parado
+#   python worker.py --slots 2 --uma-vez    # esvazia a fila e sai
+#
+# Vários workers na mesma máquina (ou em máquinas com o mesmo SQLITE_PATH)
+# dividem a fila sozinhos; o job é enfileirado por POST /processar {"distribuido": true}.
+# ============================================================
+
+
+async def _manter_lease(job, tarefa, lease_s):
+    """Renova o lease a cada 1/3 do prazo; se perdeu o job, cancela o scraping."""
+    while not tarefa.done():
+        await asyncio.sleep(lease_s / 3)
+        if tarefa.done():
+            break
+        if not renovar_lease(job, lease_s):
+            print(f"⚠️ Job {job['id']} ({job['chave']}) não é mais deste worker. Cancelando...")
+            tarefa.cancel()
+            break
+
+
+async def processar_job(job, configs, playwright_instance, sem, lease_s):
+    config = configs.get(job["chave"])
+    if not config:
+        falhar_job(job, f"Fornecedor desconhecido: {job['chave']}")
+        return
+
+    payload = job["payload"]
+    lista_produtos = payload.get("lista_produtos") or []
+    config = dict(config, lista_produtos=lista_produtos)
+    if payload.get("indices") is not None:
+        config["indices"] = payload["indices"]
+
+    print(f"📦 Job {job['id']}: {config['nome']} ({len(lista_produtos)} códigos, tentativa {job['tentativas']}).")
+
+    tarefa = asyncio.create_task(
+        executar_fornecedor(config, playwright_instance, lista_produtos, sem, execucao_id=job["execucao_id"])
+    )
+    vigia = asyncio.create_task(_manter_lease(job, tarefa, lease_s))
+
+    try:
+        resultado = await tarefa
+    except asyncio.CancelledError:
+        return
+    except Exception as e:
+        print(f"🔥 Job {job['id']} falhou no worker: {e}")
+        falhar_job(job, e)
+        return
+    finally:
+        vigia.cancel()
+
+    resultado["itens_solicitados"] = len(lista_produtos)
+    if not concluir_job(job, resultado):
+        print(f"⚠️ Job {job['id']} concluído, mas o lease já tinha vencido (resultado descartado).")
+        return
+
+    registrar_historico(job["execucao_id"], [resultado], len(lista_produtos))
+    print(f"✅ Job {job['id']} ({config['nome']}) concluído: {resultado['itens']} itens.")
+
+    resumo = resumo_jobs(job["execucao_id"]) or {"contagem": {}}
+    if not any(resumo["contagem"].get(st) for st in ("pendente", "executando")):
+        print(f"🏁 Execução {job['execucao_id']} sem jobs pendentes.")
+        fechar_execucao(job["execucao_id"])
+
+
+async def slot_worker(numero, worker_id, configs, playwright_instance, sem, args):
+    while True:
+        job = reivindicar_job(worker_id, args.lease, chaves=args.fornecedores)
+        if not job:
+            if args.uma_vez:
+                return
+            await asyncio.sleep(args.intervalo)
+            continue
+
+        print(f"🛠️ [{worker_id}/{numero}] pegou job {job['id']} ({job['chave']}, execução {job['execucao_id']}).")
+        await processar_job(job, configs, playwright_instance, sem, args.lease)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}")
+    parser.add_argument("--slots", type=int, default=1, help="jobs simultâneos neste worker")
+    parser.add_argument("--lease", type=float, default=LEASE_JOB_S, help="segundos de lease por job")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="espera quando a fila está vazia")
+    parser.add_argument("--fornecedores", nargs="*", default=None, help="só pega jobs dessas chaves")
+    parser.add_argument("--uma-vez", action="store_true", help="sai quando a fila esvaziar")
+    args = parser.parse_args()
+
+    garantir_tabela_jobs()
+    garantir_tabela_historico()
+    garantir_tabela_consultas()
+    garantir_tabelas_checkpoint()
+
+    configs = {c["chave"]: c for c in montar_fornecedores_config()}
+    sem = asyncio.Semaphore(args.slots)
+    print(f"🛠️ Worker {args.id} iniciado ({args.slots} slots, lease {args.lease:.0f}s).")
+
+    async with async_playwright() as p:
+        pool = BrowserPool(p)
+        try:
+            await asyncio.gather(*(
+                slot_worker(n + 1, args.id, configs, pool.proxy(), sem, args)
+                for n in range(args.slots)
+            ))
+        finally:
+            await pool.fechar()
+
+    print(f"🛠️ Worker {args.id} encerrado.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())